@@ -0,0 +1,166 @@
+import threading
+from collections import OrderedDict
+from itertools import chain
+from datetime import date, timedelta
+import numpy as np
+
+# Importado só quando o relatório de utilização é aberto: numpy não entra no
+# tempo de inicialização da aplicação.
+
+DIA_JULIANO_1970 = 2440587.5
+DIAS_SEMANA = ['Segunda', 'Terça', 'Quarta', 'Quinta', 'Sexta', 'Sábado', 'Domingo']
+MESES = ['Jan', 'Fev', 'Mar', 'Abr', 'Mai', 'Jun', 'Jul', 'Ago', 'Set', 'Out', 'Nov', 'Dez']
+
+# ===== CONVERSÃO DAS RESERVAS =====
+def _dias(julianos):
+    # julianday() do SQLite -> dias desde 1970-01-01 (inteiros)
+    return np.floor(np.asarray(julianos, dtype=np.float64) - DIA_JULIANO_1970 + 1e-9).astype(np.int64)
+
+def _matriz(linhas, colunas):
+    # fromiter sobre as linhas achatadas evita converter cada Row do SQLAlchemy em lista
+    return np.fromiter(chain.from_iterable(linhas), dtype=np.float64, count=len(linhas) * colunas).reshape(-1, colunas)
+
+def _dia_numero(dia):
+    return (dia - date(1970, 1, 1)).days
+
+def montar_reservas(diretas, de_combos):
+    # diretas:   (produto_id, inicio_juliano, fim_juliano, quantidade, receita)
+    # de_combos: (item_id, produto_id, inicio_juliano, fim_juliano, quantidade, peso, receita_do_item)
+    # A receita de um combo é dividida entre os produtos pelo peso (preço x quantidade no combo);
+    # com peso total zero, pela quantidade.
+    # Nenhum campo pode ser NULL (a consulta usa coalesce)
+    diretas = _matriz(diretas, 5)
+    combos = _matriz(de_combos, 7)
+
+    if len(combos):
+        _, item_idx = np.unique(combos[:, 0], return_inverse=True)
+        peso = combos[:, 5]
+        quantidade = combos[:, 4]
+        soma_peso = np.bincount(item_idx, weights=peso)[item_idx]
+        soma_quantidade = np.bincount(item_idx, weights=quantidade)[item_idx]
+        fracao = np.where(soma_peso > 0, peso / np.where(soma_peso > 0, soma_peso, 1),
+                          quantidade / np.where(soma_quantidade > 0, soma_quantidade, 1))
+        combos = np.column_stack([combos[:, 1], combos[:, 2], combos[:, 3], quantidade, combos[:, 6] * fracao])
+
+    tudo = np.vstack([diretas, combos]) if len(combos) else diretas
+    return {
+        'produto_id': tudo[:, 0].astype(np.int64),
+        'inicio': _dias(tudo[:, 1]),
+        'fim': _dias(tudo[:, 2]),
+        'quantidade': tudo[:, 3],
+        'receita': tudo[:, 4],
+    }
+
+# ===== CÁLCULO =====
+def calcular(reservas, produtos, inicio, fim, top_dias=10):
+    # produtos: lista de (id, nome, capacidade). Tudo vetorizado: nenhuma repetição
+    # em Python por reserva ou por dia.
+    ids = np.array([p[0] for p in produtos], dtype=np.int64)
+    capacidade = np.array([p[2] for p in produtos], dtype=np.float64)
+    n_produtos = len(produtos)
+    dia0, dia_n = _dia_numero(inicio), _dia_numero(fim)
+    n_dias = dia_n - dia0 + 1
+
+    # Linha de cada reserva na matriz; reservas de produtos que não existem mais são descartadas
+    if n_produtos:
+        ordem = np.argsort(ids)
+        posicao = np.clip(np.searchsorted(ids[ordem], reservas['produto_id']), 0, n_produtos - 1)
+        existe = ids[ordem][posicao] == reservas['produto_id']
+        linha = ordem[posicao][existe]
+    else:
+        existe = np.zeros(len(reservas['produto_id']), dtype=bool)
+        linha = np.zeros(0, dtype=np.int64)
+    ini = reservas['inicio'][existe]
+    fim_reserva = np.maximum(reservas['fim'][existe], ini)
+    quantidade = reservas['quantidade'][existe]
+    receita = reservas['receita'][existe]
+
+    # Receita distribuída igualmente pelos dias da reserva; conta só a parte dentro do período
+    s = np.clip(ini, dia0, dia_n + 1) - dia0
+    e = np.clip(fim_reserva, dia0 - 1, dia_n) - dia0
+    dentro = e >= s
+    dias_reserva = (fim_reserva - ini + 1).astype(np.float64)
+    receita_periodo = np.bincount(linha[dentro], weights=receita[dentro] * (e[dentro] - s[dentro] + 1) / dias_reserva[dentro],
+                                  minlength=n_produtos)
+
+    # Unidades fora por produto e dia: soma de prefixos sobre uma matriz de diferenças
+    diferencas = np.zeros((n_produtos, n_dias + 1))
+    np.add.at(diferencas, (linha[dentro], s[dentro]), quantidade[dentro])
+    np.add.at(diferencas, (linha[dentro], e[dentro] + 1), -quantidade[dentro])
+    fora = np.cumsum(diferencas[:, :-1], axis=1)
+
+    # Utilização = unidades fora / capacidade; produtos sem capacidade ficam sem valor (nan)
+    unidades_dia = fora.sum(axis=1)
+    pico = fora.max(axis=1)
+    dia_pico = fora.argmax(axis=1)
+    dias_esgotado = (fora >= capacidade[:, None]).sum(axis=1) * (capacidade > 0)
+    unidades_disponiveis = np.where(capacidade > 0, capacidade * n_dias, np.nan)
+    utilizacao_media = unidades_dia / unidades_disponiveis
+    receita_por_unidade_dia = receita_periodo / unidades_disponiveis
+
+    por_produto = []
+    for i in np.argsort(-np.nan_to_num(receita_por_unidade_dia, nan=-1.0)):
+        por_produto.append({
+            'id': int(ids[i]),
+            'nome': produtos[i][1],
+            'capacidade': int(capacidade[i]),
+            'utilizacao_media': _numero(utilizacao_media[i]),
+            'dias_esgotado': int(dias_esgotado[i]),
+            'pico_unidades': int(pico[i]),
+            'dia_pico': (inicio + timedelta(days=int(dia_pico[i]))).isoformat() if pico[i] > 0 else None,
+            'unidades_dia': _numero(unidades_dia[i]),
+            'receita': round(float(receita_periodo[i]), 2),
+            'receita_por_unidade_dia': _numero(receita_por_unidade_dia[i]),
+        })
+
+    # Demanda total por dia, dias de pico e sazonalidade (média diária por mês e por dia da semana)
+    total_dia = fora.sum(axis=0)
+    dias = np.arange(dia0, dia_n + 1).astype('datetime64[D]')
+    mes = dias.astype('datetime64[M]').astype(np.int64) % 12
+    dia_semana = (np.arange(dia0, dia_n + 1) + 3) % 7  # 1970-01-01 foi quinta-feira
+    picos = np.argsort(-total_dia, kind='stable')[:top_dias]
+
+    return {
+        'inicio': inicio.isoformat(),
+        'fim': fim.isoformat(),
+        'dias': n_dias,
+        'reservas': int(dentro.sum()),
+        'produtos': por_produto,
+        'dias_pico': [{'dia': (inicio + timedelta(days=int(i))).isoformat(), 'unidades': int(total_dia[i])}
+                      for i in picos if total_dia[i] > 0],
+        'por_mes': _medias(mes, total_dia, 12, MESES),
+        'por_dia_semana': _medias(dia_semana, total_dia, 7, DIAS_SEMANA),
+    }
+
+def _medias(grupos, valores, n, nomes):
+    soma = np.bincount(grupos, weights=valores, minlength=n)
+    contagem = np.bincount(grupos, minlength=n)
+    return [{'nome': nomes[i], 'media_unidades': round(float(soma[i] / contagem[i]), 2)}
+            for i in range(n) if contagem[i]]
+
+def _numero(valor):
+    valor = float(valor)
+    return None if np.isnan(valor) or np.isinf(valor) else round(valor, 4)
+
+# ===== CACHE POR PERÍODO =====
+class CacheAnalises:
+    # Guarda os últimos resultados por (período, versões dos dados). As versões ficam
+    # no banco, então todos os workers invalidam juntos e não há TTL.
+    def __init__(self, maximo=32):
+        self.maximo = maximo
+        self._itens = OrderedDict()
+        self._trava = threading.Lock()
+
+    def obter(self, chave, calcular_resultado):
+        with self._trava:
+            if chave in self._itens:
+                self._itens.move_to_end(chave)
+                return self._itens[chave]
+        resultado = calcular_resultado()
+        with self._trava:
+            self._itens[chave] = resultado
+            while len(self._itens) > self.maximo:
+                self._itens.popitem(last=False)
+        return resultado
+
+cache_analises = CacheAnalises()
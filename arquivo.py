@@ -0,0 +1,119 @@
+import os
+from datetime import date, datetime, timedelta
+import click
+from flask import abort, current_app
+from flask.cli import with_appcontext
+from sqlalchemy import event
+from extensoes import db, lojas
+from modelos import (Transacao, ItemTransacao, TransacaoArquivada, ItemTransacaoArquivado,
+                     ESQUEMA_ARQUIVO, metadados_arquivo)
+
+# ===== ANEXAR O ARQUIVO =====
+def caminho_arquivo(app):
+    # Banco em memória (testes) -> arquivo também em memória
+    caminho = app.config.get('ARQUIVO_DATABASE')
+    if caminho:
+        return caminho
+    if app.config['SQLALCHEMY_DATABASE_URI'] in ('sqlite://', 'sqlite:///:memory:'):
+        return ':memory:'
+    return os.path.join(app.instance_path, 'arquivo.db')
+
+def init_app(app):
+    with app.app_context():
+        anexar_arquivo(db.engine, caminho_arquivo(app))
+
+def anexar_arquivo(motor, caminho):
+    # ATTACH em cada conexão nova do pool: uma consulta pode juntar "transacao" e
+    # "arquivo.transacao" e o arquivamento move as linhas em uma única transação.
+    # Cada loja (lojas.py) tem o seu arquivo.
+    @event.listens_for(motor, 'connect')
+    def anexar_arquivo(conexao_dbapi, registro):
+        if caminho != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(caminho)), exist_ok=True)
+        cursor = conexao_dbapi.cursor()
+        cursor.execute(f'ATTACH DATABASE ? AS {ESQUEMA_ARQUIVO}', (caminho,))
+        cursor.close()
+
+# ===== CONSULTAS =====
+def obter_transacao_ou_404(transacao_id):
+    # Comprovantes continuam abrindo depois que a transação é arquivada
+    transacao = db.session.get(Transacao, transacao_id) or db.session.get(TransacaoArquivada, transacao_id)
+    if transacao is None:
+        abort(404)
+    return transacao
+
+def chave_ja_gravada(chave_idempotencia):
+    for modelo in (Transacao, TransacaoArquivada):
+        transacao_id = db.session.execute(
+            db.select(modelo.id).where(modelo.chave_idempotencia == chave_idempotencia)).scalar()
+        if transacao_id is not None:
+            return transacao_id
+    return None
+
+# ===== ARQUIVAMENTO =====
+def filtro_arquivaveis(limite):
+    # Vendas finalizadas e aluguéis encerrados antes do limite; orçamentos criados antes dele.
+    # Aluguéis ativos nunca saem da tabela em uso, por mais antigos que sejam.
+    antes = datetime.combine(limite, datetime.min.time())
+    fim_aluguel = db.func.coalesce(Transacao.data_fim, Transacao.data_inicio)
+    return db.or_(
+        db.and_(Transacao.tipo == 'Venda', Transacao.status == 'finalizado', Transacao.data < antes),
+        db.and_(Transacao.tipo == 'Aluguel', Transacao.status == 'finalizado', Transacao.data < antes,
+                db.or_(fim_aluguel.is_(None), fim_aluguel < limite)),
+        db.and_(Transacao.tipo == 'Orcamento', Transacao.data < antes),
+    )
+
+def ids_arquivaveis(limite):
+    # transacao e item_transacao usam AUTOINCREMENT (ver modelos.py): um id arquivado
+    # nunca é distribuído de novo, então qualquer transação elegível pode sair
+    return db.session.execute(
+        db.select(Transacao.id).where(filtro_arquivaveis(limite)).order_by(Transacao.id)
+    ).scalars().all()
+
+def _copiar(origem, destino, coluna_filtro, ids):
+    nomes = [coluna.name for coluna in origem.columns]
+    db.session.execute(db.insert(destino).from_select(
+        nomes, db.select(*[origem.c[nome] for nome in nomes]).where(coluna_filtro.in_(ids))))
+
+def arquivar_transacoes(limite, lote=500):
+    # Move (copia + apaga) em lotes; cada lote é um commit atômico nos dois arquivos
+    ids = ids_arquivaveis(limite)
+    transacoes, itens = Transacao.__table__, ItemTransacao.__table__
+    for inicio in range(0, len(ids), lote):
+        parte = ids[inicio:inicio + lote]
+        _copiar(transacoes, TransacaoArquivada.__table__, transacoes.c.id, parte)
+        _copiar(itens, ItemTransacaoArquivado.__table__, itens.c.transacao_id, parte)
+        db.session.execute(db.delete(itens).where(itens.c.transacao_id.in_(parte)))
+        db.session.execute(db.delete(transacoes).where(transacoes.c.id.in_(parte)))
+        db.session.commit()
+    return len(ids)
+
+def descartar_ja_arquivadas():
+    # Um backup antigo pode trazer de volta transações que já estão no arquivo
+    arquivadas = db.select(TransacaoArquivada.id)
+    db.session.execute(db.delete(ItemTransacao.__table__).where(ItemTransacao.transacao_id.in_(arquivadas)))
+    db.session.execute(db.delete(Transacao.__table__).where(Transacao.id.in_(arquivadas)))
+    db.session.commit()
+
+def recriar_arquivo():
+    motor = lojas.motor_atual()
+    metadados_arquivo.drop_all(motor)
+    metadados_arquivo.create_all(motor)
+
+@click.command('arquivar-transacoes')
+@click.option('--dias', type=int, default=None, help='Idade mínima em dias (padrão: ARQUIVO_DIAS)')
+@click.option('--compactar', is_flag=True, help='Roda VACUUM no banco principal depois de mover')
+@with_appcontext
+def arquivar_transacoes_cli(dias, compactar):
+    # Ex.: flask --app app arquivar-transacoes --dias 365 --compactar
+    dias = current_app.config['ARQUIVO_DIAS'] if dias is None else dias
+    limite = date.today() - timedelta(days=dias)
+    movidas = arquivar_transacoes(limite)
+    slug = lojas.slug_ativa()
+    destino = lojas.caminho(slug, arquivo=True) if slug else caminho_arquivo(current_app)
+    click.echo(f'{movidas} transações anteriores a {limite:%d/%m/%Y} movidas para {destino}')
+    if compactar and movidas:
+        # VACUUM não roda dentro de transação
+        with lojas.motor_atual().connect().execution_options(isolation_level='AUTOCOMMIT') as conexao:
+            conexao.exec_driver_sql('VACUUM main')
+        click.echo('Banco principal compactado.')
@@ -0,0 +1,185 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from flask_login import UserMixin
+from sqlalchemy import event
+from werkzeug.security import generate_password_hash, check_password_hash, DEFAULT_PBKDF2_ITERATIONS
+
+# ===== AUTENTICAÇÃO =====
+# - Usuário logado: o user_loader usa uma cópia simples do usuário guardada por
+#   AUTENTICACAO_CACHE_SEGUNDOS em vez de consultar a tabela user a cada requisição.
+#   Commits que alteram um usuário neste processo apagam a cópia na hora; nos outros
+#   workers ela vale no máximo até expirar.
+# - Senhas: o hash (PBKDF2/scrypt liberam o GIL) roda em um pool de SENHA_WORKERS
+#   threads, então um pico de logins ocupa no máximo esse número de núcleos e o resto das
+#   páginas continua respondendo. Com mais de SENHA_FILA pedidos esperando, o login é
+#   recusado na hora em vez de empilhar. Hashes com custo diferente de SENHA_METODO são
+#   refeitos no próximo login correto.
+# - Tentativas: LOGIN_TENTATIVAS senhas erradas para o mesmo usuário em
+#   LOGIN_JANELA_SEGUNDOS bloqueiam o usuário até a mais antiga sair da janela (por processo).
+MAXIMO_USUARIOS_CACHE = 1000
+MAXIMO_USUARIOS_BLOQUEIO = 10000
+
+class SenhasOcupadas(Exception):
+    pass
+
+def metodo_completo(metodo):
+    # "pbkdf2:sha256" -> "pbkdf2:sha256:1000000", como aparece no início do hash gravado
+    partes = metodo.split(':')
+    if partes[0] == 'pbkdf2':
+        return ':'.join(['pbkdf2', partes[1] if len(partes) > 1 else 'sha256',
+                         partes[2] if len(partes) > 2 else str(DEFAULT_PBKDF2_ITERATIONS)])
+    if partes[0] == 'scrypt':
+        padrao = ['scrypt', str(2 ** 15), '8', '1']
+        return ':'.join(partes + padrao[len(partes):])
+    return metodo
+
+class UsuarioSessao(UserMixin):
+    # Cópia do usuário logado sem objetos do SQLAlchemy: pode ser usada por várias
+    # requisições (e threads) ao mesmo tempo
+    def __init__(self, user):
+        self.id = user.id
+        self.username = user.username
+        self.loja_id = user.loja_id
+        self.slug_loja = user.slug_loja
+        self.token_calendario = user.token_calendario
+
+    def obter_token_calendario(self):
+        if not self.token_calendario:
+            from extensoes import db
+            from modelos import User
+            self.token_calendario = db.session.get(User, self.id).obter_token_calendario()
+        return self.token_calendario
+
+class Autenticador:
+    def __init__(self):
+        self._usuarios = {}
+        self._geracao = 0
+        self._falhas = {}
+        self._executor = None
+        self._vagas = None
+        self._hash_ficticio = None
+        self._trava = threading.Lock()
+
+    def init_app(self, app):
+        from extensoes import db
+        self.cache_segundos = app.config.get('AUTENTICACAO_CACHE_SEGUNDOS', 30)
+        self.metodo = app.config.get('SENHA_METODO', 'pbkdf2:sha256')
+        self.prefixo = metodo_completo(self.metodo)
+        self.workers = app.config.get('SENHA_WORKERS', 2)
+        self.fila = app.config.get('SENHA_FILA', 32)
+        self.tentativas = app.config.get('LOGIN_TENTATIVAS', 5)
+        self.janela = app.config.get('LOGIN_JANELA_SEGUNDOS', 300)
+        self._vagas = threading.BoundedSemaphore(self.workers + self.fila)
+        app.extensions['autenticador'] = self
+        for nome, funcao in (('after_flush', self._anotar_usuarios),
+                             ('after_commit', self._esquecer_anotados),
+                             ('after_rollback', self._descartar_anotados)):
+            if not event.contains(db.session, nome, funcao):
+                event.listen(db.session, nome, funcao)
+
+    # ----- cache do usuário logado -----
+    def carregar_usuario(self, user_id):
+        from extensoes import db
+        from modelos import User
+        agora = time.monotonic()
+        guardado = self._usuarios.get(user_id)
+        if guardado is not None and guardado[0] > agora:
+            return guardado[1]
+        geracao = self._geracao
+        user = db.session.get(User, user_id)
+        if user is None:
+            self.esquecer_usuario(user_id)
+            return None
+        usuario = UsuarioSessao(user)
+        with self._trava:
+            # Um commit que alterou usuários durante a leitura torna a cópia suspeita
+            if self.cache_segundos > 0 and geracao == self._geracao:
+                if user_id not in self._usuarios and len(self._usuarios) >= MAXIMO_USUARIOS_CACHE:
+                    self._usuarios.pop(next(iter(self._usuarios)))
+                self._usuarios[user_id] = (agora + self.cache_segundos, usuario)
+        return usuario
+
+    def esquecer_usuario(self, user_id=None):
+        # Sem id, esquece todos (restauração de backup, por exemplo)
+        with self._trava:
+            self._geracao += 1
+            if user_id is None:
+                self._usuarios.clear()
+            else:
+                self._usuarios.pop(user_id, None)
+
+    def _anotar_usuarios(self, sessao, contexto):
+        from modelos import User
+        alterados = [obj.id for obj in (*sessao.new, *sessao.dirty, *sessao.deleted) if isinstance(obj, User)]
+        if alterados:
+            sessao.info.setdefault('usuarios_alterados', set()).update(alterados)
+
+    def _esquecer_anotados(self, sessao):
+        for user_id in sessao.info.pop('usuarios_alterados', ()):
+            self.esquecer_usuario(user_id)
+
+    def _descartar_anotados(self, sessao):
+        sessao.info.pop('usuarios_alterados', None)
+
+    # ----- hash de senhas no pool -----
+    def _executor_ativo(self):
+        if self._executor is None:
+            with self._trava:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='senhas')
+        return self._executor
+
+    def _no_pool(self, funcao, *args):
+        if not self._vagas.acquire(blocking=False):
+            raise SenhasOcupadas()
+        try:
+            return self._executor_ativo().submit(funcao, *args).result()
+        finally:
+            self._vagas.release()
+
+    def gerar_hash(self, senha):
+        return self._no_pool(generate_password_hash, senha, self.metodo)
+
+    def conferir_senha(self, hash_gravado, senha):
+        # Usuário inexistente também paga um hash: o tempo de resposta não revela quem existe
+        if hash_gravado is None:
+            if self._hash_ficticio is None:
+                self._hash_ficticio = self.gerar_hash('')
+            self._no_pool(check_password_hash, self._hash_ficticio, senha)
+            return False
+        return self._no_pool(check_password_hash, hash_gravado, senha)
+
+    def precisa_refazer(self, hash_gravado):
+        return hash_gravado.split('$', 1)[0] != self.prefixo
+
+    # ----- tentativas de login -----
+    @staticmethod
+    def _chave(username):
+        return (username or '').strip().casefold()
+
+    def espera_login(self, username):
+        # Segundos até o usuário poder tentar de novo (0 = liberado)
+        agora = time.monotonic()
+        with self._trava:
+            falhas = self._falhas.get(self._chave(username))
+            if not falhas:
+                return 0
+            while falhas and falhas[0] <= agora - self.janela:
+                falhas.popleft()
+            if len(falhas) < self.tentativas:
+                return 0
+            return int(falhas[0] + self.janela - agora) + 1
+
+    def registrar_falha(self, username):
+        agora = time.monotonic()
+        with self._trava:
+            if len(self._falhas) >= MAXIMO_USUARIOS_BLOQUEIO:
+                self._falhas = {chave: falhas for chave, falhas in self._falhas.items()
+                                if falhas and falhas[-1] > agora - self.janela}
+            self._falhas.setdefault(self._chave(username), deque(maxlen=self.tentativas)).append(agora)
+
+    def limpar_falhas(self, username):
+        with self._trava:
+            self._falhas.pop(self._chave(username), None)
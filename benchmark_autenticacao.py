@@ -0,0 +1,102 @@
+import os
+import sys
+import time
+import tempfile
+import threading
+import statistics
+
+# Mede o custo da autenticação em um banco temporário (o banco da loja não é tocado):
+# 1) user_loader: consulta à tabela user a cada requisição x cópia em cache;
+# 2) requisição autenticada (/alertas, consultada por todas as páginas) com e sem o cache;
+# 3) tempo de resposta de /alertas durante um pico de logins, com o hash limitado a
+#    SENHA_WORKERS threads x um hash por login simultâneo (como era antes do pool).
+# Uso: python benchmark_autenticacao.py [requisicoes] [logins_simultaneos]
+PASTA = tempfile.mkdtemp(prefix='benchmark_autenticacao_')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(PASTA, 'loja.db')}"
+os.environ['ARQUIVO_DATABASE'] = os.path.join(PASTA, 'arquivo.db')
+os.environ['LOJAS_PASTA'] = os.path.join(PASTA, 'lojas')
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from app import app, preparar_banco
+from extensoes import db, autenticador
+from modelos import User
+
+def cronometrar(funcao, vezes):
+    tempos = []
+    for _ in range(vezes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    return tempos
+
+def resumo(tempos):
+    return f'mediana {statistics.median(tempos):.3f} ms  p95 {statistics.quantiles(tempos, n=20)[-1]:.3f} ms'
+
+def medir_loader(vezes):
+    with app.test_request_context():
+        user_id = User.query.filter_by(username='admin').first().id
+
+        def consulta():
+            db.session.get(User, user_id)
+            db.session.remove()
+
+        def cache():
+            autenticador.carregar_usuario(user_id)
+            db.session.remove()
+        return cronometrar(consulta, vezes), cronometrar(cache, vezes)
+
+def medir_requisicoes(cliente, vezes, cache_segundos):
+    autenticador.cache_segundos = cache_segundos
+    autenticador.esquecer_usuario()
+    cliente.get('/alertas')
+    return cronometrar(lambda: cliente.get('/alertas'), vezes)
+
+def medir_pico(cliente, logins, workers):
+    autenticador.workers = workers
+    autenticador._executor = None
+    autenticador._vagas = threading.BoundedSemaphore(workers + logins)
+    autenticador.limpar_falhas('admin')
+    tempos, fim = [], threading.Event()
+
+    def logar():
+        app.test_client().post('/login', data={'username': 'admin', 'password': '123'})
+
+    def aguardar(threads):
+        for thread in threads:
+            thread.join()
+        fim.set()
+
+    threads = [threading.Thread(target=logar) for _ in range(logins)]
+    inicio = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    vigia = threading.Thread(target=aguardar, args=(threads,))
+    vigia.start()
+    while not fim.is_set():
+        tempos.extend(cronometrar(lambda: cliente.get('/alertas'), 1))
+    vigia.join()
+    return tempos, time.perf_counter() - inicio
+
+if __name__ == '__main__':
+    vezes = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    logins = int(sys.argv[2]) if len(sys.argv) > 2 else 16
+    with app.app_context():
+        preparar_banco()
+    cliente = app.test_client()
+    cliente.post('/login', data={'username': 'admin', 'password': '123'})
+
+    consulta, cache = medir_loader(vezes)
+    print(f'user_loader ({vezes} chamadas)')
+    print(f'  consulta ao banco:  {resumo(consulta)}')
+    print(f'  cópia em cache:     {resumo(cache)}')
+
+    sem_cache = medir_requisicoes(cliente, vezes, 0)
+    com_cache = medir_requisicoes(cliente, vezes, 30)
+    print(f'GET /alertas autenticado ({vezes} requisições)')
+    print(f'  sem cache:          {resumo(sem_cache)}')
+    print(f'  com cache:          {resumo(com_cache)}')
+
+    print(f'GET /alertas durante {logins} logins simultâneos')
+    for workers, rotulo in ((logins, 'um hash por login'), (2, 'pool de 2 threads')):
+        tempos, duracao = medir_pico(cliente, logins, workers)
+        print(f'  {rotulo:<18}  {resumo(tempos)}  ({len(tempos)} requisições, logins em {duracao:.1f} s)')
@@ -0,0 +1,33 @@
+import os
+import sys
+import statistics
+import subprocess
+
+# Mede o "cold start": cada rodada é um processo Python novo que importa o app
+# e atende a primeira requisição, como acontece numa invocação serverless.
+# Uso: python benchmark_inicializacao.py [rodadas]
+CODIGO = r'''
+import time
+inicio = time.perf_counter()
+from app import app
+importado = time.perf_counter()
+resposta = app.test_client().get('/login')
+respondido = time.perf_counter()
+print(importado - inicio, respondido - inicio, resposta.status_code)
+'''
+
+def medir(rodadas):
+    importacao, primeira_resposta = [], []
+    for _ in range(rodadas):
+        saida = subprocess.run([sys.executable, '-c', CODIGO], capture_output=True, text=True,
+                               cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.split()
+        importacao.append(float(saida[0]) * 1000)
+        primeira_resposta.append(float(saida[1]) * 1000)
+    return importacao, primeira_resposta
+
+if __name__ == '__main__':
+    rodadas = int(sys.argv[1]) if len(sys.argv) > 1 else 15
+    importacao, primeira_resposta = medir(rodadas)
+    print(f'{rodadas} rodadas')
+    print(f'importação do app:  mediana {statistics.median(importacao):.1f} ms  (mín {min(importacao):.1f} ms)')
+    print(f'primeira resposta:  mediana {statistics.median(primeira_resposta):.1f} ms  (mín {min(primeira_resposta):.1f} ms)')
@@ -0,0 +1,76 @@
+from datetime import date, datetime, timedelta, timezone
+
+# ===== JANELAS DA AGENDA =====
+def janela(visao, referencia):
+    # Retorna (inicio, fim) inclusivos da semana (segunda a domingo) ou do mês de referencia
+    if visao == 'semana':
+        inicio = referencia - timedelta(days=referencia.weekday())
+        return inicio, inicio + timedelta(days=6)
+    inicio = referencia.replace(day=1)
+    proximo_mes = (inicio + timedelta(days=32)).replace(day=1)
+    return inicio, proximo_mes - timedelta(days=1)
+
+def deslocar(visao, referencia, passos):
+    # Data de referência da janela anterior (passos=-1) ou seguinte (passos=1)
+    if visao == 'semana':
+        return referencia + timedelta(weeks=passos)
+    mes = referencia.month - 1 + passos
+    return date(referencia.year + mes // 12, mes % 12 + 1, 1)
+
+# ===== ICALENDAR (RFC 5545) =====
+def _escapar(texto):
+    return (str(texto or '').replace('\\', '\\\\').replace(';', '\\;')
+            .replace(',', '\\,').replace('\r\n', '\\n').replace('\n', '\\n'))
+
+def _dobrar(linha):
+    # Linhas com mais de 75 octetos continuam na linha seguinte iniciada por espaço
+    dados = linha.encode('utf-8')
+    if len(dados) <= 75:
+        return linha + '\r\n'
+    partes = []
+    atual = ''
+    tamanho = 0
+    for caractere in linha:
+        n = len(caractere.encode('utf-8'))
+        if tamanho + n > 75:
+            partes.append(atual)
+            atual = ' '
+            tamanho = 1
+        atual += caractere
+        tamanho += n
+    partes.append(atual)
+    return '\r\n'.join(partes) + '\r\n'
+
+def cabecalho_ical(nome):
+    linhas = [
+        'BEGIN:VCALENDAR',
+        'VERSION:2.0',
+        'PRODID:-//Loja de Decoracoes//Agenda de Alugueis//PT',
+        'CALSCALE:GREGORIAN',
+        'METHOD:PUBLISH',
+        f'X-WR-CALNAME:{_escapar(nome)}',
+    ]
+    return ''.join(_dobrar(linha) for linha in linhas)
+
+def evento_ical(uid, inicio, fim, resumo, descricao='', local='', atualizado=None):
+    # Eventos de dia inteiro: DTEND é exclusivo, por isso o dia seguinte ao fim
+    fim = fim or inicio
+    # DTSTAMP é sempre em UTC (RFC 5545); datas sem fuso são horário local
+    carimbo = (atualizado or datetime.now()).astimezone(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+    linhas = [
+        'BEGIN:VEVENT',
+        f'UID:{uid}',
+        f'DTSTAMP:{carimbo}',
+        f'DTSTART;VALUE=DATE:{inicio.strftime("%Y%m%d")}',
+        f'DTEND;VALUE=DATE:{(fim + timedelta(days=1)).strftime("%Y%m%d")}',
+        f'SUMMARY:{_escapar(resumo)}',
+    ]
+    if descricao:
+        linhas.append(f'DESCRIPTION:{_escapar(descricao)}')
+    if local:
+        linhas.append(f'LOCATION:{_escapar(local)}')
+    linhas.append('END:VEVENT')
+    return ''.join(_dobrar(linha) for linha in linhas)
+
+def rodape_ical():
+    return _dobrar('END:VCALENDAR')
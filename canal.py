@@ -0,0 +1,151 @@
+import json
+import queue
+import threading
+from sqlalchemy import event
+
+# ===== CANAL DE EVENTOS (SERVER-SENT EVENTS) =====
+# Os navegadores conectados recebem mudanças de estoque e de aluguéis sem recarregar a
+# página. Uma thread por processo acompanha, para cada loja com alguém conectado, as
+# versões gravadas em Sincronizacao (versao/versao_transacoes): quando mudam, lê só os
+# produtos com versão nova e a diferença dos aluguéis ativos e publica deltas pequenos.
+# Por ler o banco, vê também os commits de outros workers; um commit neste processo
+# acorda a thread na hora, os dos outros aparecem em até CANAL_INTERVALO segundos.
+# Cada conexão tem uma fila limitada: cliente lento demais é desconectado e reconecta.
+TAMANHO_FILA = 100
+
+def mensagem_sse(tipo, dados):
+    return f'event: {tipo}\ndata: {json.dumps(dados, default=str, separators=(",", ":"))}\n\n'
+
+class Assinatura:
+    def __init__(self, slug):
+        self.slug = slug
+        self.fila = queue.Queue(maxsize=TAMANHO_FILA)
+        self.descartada = False
+
+class EstadoLoja:
+    # Última versão vista de cada contador e a foto dos aluguéis ativos
+    def __init__(self, versao, versao_transacoes, alugueis):
+        self.versao = versao
+        self.versao_transacoes = versao_transacoes
+        self.alugueis = alugueis
+
+class CanalEventos:
+    def __init__(self):
+        self.app = None
+        self._assinaturas = {}
+        self._estados = {}
+        self._trava = threading.Lock()
+        self._acordar = threading.Event()
+        self._thread = None
+
+    def init_app(self, app):
+        from extensoes import db
+        self.app = app
+        self.intervalo = app.config.get('CANAL_INTERVALO', 1.0)
+        self.maximo_conexoes = app.config.get('CANAL_MAXIMO_CONEXOES', 200)
+        self.ping = app.config.get('CANAL_PING_SEGUNDOS', 15)
+        app.extensions['canal'] = self
+        if not event.contains(db.session, 'after_commit', self._commit):
+            event.listen(db.session, 'after_commit', self._commit)
+
+    def _commit(self, sessao):
+        if self._assinaturas:
+            self._acordar.set()
+
+    # ----- conexões -----
+    def assinar(self, slug):
+        # None quando o limite de conexões deste processo foi atingido
+        with self._trava:
+            if sum(len(assinaturas) for assinaturas in self._assinaturas.values()) >= self.maximo_conexoes:
+                return None
+            assinatura = Assinatura(slug)
+            self._assinaturas.setdefault(slug, set()).add(assinatura)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._acompanhar, name='canal-eventos', daemon=True)
+                self._thread.start()
+        self._acordar.set()
+        return assinatura
+
+    def cancelar(self, assinatura):
+        with self._trava:
+            assinaturas = self._assinaturas.get(assinatura.slug)
+            if assinaturas is not None:
+                assinaturas.discard(assinatura)
+                if not assinaturas:
+                    # Sem ninguém conectado, a loja deixa de ser acompanhada
+                    del self._assinaturas[assinatura.slug]
+                    self._estados.pop(assinatura.slug, None)
+
+    def publicar(self, slug, tipo, dados):
+        texto = mensagem_sse(tipo, dados)
+        with self._trava:
+            assinaturas = list(self._assinaturas.get(slug, ()))
+        for assinatura in assinaturas:
+            try:
+                assinatura.fila.put_nowait(texto)
+            except queue.Full:
+                assinatura.descartada = True
+
+    def fluxo(self, assinatura):
+        # Gerador da resposta; roda depois que a requisição terminou, sem sessão do banco
+        try:
+            yield f'retry: {int(self.ping * 1000)}\n\n'
+            yield mensagem_sse('pronto', {})
+            while not assinatura.descartada:
+                try:
+                    yield assinatura.fila.get(timeout=self.ping)
+                except queue.Empty:
+                    # Comentário SSE: mantém a conexão viva em proxies e detecta quem saiu
+                    yield ': ping\n\n'
+        finally:
+            self.cancelar(assinatura)
+
+    # ----- acompanhamento das lojas -----
+    def _acompanhar(self):
+        while True:
+            self._acordar.wait(self.intervalo)
+            self._acordar.clear()
+            with self._trava:
+                slugs = list(self._assinaturas)
+            for slug in slugs:
+                try:
+                    self._verificar(slug)
+                except Exception:
+                    self.app.logger.exception('Falha ao verificar eventos da loja %s', slug or 'principal')
+
+    def _verificar(self, slug):
+        from extensoes import db, lojas
+        from modelos import Produto, alugueis_ativos, versoes_atuais
+        with lojas.contexto(slug):
+            versao, versao_transacoes = versoes_atuais()
+            estado = self._estados.get(slug)
+            if estado is None:
+                # Primeira conexão da loja: só guarda o ponto de partida
+                self._estados[slug] = EstadoLoja(versao, versao_transacoes, self._indexar(alugueis_ativos()))
+                return
+            if versao < estado.versao or versao_transacoes < estado.versao_transacoes:
+                # Banco restaurado ou limpo: as telas precisam recarregar tudo
+                self._estados[slug] = EstadoLoja(versao, versao_transacoes, self._indexar(alugueis_ativos()))
+                self.publicar(slug, 'recarregar', {})
+                return
+            if versao != estado.versao:
+                quantidades = db.session.execute(
+                    db.select(Produto.id, Produto.quantidade).where(Produto.versao > estado.versao)).all()
+                estado.versao = versao
+                if quantidades:
+                    self.publicar(slug, 'estoque', {'versao': versao, 'produtos': {
+                        str(produto_id): quantidade or 0 for produto_id, quantidade in quantidades}})
+            if versao_transacoes != estado.versao_transacoes:
+                atuais = self._indexar(alugueis_ativos())
+                novos = [aluguel for aluguel_id, aluguel in atuais.items()
+                         if estado.alugueis.get(aluguel_id) != aluguel]
+                encerrados = [aluguel_id for aluguel_id in estado.alugueis if aluguel_id not in atuais]
+                estado.versao_transacoes, estado.alugueis = versao_transacoes, atuais
+                if novos or encerrados:
+                    self.publicar(slug, 'aluguel', {'ativos': novos, 'encerrados': encerrados})
+
+    @staticmethod
+    def _indexar(alugueis):
+        return {aluguel['id']: {**aluguel, 'data_inicio': str(aluguel['data_inicio'] or ''),
+                                'data_fim': str(aluguel['data_fim'] or '')}
+                for aluguel in alugueis}
@@ -0,0 +1,173 @@
+import os
+import json
+import hashlib
+import threading
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+# ===== DADOS DO COMPROVANTE =====
+def dados_comprovante(transacao):
+    # Cópia simples (sem objetos do SQLAlchemy) para poder ser usada fora da requisição
+    return {
+        'id': transacao.id,
+        'tipo': transacao.tipo,
+        'data': transacao.data.strftime('%Y-%m-%d %H:%M') if transacao.data else '',
+        'data_inicio': transacao.data_inicio.strftime('%Y-%m-%d') if transacao.data_inicio else '',
+        'data_fim': transacao.data_fim.strftime('%Y-%m-%d') if transacao.data_fim else '',
+        'cliente': transacao.cliente.nome if transacao.cliente else '',
+        'telefone': (transacao.cliente.telefone or '') if transacao.cliente else '',
+        'forma_pagamento': transacao.forma_pagamento or '',
+        'itens': [
+            {
+                'nome': item.nome,
+                'quantidade': item.quantidade,
+                'preco_unitario': item.preco_unitario or 0.0,
+                'total_item': item.total_item or 0.0
+            }
+            for item in transacao.itens
+        ],
+        'subtotal': transacao.total_itens,
+        'frete': transacao.frete or 0.0,
+        'servicos': transacao.servicos or 0.0,
+        'montagem': transacao.montagem or 0.0,
+        'desconto': transacao.desconto or 0.0,
+        'total': transacao.total or 0.0
+    }
+
+def chave_comprovante(dados):
+    # O nome do arquivo é o hash do conteúdo: qualquer edição gera outro arquivo
+    conteudo = json.dumps(dados, sort_keys=True, ensure_ascii=False).encode('utf-8')
+    return hashlib.sha256(conteudo).hexdigest()
+
+# ===== GERAÇÃO DO PDF =====
+def gerar_pdf(dados):
+    # reportlab só é importado quando um PDF é realmente gerado
+    from io import BytesIO
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.units import mm
+    from reportlab.pdfgen import canvas
+
+    titulo = 'Orçamento' if dados['tipo'] == 'Orcamento' else f"Comprovante de {dados['tipo']}"
+    buffer = BytesIO()
+    pdf = canvas.Canvas(buffer, pagesize=A4)
+    pdf.setTitle(f"{titulo} #{dados['id']}")
+    largura, altura = A4
+    esquerda, direita = 20 * mm, largura - 20 * mm
+    y = altura - 25 * mm
+
+    def linha(texto, valor=None, fonte='Helvetica', tamanho=10, espaco=6 * mm):
+        nonlocal y
+        if y < 30 * mm:
+            pdf.showPage()
+            y = altura - 25 * mm
+        pdf.setFont(fonte, tamanho)
+        pdf.drawString(esquerda, y, texto)
+        if valor is not None:
+            pdf.drawRightString(direita, y, valor)
+        y -= espaco
+
+    def moeda(valor):
+        return f'R$ {valor:.2f}'
+
+    linha(titulo, fonte='Helvetica-Bold', tamanho=16, espaco=10 * mm)
+    linha(f"ID da Transação: {dados['id']}")
+    linha(f"Data: {dados['data']}")
+    if dados['tipo'] == 'Aluguel':
+        linha(f"Período de Aluguel: de {dados['data_inicio']} a {dados['data_fim']}")
+    y -= 4 * mm
+    linha('Dados do Cliente', fonte='Helvetica-Bold', tamanho=12)
+    linha(f"Nome: {dados['cliente']}")
+    linha(f"Telefone: {dados['telefone']}")
+    y -= 4 * mm
+    linha('Detalhes da Transação', fonte='Helvetica-Bold', tamanho=12)
+    linha(f"Forma de Pagamento: {dados['forma_pagamento']}")
+    for item in dados['itens']:
+        linha(f"{item['nome']} - Qtd: {item['quantidade']} x {moeda(item['preco_unitario'])}", moeda(item['total_item']))
+    y -= 2 * mm
+    linha('Subtotal:', moeda(dados['subtotal']), fonte='Helvetica-Bold')
+    linha('Frete:', '+ ' + moeda(dados['frete']))
+    linha('Serviços:', '+ ' + moeda(dados['servicos']))
+    linha('Montagem:', '+ ' + moeda(dados['montagem']))
+    linha('Desconto:', '- ' + moeda(dados['desconto']))
+    linha('TOTAL:', moeda(dados['total']), fonte='Helvetica-Bold', tamanho=12, espaco=20 * mm)
+    linha('______________________________________')
+    linha('Assinatura do Cliente')
+    pdf.showPage()
+    pdf.save()
+    return buffer.getvalue()
+
+# ===== FILA DE RENDERIZAÇÃO =====
+class FilaComprovantes:
+    # Renderiza os PDFs em um pool de threads e guarda em pasta/<hash>.pdf.
+    # Pedidos repetidos para o mesmo conteúdo reaproveitam o arquivo ou a tarefa em andamento.
+    def __init__(self, pasta='comprovantes', max_workers=2):
+        self.pasta = pasta
+        self.max_workers = max_workers
+        self._executor = None
+        self._pendentes = {}
+        self._trava = threading.Lock()
+
+    def init_app(self, app):
+        # O pool de threads só é criado no primeiro PDF agendado
+        self.pasta = app.config.get('COMPROVANTES_FOLDER', self.pasta)
+        self.max_workers = app.config.get('COMPROVANTES_WORKERS', self.max_workers)
+        app.extensions['fila_comprovantes'] = self
+
+    def caminho(self, chave):
+        return os.path.join(self.pasta, f'{chave}.pdf')
+
+    def _executor_ativo(self):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='comprovantes')
+        return self._executor
+
+    def _renderizar(self, chave, dados):
+        destino = self.caminho(chave)
+        temporario = f'{destino}.{threading.get_ident()}.tmp'
+        try:
+            if not os.path.exists(destino):
+                os.makedirs(self.pasta, exist_ok=True)
+                with open(temporario, 'wb') as f:
+                    f.write(gerar_pdf(dados))
+                os.replace(temporario, destino)
+            return destino
+        finally:
+            # Também em caso de erro: o próximo pedido tenta de novo em vez de repetir a falha
+            with self._trava:
+                self._pendentes.pop(chave, None)
+            if os.path.exists(temporario):
+                os.remove(temporario)
+
+    def agendar(self, dados):
+        chave = chave_comprovante(dados)
+        with self._trava:
+            futuro = self._pendentes.get(chave)
+            if futuro is None:
+                if os.path.exists(self.caminho(chave)):
+                    return chave, None
+                futuro = self._executor_ativo().submit(self._renderizar, chave, dados)
+                self._pendentes[chave] = futuro
+        return chave, futuro
+
+    def obter(self, dados):
+        # Caminho do PDF pronto, esperando a renderização se ainda estiver na fila
+        chave, futuro = self.agendar(dados)
+        if futuro is not None:
+            futuro.result()
+        return self.caminho(chave)
+
+    def invalidar(self, dados):
+        caminho = self.caminho(chave_comprovante(dados))
+        if os.path.exists(caminho):
+            os.remove(caminho)
+
+    def exportar_zip(self, lista_dados, destino):
+        # Agenda todos de uma vez para aproveitar o pool e depois monta o zip
+        tarefas = [(dados, self.agendar(dados)) for dados in lista_dados]
+        with zipfile.ZipFile(destino, 'w', zipfile.ZIP_DEFLATED) as arquivo_zip:
+            for dados, (chave, futuro) in tarefas:
+                if futuro is not None:
+                    futuro.result()
+                nome = f"{dados['data'][:10]}_{dados['tipo'].lower()}_{dados['id']}.pdf"
+                arquivo_zip.write(self.caminho(chave), nome)
+        return destino
@@ -0,0 +1,77 @@
+import os
+
+# ===== CONFIGURAÇÕES =====
+# A classe usada é escolhida por LOJA_CONFIG (desenvolvimento, producao ou teste)
+class Config:
+    SECRET_KEY = os.environ.get('SECRET_KEY', 'sua_chave_secreta_aqui')
+    SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL', 'sqlite:///loja.db')
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    # Pastas de upload, backup e comprovantes (criadas no primeiro uso)
+    UPLOAD_FOLDER = 'static/uploads'
+    CLIENTES_FOLDER = 'static/clientes'
+    BACKUP_FOLDER = 'backups'
+    COMPROVANTES_FOLDER = 'comprovantes'
+
+    # Ponto de partida das entregas e tabela de frete por distância
+    LOJA_COORDENADAS = os.environ.get('LOJA_COORDENADAS', '-10.2596883,-63.2989983')
+    FRETE_BASE = float(os.environ.get('FRETE_BASE', 20.0))
+    FRETE_POR_KM = float(os.environ.get('FRETE_POR_KM', 2.5))
+    # Quantos dias de aluguéis passados e futuros entram no feed iCalendar
+    CALENDARIO_DIAS_PASSADOS = int(os.environ.get('CALENDARIO_DIAS_PASSADOS', 30))
+    CALENDARIO_DIAS_FUTUROS = int(os.environ.get('CALENDARIO_DIAS_FUTUROS', 365))
+    COMPROVANTES_WORKERS = int(os.environ.get('COMPROVANTES_WORKERS', 2))
+    # Antecedência dos lembretes de aluguel e intervalo de recarga completa (útil com vários workers)
+    VENCIMENTOS_ANTECEDENCIA_HORAS = int(os.environ.get('VENCIMENTOS_ANTECEDENCIA_HORAS', 24))
+    VENCIMENTOS_RECARGA_MINUTOS = int(os.environ.get('VENCIMENTOS_RECARGA_MINUTOS', 10))
+    VENCIMENTOS_THREAD = True
+    # Transações encerradas há mais de ARQUIVO_DIAS vão para o arquivo (instance/arquivo.db por padrão)
+    ARQUIVO_DIAS = int(os.environ.get('ARQUIVO_DIAS', 365))
+    ARQUIVO_DATABASE = os.environ.get('ARQUIVO_DATABASE')
+    # Várias lojas: um arquivo SQLite por loja em LOJAS_PASTA (instance/lojas por padrão).
+    # LOJA escolhe a loja dos comandos de linha (ex.: LOJA=centro flask --app app conferir-estoque)
+    LOJAS_PASTA = os.environ.get('LOJAS_PASTA')
+    LOJA_ATIVA = os.environ.get('LOJA')
+    LOJA_PRINCIPAL_NOME = os.environ.get('LOJA_PRINCIPAL_NOME', 'Loja principal')
+    LOJAS_WORKERS = int(os.environ.get('LOJAS_WORKERS', 4))
+    # Usuários (nomes separados por vírgula) que veem o consolidado de todas as lojas; a
+    # conta criada em /register fica na loja principal, mas não entra nesta lista
+    LOJAS_ADMINS = os.environ.get('LOJAS_ADMINS', 'admin')
+    # Perfilador por amostragem (página /perfil). PERFIL_ATIVO amostra PERFIL_FRACAO das
+    # requisições de cada endpoint (PERFIL_FRACOES muda por endpoint, ex.:
+    # "transacoes.finalizar_transacao=1"); administradores podem pedir com "X-Perfil: 1"
+    PERFIL_ATIVO = os.environ.get('PERFIL_ATIVO') == '1'
+    PERFIL_FRACAO = float(os.environ.get('PERFIL_FRACAO', 0.01))
+    PERFIL_FRACOES = os.environ.get('PERFIL_FRACOES')
+    PERFIL_INTERVALO_MS = float(os.environ.get('PERFIL_INTERVALO_MS', 5))
+    PERFIL_ADMINS = os.environ.get('PERFIL_ADMINS', 'admin')
+    # Canal de eventos (/eventos): intervalo de leitura das versões, limite de conexões
+    # por processo e intervalo do ping que mantém as conexões paradas vivas
+    CANAL_INTERVALO = float(os.environ.get('CANAL_INTERVALO', 1.0))
+    CANAL_MAXIMO_CONEXOES = int(os.environ.get('CANAL_MAXIMO_CONEXOES', 200))
+    CANAL_PING_SEGUNDOS = int(os.environ.get('CANAL_PING_SEGUNDOS', 15))
+    # Autenticação (ver autenticacao.py). SENHA_METODO é o custo dos hashes novos, no formato
+    # do werkzeug (ex.: "pbkdf2:sha256:600000" ou "scrypt"); os antigos são refeitos no login
+    AUTENTICACAO_CACHE_SEGUNDOS = int(os.environ.get('AUTENTICACAO_CACHE_SEGUNDOS', 30))
+    SENHA_METODO = os.environ.get('SENHA_METODO', 'pbkdf2:sha256')
+    SENHA_WORKERS = int(os.environ.get('SENHA_WORKERS', 2))
+    SENHA_FILA = int(os.environ.get('SENHA_FILA', 32))
+    LOGIN_TENTATIVAS = int(os.environ.get('LOGIN_TENTATIVAS', 5))
+    LOGIN_JANELA_SEGUNDOS = int(os.environ.get('LOGIN_JANELA_SEGUNDOS', 300))
+
+class Desenvolvimento(Config):
+    DEBUG = True
+
+class Producao(Config):
+    DEBUG = False
+
+class Teste(Config):
+    TESTING = True
+    VENCIMENTOS_THREAD = False
+    SQLALCHEMY_DATABASE_URI = 'sqlite://'
+
+CONFIGURACOES = {
+    'desenvolvimento': Desenvolvimento,
+    'producao': Producao,
+    'teste': Teste,
+}
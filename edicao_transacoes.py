@@ -0,0 +1,157 @@
+from datetime import datetime
+from itertools import chain
+from extensoes import db
+from modelos import Produto, Combo, ItemCombo, ItemTransacao, MovimentoEstoque, proxima_versao
+
+# ===== EDIÇÃO DOS ITENS DE UMA TRANSAÇÃO =====
+# Recebe a lista de itens desejada e aplica só a diferença para os itens gravados: linhas
+# novas, removidas e com quantidade alterada (itens que continuam iguais não são tocados e
+# mantêm o preço da época). O estoque é acertado pela diferença entre o que a transação
+# segurava antes e o que passa a segurar, já com os combos expandidos, em um único UPDATE
+# condicional: com duas vendas ao mesmo tempo nenhum produto fica negativo.
+TIPOS_ITEM = ('produto', 'combo')
+
+def retem_estoque(tipo, status):
+    # Venda tira do estoque de vez; aluguel só enquanto está ativo; orçamento nunca
+    if status == 'orcamento':
+        return False
+    return tipo == 'Venda' or (tipo == 'Aluguel' and status == 'ativo')
+
+def chave_item(item):
+    return ('combo', item.combo_id) if item.combo_id else ('produto', item.produto_id)
+
+def itens_atuais(transacao):
+    # {(tipo, id): quantidade} dos itens gravados
+    quantidades = {}
+    for item in transacao.itens:
+        quantidades[chave_item(item)] = quantidades.get(chave_item(item), 0) + (item.quantidade or 0)
+    return quantidades
+
+def ler_itens_formulario(formulario):
+    # Campos item_tipo, item_id e item_quantidade repetidos, um trio por linha.
+    # Quantidade zero remove o item; linhas repetidas são somadas.
+    tipos = formulario.getlist('item_tipo')
+    ids = formulario.getlist('item_id')
+    quantidades = formulario.getlist('item_quantidade')
+    if not len(tipos) == len(ids) == len(quantidades):
+        raise ValueError('Lista de itens incompleta.')
+    desejados = {}
+    for tipo, item_id, quantidade in zip(tipos, ids, quantidades):
+        if tipo not in TIPOS_ITEM:
+            raise ValueError(f'Tipo de item inválido: {tipo}.')
+        try:
+            quantidade = int(quantidade or 0)
+            chave = (tipo, int(item_id))
+        except ValueError:
+            raise ValueError('Item ou quantidade inválidos.')
+        if quantidade < 0:
+            raise ValueError('Quantidade não pode ser negativa.')
+        desejados[chave] = desejados.get(chave, 0) + quantidade
+    return {chave: quantidade for chave, quantidade in desejados.items() if quantidade}
+
+def _composicao(combo_ids):
+    # {combo_id: [(produto_id, quantidade por combo)]} em uma consulta
+    composicao = {}
+    if combo_ids:
+        for combo_id, produto_id, quantidade in db.session.execute(
+            db.select(ItemCombo.combo_id, ItemCombo.produto_id, ItemCombo.quantidade)
+            .where(ItemCombo.combo_id.in_(combo_ids))
+        ):
+            composicao.setdefault(combo_id, []).append((produto_id, quantidade or 0))
+    return composicao
+
+def unidades_por_produto(itens, composicao):
+    # {(tipo, id): quantidade} -> {produto_id: unidades}
+    unidades = {}
+    for (tipo, item_id), quantidade in itens.items():
+        partes = composicao.get(item_id, []) if tipo == 'combo' else [(item_id, 1)]
+        for produto_id, por_item in partes:
+            if produto_id is not None:
+                unidades[produto_id] = unidades.get(produto_id, 0) + por_item * quantidade
+    return unidades
+
+def acertar_estoque(deltas, transacao_id, motivo='edicao_transacao'):
+    # {produto_id: delta} em um UPDATE ... RETURNING só com os produtos que passaram na
+    # condição (saídas não podem deixar o estoque negativo) e um INSERT em lote no livro.
+    # Devolve os conflitos; com conflitos, quem chamou deve fazer rollback.
+    deltas = {produto_id: delta for produto_id, delta in deltas.items() if delta}
+    if not deltas:
+        return []
+    ajuste = db.case(deltas, value=Produto.id, else_=0)
+    atual = db.func.coalesce(Produto.quantidade, 0)
+    atualizados = set(db.session.execute(
+        db.update(Produto)
+        .where(Produto.id.in_(list(deltas)), db.or_(ajuste >= 0, atual + ajuste >= 0))
+        .values(quantidade=atual + ajuste, versao=proxima_versao())
+        .returning(Produto.id)
+        .execution_options(synchronize_session=False)
+    ).scalars())
+
+    # Devoluções de produtos que já foram excluídos não têm para onde voltar
+    faltando = [produto_id for produto_id, delta in deltas.items() if produto_id not in atualizados and delta < 0]
+    if faltando:
+        existentes = {produto_id: (nome, quantidade) for produto_id, nome, quantidade in db.session.execute(
+            db.select(Produto.id, Produto.nome, Produto.quantidade).where(Produto.id.in_(faltando)))}
+        return [{'produto_id': produto_id, 'nome': existentes.get(produto_id, (None, 0))[0],
+                 'solicitado': -deltas[produto_id], 'disponivel': existentes.get(produto_id, (None, 0))[1] or 0}
+                for produto_id in faltando]
+
+    if atualizados:
+        agora = datetime.now()
+        db.session.execute(db.insert(MovimentoEstoque), [
+            {'produto_id': produto_id, 'data': agora, 'delta': deltas[produto_id], 'motivo': motivo,
+             'transacao_id': transacao_id}
+            for produto_id in sorted(atualizados)
+        ])
+    return []
+
+def _novo_item(chave, quantidade, produtos, combos):
+    tipo, item_id = chave
+    if tipo == 'combo':
+        combo = combos.get(item_id)
+        if combo is None:
+            raise ValueError(f'Combo {item_id} não encontrado.')
+        return ItemTransacao(combo_id=combo.id, nome=combo.nome, quantidade=quantidade,
+                             preco_unitario=combo.preco_total, total_item=(combo.preco_total or 0) * quantidade)
+    produto = produtos.get(item_id)
+    if produto is None:
+        raise ValueError(f'Produto {item_id} não encontrado.')
+    return ItemTransacao(produto_id=produto.id, nome=produto.nome, quantidade=quantidade,
+                         preco_unitario=produto.preco_venda_aluguel,
+                         total_item=(produto.preco_venda_aluguel or 0) * quantidade)
+
+def editar_itens_transacao(transacao, desejados, tipo, status):
+    # Aplica tipo, status e a lista de itens desejada ({(tipo, id): quantidade}).
+    # Devolve os conflitos de estoque (lista vazia quando deu certo); não faz commit.
+    atuais = {}
+    for item in transacao.itens:
+        atuais.setdefault(chave_item(item), []).append(item)
+    antes = {chave: sum(item.quantidade or 0 for item in linhas) for chave, linhas in atuais.items()}
+
+    novos = [chave for chave in desejados if chave not in atuais]
+    produtos = {p.id: p for p in Produto.query.filter(Produto.id.in_([i for t, i in novos if t == 'produto']))} if novos else {}
+    combos = {c.id: c for c in Combo.query.filter(Combo.id.in_([i for t, i in novos if t == 'combo']))} if novos else {}
+    novos_itens = [_novo_item(chave, desejados[chave], produtos, combos) for chave in novos]
+
+    composicao = _composicao({item_id for tipo_item, item_id in chain(antes, desejados) if tipo_item == 'combo'})
+    retido_antes = unidades_por_produto(antes, composicao) if retem_estoque(transacao.tipo, transacao.status) else {}
+    retido_depois = unidades_por_produto(desejados, composicao) if retem_estoque(tipo, status) else {}
+    conflitos = acertar_estoque({produto_id: retido_antes.get(produto_id, 0) - retido_depois.get(produto_id, 0)
+                                 for produto_id in set(retido_antes) | set(retido_depois)}, transacao.id)
+    if conflitos:
+        return conflitos
+
+    for chave, linhas in atuais.items():
+        quantidade = desejados.get(chave, 0)
+        # Itens de produto/combo já excluído (sem id) ficam como estão
+        if quantidade == antes[chave] or chave[1] is None:
+            continue
+        principal, repetidas = (linhas[0], linhas[1:]) if quantidade else (None, linhas)
+        for item in repetidas:
+            transacao.itens.remove(item)
+        if principal is not None:
+            principal.quantidade = quantidade
+            principal.total_item = (principal.preco_unitario or 0) * quantidade
+    transacao.itens.extend(novos_itens)
+    transacao.tipo, transacao.status = tipo, status
+    return []
@@ -0,0 +1,108 @@
+from datetime import datetime
+import click
+from flask.cli import with_appcontext
+from extensoes import db
+from modelos import Produto, MovimentoEstoque, FotoEstoque
+
+# ===== FOTOS DO ESTOQUE =====
+# Estoque em uma data = última foto até a data + movimentos posteriores a ela até a data.
+# Com fotos periódicas (cron com "flask --app app fotografar-estoque"), a soma só
+# percorre os movimentos desde a última foto, não o livro inteiro.
+def ultima_foto(ate=None):
+    # (movimento_id, data) da foto mais recente, opcionalmente até uma data
+    consulta = db.select(FotoEstoque.movimento_id, FotoEstoque.data)
+    if ate is not None:
+        consulta = consulta.where(FotoEstoque.data <= ate)
+    return db.session.execute(consulta.order_by(FotoEstoque.data.desc(), FotoEstoque.movimento_id.desc()).limit(1)).first()
+
+def _quantidades_da_foto(movimento_id):
+    return dict(db.session.execute(
+        db.select(FotoEstoque.produto_id, FotoEstoque.quantidade).where(FotoEstoque.movimento_id == movimento_id)).all())
+
+def _somar_movimentos(quantidades, *filtro):
+    for produto_id, soma in db.session.execute(
+        db.select(MovimentoEstoque.produto_id, db.func.sum(MovimentoEstoque.delta))
+        .where(*filtro).group_by(MovimentoEstoque.produto_id)
+    ):
+        quantidades[produto_id] = quantidades.get(produto_id, 0) + soma
+    return quantidades
+
+def fotografar_estoque():
+    # A nova foto parte da anterior e soma só os movimentos desde então
+    anterior = ultima_foto()
+    movimento_anterior = anterior.movimento_id if anterior else 0
+    corte = db.session.execute(db.select(db.func.max(MovimentoEstoque.id))).scalar() or 0
+    if corte == movimento_anterior:
+        return 0
+    quantidades = _somar_movimentos(_quantidades_da_foto(movimento_anterior),
+                                    MovimentoEstoque.id > movimento_anterior, MovimentoEstoque.id <= corte)
+    agora = datetime.now()
+    db.session.execute(db.insert(FotoEstoque), [
+        {'produto_id': produto_id, 'data': agora, 'movimento_id': corte, 'quantidade': quantidade}
+        for produto_id, quantidade in quantidades.items()
+    ])
+    db.session.commit()
+    return len(quantidades)
+
+def estoque_em(momento):
+    # {produto_id: quantidade} no momento pedido (produtos sem movimento até lá não aparecem)
+    foto = ultima_foto(momento)
+    movimento_id = foto.movimento_id if foto else 0
+    quantidades = _quantidades_da_foto(movimento_id) if foto else {}
+    return _somar_movimentos(quantidades, MovimentoEstoque.id > movimento_id, MovimentoEstoque.data <= momento)
+
+def movimentos_do_produto(produto_id, limite=50):
+    return (MovimentoEstoque.query.filter_by(produto_id=produto_id)
+            .order_by(MovimentoEstoque.id.desc()).limit(limite).all())
+
+# ===== CONFERÊNCIA =====
+def divergencias_estoque():
+    # Uma única agregação sobre o livro inteiro: produtos cuja quantidade difere da soma dos movimentos
+    soma = db.func.coalesce(db.func.sum(MovimentoEstoque.delta), 0)
+    return db.session.execute(
+        db.select(Produto.id, Produto.nome, db.func.coalesce(Produto.quantidade, 0), soma)
+        .outerjoin(MovimentoEstoque, MovimentoEstoque.produto_id == Produto.id)
+        .group_by(Produto.id)
+        .having(db.func.coalesce(Produto.quantidade, 0) != soma)
+        .order_by(Produto.id)
+    ).all()
+
+def corrigir_divergencias(divergencias):
+    # Lança a diferença no livro; Produto.quantidade (o estoque contado) não muda
+    agora = datetime.now()
+    db.session.execute(db.insert(MovimentoEstoque), [
+        {'produto_id': produto_id, 'data': agora, 'delta': quantidade - soma, 'motivo': 'correcao'}
+        for produto_id, _, quantidade, soma in divergencias
+    ])
+    db.session.commit()
+
+@click.command('conferir-estoque')
+@click.option('--corrigir', is_flag=True, help='Lança as diferenças no livro como correção')
+@click.option('--sem-foto', is_flag=True, help='Não tira uma foto do estoque ao final')
+@with_appcontext
+def conferir_estoque_cli(corrigir, sem_foto):
+    # Ex.: flask --app app conferir-estoque --corrigir
+    divergencias = divergencias_estoque()
+    for produto_id, nome, quantidade, soma in divergencias:
+        click.echo(f'#{produto_id} {nome}: estoque {quantidade}, livro {soma} (diferença {quantidade - soma:+d})')
+    if divergencias and corrigir:
+        corrigir_divergencias(divergencias)
+        click.echo(f'{len(divergencias)} correções lançadas no livro.')
+    elif divergencias:
+        click.echo(f'{len(divergencias)} produtos divergentes.')
+    else:
+        click.echo('Estoque confere com o livro.')
+    if not sem_foto and (corrigir or not divergencias):
+        _tirar_foto()
+    if divergencias and not corrigir:
+        raise SystemExit(1)
+
+@click.command('fotografar-estoque')
+@with_appcontext
+def fotografar_estoque_cli():
+    # Para rodar periodicamente, ex. no cron: 0 3 * * * flask --app app fotografar-estoque
+    _tirar_foto()
+
+def _tirar_foto():
+    produtos = fotografar_estoque()
+    click.echo(f'Foto do estoque: {produtos} produtos.' if produtos else 'Nenhum movimento desde a última foto.')
@@ -0,0 +1,31 @@
+from flask_sqlalchemy import SQLAlchemy
+from flask_login import LoginManager
+from autenticacao import Autenticador
+from canal import CanalEventos
+from comprovantes import FilaComprovantes
+from lojas import SessaoLojas, GerenciadorLojas
+from perfil import Perfilador
+from vencimentos import AgendaVencimentos
+
+# Extensões criadas sem aplicação; create_app() liga cada uma com init_app
+# A sessão escolhe o banco da loja do usuário (ver lojas.py)
+db = SQLAlchemy(session_options={'class_': SessaoLojas})
+lojas = GerenciadorLojas()
+
+login_manager = LoginManager()
+login_manager.login_view = 'auth.login'
+
+# Usuário logado em cache, hash de senhas em pool e limite de tentativas (ver autenticacao.py)
+autenticador = Autenticador()
+
+# PDFs dos comprovantes gerados em segundo plano
+fila_comprovantes = FilaComprovantes()
+
+# Lembretes de retirada/devolução e atrasos dos aluguéis ativos
+agenda_vencimentos = AgendaVencimentos()
+
+# Amostragem de pilhas por endpoint, desligada por padrão (ver perfil.py)
+perfilador = Perfilador()
+
+# Estoque e aluguéis empurrados para os navegadores conectados (ver canal.py)
+canal = CanalEventos()
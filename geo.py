@@ -0,0 +1,158 @@
+import math
+
+RAIO_TERRA_KM = 6371.0088
+KM_POR_GRAU_LAT = 111.32
+
+# ===== COORDENADAS =====
+def parse_coordenadas(texto):
+    # Converte o texto livre "lat,lng" salvo em Cliente.coordenadas em números.
+    # Retorna None quando o texto está vazio ou fora dos limites válidos.
+    if not texto:
+        return None
+    partes = texto.replace(';', ',').split(',')
+    if len(partes) != 2:
+        return None
+    try:
+        lat = float(partes[0].strip())
+        lng = float(partes[1].strip())
+    except ValueError:
+        return None
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        return None
+    return lat, lng
+
+def distancia_km(lat1, lng1, lat2, lng2):
+    # Distância em linha reta (haversine) entre dois pontos
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lng2 - lng1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * RAIO_TERRA_KM * math.asin(min(1.0, math.sqrt(a)))
+
+def caixa_delimitadora(lat, lng, raio_km):
+    # Retângulo (lat_min, lat_max, lng_min, lng_max) que contém o círculo de raio_km.
+    # Usado para filtrar no banco pelas colunas indexadas antes do cálculo exato.
+    delta_lat = raio_km / KM_POR_GRAU_LAT
+    cos_lat = math.cos(math.radians(lat))
+    if cos_lat < 1e-6:
+        delta_lng = 180.0
+    else:
+        delta_lng = min(180.0, raio_km / (KM_POR_GRAU_LAT * cos_lat))
+    return lat - delta_lat, lat + delta_lat, lng - delta_lng, lng + delta_lng
+
+def estimar_frete(distancia, frete_base, frete_por_km):
+    return round(frete_base + distancia * frete_por_km, 2)
+
+# ===== ÍNDICE ESPACIAL EM GRADE =====
+class GradeEspacial:
+    # Divide o mapa em células de tamanho fixo (em graus). Cada consulta visita
+    # apenas as células próximas ao ponto, em vez de comparar com todos os pontos.
+    def __init__(self, tamanho_celula_km=2.0):
+        self.tamanho_celula = tamanho_celula_km / KM_POR_GRAU_LAT
+        self.celulas = {}
+        self.pontos = {}
+        # Limites das células já ocupadas (só crescem; servem de teto para a busca em anéis)
+        self.limites = None
+
+    def __len__(self):
+        return len(self.pontos)
+
+    def _celula(self, lat, lng):
+        return (math.floor(lat / self.tamanho_celula), math.floor(lng / self.tamanho_celula))
+
+    def inserir(self, chave, lat, lng):
+        if chave in self.pontos:
+            self.remover(chave)
+        self.pontos[chave] = (lat, lng)
+        i, j = self._celula(lat, lng)
+        self.celulas.setdefault((i, j), set()).add(chave)
+        if self.limites is None:
+            self.limites = [i, i, j, j]
+        else:
+            self.limites = [min(self.limites[0], i), max(self.limites[1], i),
+                            min(self.limites[2], j), max(self.limites[3], j)]
+
+    def remover(self, chave):
+        ponto = self.pontos.pop(chave, None)
+        if ponto is None:
+            return
+        celula = self._celula(*ponto)
+        chaves = self.celulas.get(celula)
+        if chaves is not None:
+            chaves.discard(chave)
+            if not chaves:
+                del self.celulas[celula]
+
+    def _celulas_no_anel(self, centro, anel):
+        ci, cj = centro
+        if anel == 0:
+            yield centro
+            return
+        for di in range(-anel, anel + 1):
+            yield (ci + di, cj - anel)
+            yield (ci + di, cj + anel)
+        for dj in range(-anel + 1, anel):
+            yield (ci - anel, cj + dj)
+            yield (ci + anel, cj + dj)
+
+    def proximos(self, lat, lng, raio_km):
+        # Lista de (chave, distância) dentro do raio, da mais próxima para a mais distante
+        lat_min, lat_max, lng_min, lng_max = caixa_delimitadora(lat, lng, raio_km)
+        i_min, j_min = self._celula(lat_min, lng_min)
+        i_max, j_max = self._celula(lat_max, lng_max)
+        resultados = []
+        if (i_max - i_min + 1) * (j_max - j_min + 1) > len(self.celulas):
+            candidatas = self.celulas.items()
+        else:
+            candidatas = (((i, j), self.celulas.get((i, j)))
+                          for i in range(i_min, i_max + 1) for j in range(j_min, j_max + 1))
+        for _, chaves in candidatas:
+            if not chaves:
+                continue
+            for chave in chaves:
+                plat, plng = self.pontos[chave]
+                d = distancia_km(lat, lng, plat, plng)
+                if d <= raio_km:
+                    resultados.append((chave, d))
+        resultados.sort(key=lambda r: r[1])
+        return resultados
+
+    def mais_proximo(self, lat, lng):
+        # Busca em anéis crescentes de células. Para quando o anel seguinte já
+        # está mais longe do que o melhor ponto encontrado.
+        if not self.pontos:
+            return None
+        centro = self._celula(lat, lng)
+        melhor = None
+        celula_km = self.tamanho_celula * KM_POR_GRAU_LAT * max(math.cos(math.radians(lat)), 1e-6)
+        i_min, i_max, j_min, j_max = self.limites
+        max_anel = max(abs(i_min - centro[0]), abs(i_max - centro[0]),
+                       abs(j_min - centro[1]), abs(j_max - centro[1]))
+        anel = 0
+        while anel <= max_anel:
+            for celula in self._celulas_no_anel(centro, anel):
+                for chave in self.celulas.get(celula, ()):
+                    plat, plng = self.pontos[chave]
+                    d = distancia_km(lat, lng, plat, plng)
+                    if melhor is None or d < melhor[1]:
+                        melhor = (chave, d)
+            if melhor is not None and melhor[1] <= anel * celula_km:
+                break
+            anel += 1
+        return melhor
+
+# ===== ROTEIRO DE ENTREGAS =====
+def roteiro_vizinho_mais_proximo(origem, paradas, tamanho_celula_km=2.0):
+    # origem: (lat, lng). paradas: dict {chave: (lat, lng)}.
+    # Retorna a ordem de visita como lista de (chave, distância do trecho em km).
+    grade = GradeEspacial(tamanho_celula_km)
+    for chave, (lat, lng) in paradas.items():
+        grade.inserir(chave, lat, lng)
+    atual = origem
+    ordem = []
+    while len(grade):
+        chave, d = grade.mais_proximo(*atual)
+        ordem.append((chave, d))
+        atual = grade.pontos[chave]
+        grade.remover(chave)
+    return ordem
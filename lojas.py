@@ -0,0 +1,204 @@
+import os
+import re
+import threading
+from contextlib import contextmanager
+import click
+import sqlalchemy as sa
+from flask import g, current_app, has_app_context
+from flask.cli import with_appcontext
+from flask_sqlalchemy.session import Session
+
+# ===== VÁRIAS LOJAS, UM BANCO POR LOJA =====
+# O banco configurado em SQLALCHEMY_DATABASE_URI é o central: guarda usuários e lojas
+# e é também o banco da loja principal (usuários sem loja), então uma instalação com
+# uma só loja continua igual. Cada loja cadastrada tem seu próprio arquivo SQLite
+# (LOJAS_PASTA/<slug>.db) com motor e pool de conexões próprios; a requisição usa o
+# banco da loja do usuário logado.
+TABELAS_CENTRAIS = {'user', 'loja'}
+FORMATO_SLUG = re.compile(r'^[a-z0-9][a-z0-9-]{0,39}$')
+_SEM_LOJA = object()
+
+def _tabelas_do_comando(clause):
+    try:
+        return {tabela.name for tabela in sa.sql.util.find_tables(clause, include_crud=True, include_joins=True)}
+    except Exception:
+        return set()
+
+class SessaoLojas(Session):
+    # Tudo vai para o banco da loja ativa, menos as tabelas centrais
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and has_app_context():
+            gerenciador = current_app.extensions.get('lojas')
+            slug = gerenciador.slug_ativa() if gerenciador else None
+            if slug:
+                if mapper is not None:
+                    central = sa.inspect(mapper).local_table.name in TABELAS_CENTRAIS
+                else:
+                    tabelas = _tabelas_do_comando(clause) if clause is not None else set()
+                    central = bool(tabelas) and tabelas <= TABELAS_CENTRAIS
+                if not central:
+                    return gerenciador.motor(slug)
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+class GerenciadorLojas:
+    def __init__(self):
+        self.app = None
+        self._motores = {}
+        self._agendas = {}
+        self._trava = threading.Lock()
+
+    def init_app(self, app):
+        self.app = app
+        self.admins = {nome.strip() for nome in app.config.get('LOJAS_ADMINS', 'admin').split(',') if nome.strip()}
+        app.extensions['lojas'] = self
+        app.before_request(self._ativar_loja_da_requisicao)
+        app.jinja_env.globals['ve_consolidado'] = self.ve_consolidado
+
+    def ve_consolidado(self, usuario):
+        # Números de todas as lojas: só administradores de LOJAS_ADMINS ligados à loja principal
+        return bool(usuario and usuario.is_authenticated and not usuario.loja_id
+                    and usuario.username in self.admins)
+
+    # ----- loja ativa -----
+    def slug_ativa(self):
+        # Na requisição: a loja do usuário. Fora dela (CLI, scripts): LOJA_ATIVA (variável LOJA)
+        slug = g.get('loja', _SEM_LOJA)
+        if slug is _SEM_LOJA:
+            slug = current_app.config.get('LOJA_ATIVA')
+        return slug or None
+
+    def ativar_usuario(self, usuario):
+        # Serve para o User do banco e para a cópia guardada pelo autenticador
+        g.loja = usuario.slug_loja
+
+    def _ativar_loja_da_requisicao(self):
+        from flask_login import current_user
+        if current_user.is_authenticated:
+            self.ativar_usuario(current_user)
+
+    @contextmanager
+    def contexto(self, slug):
+        # Contexto de aplicação novo (sessão própria) já apontando para a loja; para
+        # threads, comandos e tarefas que percorrem várias lojas
+        with self.app.app_context():
+            g.loja = slug
+            yield
+
+    # ----- motores -----
+    def caminho(self, slug, arquivo=False):
+        pasta = self.app.config.get('LOJAS_PASTA') or os.path.join(self.app.instance_path, 'lojas')
+        return os.path.join(pasta, f"{slug}{'_arquivo' if arquivo else ''}.db")
+
+    def em_memoria(self):
+        return self.app.config['SQLALCHEMY_DATABASE_URI'] in ('sqlite://', 'sqlite:///:memory:')
+
+    def motor(self, slug):
+        motor = self._motores.get(slug)
+        if motor is None:
+            with self._trava:
+                motor = self._motores.get(slug)
+                if motor is None:
+                    motor = self._motores[slug] = self._criar_motor(slug)
+        return motor
+
+    def _criar_motor(self, slug):
+        from arquivo import anexar_arquivo
+        if not FORMATO_SLUG.match(slug):
+            raise ValueError(f'Loja inválida: {slug!r}')
+        opcoes = dict(self.app.config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+        if self.em_memoria():
+            motor = sa.create_engine('sqlite://', poolclass=sa.pool.StaticPool,
+                                     connect_args={'check_same_thread': False}, **opcoes)
+            anexar_arquivo(motor, ':memory:')
+        else:
+            caminho = self.caminho(slug)
+            os.makedirs(os.path.dirname(caminho), exist_ok=True)
+            motor = sa.create_engine(f'sqlite:///{caminho}', **opcoes)
+            anexar_arquivo(motor, self.caminho(slug, arquivo=True))
+        return motor
+
+    def motor_atual(self):
+        from extensoes import db
+        slug = self.slug_ativa()
+        return self.motor(slug) if slug else db.engine
+
+    def tabelas_da_loja(self):
+        from extensoes import db
+        return [tabela for tabela in db.metadata.sorted_tables if tabela.name not in TABELAS_CENTRAIS]
+
+    def recriar_tabelas(self):
+        # Limpeza/restauração de uma loja: usuários e lojas (centrais) ficam intactos
+        from extensoes import db
+        motor = self.motor_atual()
+        db.metadata.drop_all(motor, tables=self.tabelas_da_loja())
+        db.metadata.create_all(motor, tables=self.tabelas_da_loja())
+
+    # ----- agenda de vencimentos de cada loja -----
+    def agenda(self):
+        from extensoes import agenda_vencimentos
+        slug = self.slug_ativa()
+        if not slug:
+            return agenda_vencimentos
+        agenda = self._agendas.get(slug)
+        if agenda is None:
+            with self._trava:
+                agenda = self._agendas.get(slug)
+                if agenda is None:
+                    agenda = self._agendas[slug] = self._criar_agenda(slug)
+        return agenda
+
+    def _criar_agenda(self, slug):
+        from vencimentos import AgendaVencimentos
+        from modelos import alugueis_ativos
+
+        def carregar():
+            # Chamado pela agenda dentro de um app_context novo
+            g.loja = slug
+            return alugueis_ativos()
+
+        agenda = AgendaVencimentos()
+        agenda.configurar(self.app, carregar)
+        return agenda
+
+    def backup_folder(self):
+        pasta = self.app.config['BACKUP_FOLDER']
+        slug = self.slug_ativa()
+        return os.path.join(pasta, slug) if slug else pasta
+
+# ===== COMANDOS =====
+@click.command('criar-loja')
+@click.argument('slug')
+@click.argument('nome')
+@with_appcontext
+def criar_loja_cli(slug, nome):
+    # Ex.: flask --app app criar-loja centro "Loja do Centro"
+    from extensoes import db
+    from modelos import Loja, atualizar_esquema
+    if not FORMATO_SLUG.match(slug):
+        raise click.BadParameter('use letras minúsculas, números e hífen', param_hint='SLUG')
+    if Loja.query.filter_by(slug=slug).first():
+        raise click.ClickException(f'A loja {slug} já existe.')
+    db.session.add(Loja(slug=slug, nome=nome))
+    db.session.commit()
+    gerenciador = current_app.extensions['lojas']
+    with gerenciador.contexto(slug):
+        atualizar_esquema()
+    click.echo(f'Loja {nome} criada em {gerenciador.caminho(slug)}')
+
+@click.command('definir-loja')
+@click.argument('usuario')
+@click.argument('slug', required=False)
+@with_appcontext
+def definir_loja_cli(usuario, slug):
+    # Sem SLUG o usuário volta para a loja principal
+    from extensoes import db
+    from modelos import Loja, User
+    user = User.query.filter_by(username=usuario).first()
+    if user is None:
+        raise click.ClickException(f'Usuário {usuario} não encontrado.')
+    loja = Loja.query.filter_by(slug=slug).first() if slug else None
+    if slug and loja is None:
+        raise click.ClickException(f'Loja {slug} não encontrada.')
+    user.loja_id = loja.id if loja else None
+    db.session.commit()
+    click.echo(f"{usuario} agora usa a loja {loja.nome if loja else 'principal'}.")
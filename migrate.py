@@ -1,7 +1,9 @@
 import os
 import json
 from datetime import datetime, date
-from app import app, db, Produto, Cliente, Transacao, Combo, ItemTransacao, ItemCombo
+from app import app
+from extensoes import db
+from modelos import Produto, Cliente, Transacao, Combo, ItemTransacao, ItemCombo
 
 # Função para carregar dados de um arquivo JSON
 def carregar_json(arquivo):
@@ -55,10 +57,10 @@ def migrate_data():
                 nome=c_data['nome'],
                 telefone=c_data.get('telefone'),
                 endereco=c_data.get('endereco'),
-                coordenadas=c_data.get('coordenadas'),
                 observacao=c_data.get('observacao'),
                 foto=c_data.get('foto')
             )
+            cliente.definir_coordenadas(c_data.get('coordenadas'))
             db.session.add(cliente)
             clientes_migrados[int(id_str)] = cliente
         db.session.commit()
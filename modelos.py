@@ -0,0 +1,466 @@
+import secrets
+from itertools import chain
+from datetime import datetime
+from sqlalchemy import event
+from sqlalchemy.schema import CreateIndex, CreateTable
+from sqlalchemy.orm import validates
+from flask_login import UserMixin
+from extensoes import db, lojas
+from geo import parse_coordenadas
+from utilidades import normalizar_busca, normalizar_telefone
+
+# ===== MODELOS DO BANCO DE DADOS =====
+# Loja e User ficam só no banco central; os demais, no banco de cada loja (lojas.py)
+class Loja(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    slug = db.Column(db.String(40), unique=True, nullable=False)
+    nome = db.Column(db.String(100), nullable=False)
+    criada_em = db.Column(db.DateTime, default=datetime.now)
+
+class User(UserMixin, db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    username = db.Column(db.String(100), unique=True, nullable=False)
+    password = db.Column(db.String(100), nullable=False)
+    token_calendario = db.Column(db.String(64), unique=True, index=True)
+    # Sem loja = loja principal (o próprio banco central)
+    loja_id = db.Column(db.Integer, db.ForeignKey('loja.id'), index=True)
+    loja = db.relationship(Loja, lazy=True)
+
+    @property
+    def slug_loja(self):
+        return self.loja.slug if self.loja_id and self.loja else None
+
+    def obter_token_calendario(self):
+        if not self.token_calendario:
+            self.token_calendario = secrets.token_urlsafe(32)
+            db.session.commit()
+        return self.token_calendario
+
+class Produto(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    nome = db.Column(db.String(100), nullable=False)
+    quantidade = db.Column(db.Integer, default=0)
+    tipo = db.Column(db.String(50))
+    preco_compra = db.Column(db.Float, default=0.0)
+    porcentagem_lucro = db.Column(db.Float, default=0.0)
+    preco_venda_aluguel = db.Column(db.Float, default=0.0)
+    foto = db.Column(db.String(255))
+    versao = db.Column(db.Integer, default=0, index=True)
+
+class Cliente(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    nome = db.Column(db.String(100), nullable=False)
+    telefone = db.Column(db.String(20))
+    endereco = db.Column(db.String(200))
+    coordenadas = db.Column(db.String(50))
+    latitude = db.Column(db.Float)
+    longitude = db.Column(db.Float)
+    observacao = db.Column(db.Text)
+    foto = db.Column(db.String(255))
+    versao = db.Column(db.Integer, default=0, index=True)
+    # Cópias normalizadas de nome e telefone para a busca por prefixo usar os índices
+    nome_busca = db.Column(db.String(100), index=True)
+    telefone_digitos = db.Column(db.String(20), index=True)
+    transacoes = db.relationship('Transacao', backref='cliente', lazy=True)
+    __table_args__ = (db.Index('ix_cliente_latitude_longitude', 'latitude', 'longitude'),)
+
+    @validates('nome')
+    def _validar_nome(self, chave, nome):
+        self.nome_busca = normalizar_busca(nome)
+        return nome
+
+    @validates('telefone')
+    def _validar_telefone(self, chave, telefone):
+        self.telefone_digitos = normalizar_telefone(telefone)
+        return telefone
+
+    def definir_coordenadas(self, texto):
+        self.coordenadas = texto
+        ponto = parse_coordenadas(texto)
+        self.latitude, self.longitude = ponto if ponto else (None, None)
+
+class Combo(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    nome = db.Column(db.String(100), nullable=False)
+    observacoes = db.Column(db.Text)
+    preco_total = db.Column(db.Float, default=0.0)
+    valores_adicionais = db.Column(db.Float, default=0.0)
+    versao = db.Column(db.Integer, default=0, index=True)
+    itens = db.relationship('ItemCombo', backref='combo', lazy=True, cascade='all, delete-orphan')
+
+class ItemCombo(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    combo_id = db.Column(db.Integer, db.ForeignKey('combo.id'), nullable=False, index=True)
+    # Índice reverso produto -> itens de combo, usado para achar os combos afetados por um preço
+    produto_id = db.Column(db.Integer, db.ForeignKey('produto.id'), nullable=False, index=True)
+    quantidade = db.Column(db.Integer, default=1)
+    # Excluir o produto remove a linha dele em cada combo (produto_id não pode ficar nulo)
+    produto = db.relationship('Produto', backref=db.backref('itens_combo', cascade='all, delete-orphan'), lazy=True)
+
+class Transacao(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    cliente_id = db.Column(db.Integer, db.ForeignKey('cliente.id'), nullable=False)
+    tipo = db.Column(db.String(50))
+    data = db.Column(db.DateTime, default=datetime.now)
+    data_inicio = db.Column(db.Date)
+    data_fim = db.Column(db.Date)
+    frete = db.Column(db.Float, default=0.0)
+    desconto = db.Column(db.Float, default=0.0)
+    servicos = db.Column(db.Float, default=0.0)
+    montagem = db.Column(db.Float, default=0.0)
+    forma_pagamento = db.Column(db.String(50))
+    total = db.Column(db.Float, default=0.0)
+    status = db.Column(db.String(50))
+    # Gerada no navegador; impede que a mesma venda seja gravada duas vezes (fila offline, duplo clique)
+    chave_idempotencia = db.Column(db.String(64), unique=True, index=True)
+    itens = db.relationship('ItemTransacao', backref='transacao', lazy=True, cascade='all, delete-orphan')
+    __table_args__ = (db.Index('ix_transacao_tipo_periodo', 'tipo', 'data_inicio', 'data_fim'),
+                      # Fim efetivo do aluguel (sem data_fim = aluguel de um dia): a agenda percorre
+                      # só os aluguéis que terminam depois do início da janela
+                      db.Index('ix_transacao_tipo_fim', 'tipo', db.func.coalesce(data_fim, data_inicio), 'data_inicio'),
+                      # AUTOINCREMENT: um id já usado (e talvez arquivado) nunca volta a ser distribuído
+                      {'sqlite_autoincrement': True})
+    arquivada = False
+    
+    @property
+    def total_itens(self):
+        return sum(item.total_item for item in self.itens)
+
+class ItemTransacao(db.Model):
+    __table_args__ = {'sqlite_autoincrement': True}
+    id = db.Column(db.Integer, primary_key=True)
+    transacao_id = db.Column(db.Integer, db.ForeignKey('transacao.id'), nullable=False, index=True)
+    produto_id = db.Column(db.Integer, db.ForeignKey('produto.id'), nullable=True)
+    combo_id = db.Column(db.Integer, db.ForeignKey('combo.id'), nullable=True)
+    nome = db.Column(db.String(100), nullable=False)
+    quantidade = db.Column(db.Integer, default=1)
+    preco_unitario = db.Column(db.Float, default=0.0)
+    total_item = db.Column(db.Float, default=0.0)
+
+# ===== ARQUIVO DE TRANSAÇÕES =====
+# Vendas finalizadas, aluguéis encerrados e orçamentos antigos são movidos por
+# "flask --app app arquivar-transacoes" para um segundo arquivo SQLite, anexado a
+# cada conexão como o esquema "arquivo" (ver arquivo.py). As tabelas repetem as
+# colunas de Transacao e ItemTransacao e ficam fora de db.metadata: o drop_all da
+# restauração de backup não apaga o arquivo.
+ESQUEMA_ARQUIVO = 'arquivo'
+metadados_arquivo = db.MetaData()
+
+def _tabela_arquivo(modelo, *indices):
+    colunas = [db.Column(c.name, c.type, primary_key=c.primary_key) for c in modelo.__table__.columns]
+    return db.Table(modelo.__tablename__, metadados_arquivo, *colunas, *indices, schema=ESQUEMA_ARQUIVO)
+
+class TransacaoArquivada(db.Model):
+    # Somente leitura: mesmos atributos de Transacao, para os templates e relatórios
+    __table__ = _tabela_arquivo(Transacao,
+                                db.Index('ix_arquivo_transacao_cliente_id', 'cliente_id'),
+                                db.Index('ix_arquivo_transacao_data', 'data'),
+                                db.Index('ix_arquivo_transacao_tipo_periodo', 'tipo', 'data_inicio', 'data_fim'),
+                                db.Index('ix_arquivo_transacao_chave_idempotencia', 'chave_idempotencia'))
+    arquivada = True
+    cliente = db.relationship(Cliente, primaryjoin='TransacaoArquivada.cliente_id == Cliente.id',
+                              foreign_keys='TransacaoArquivada.cliente_id', viewonly=True, lazy=True)
+    itens = db.relationship('ItemTransacaoArquivado', primaryjoin='TransacaoArquivada.id == ItemTransacaoArquivado.transacao_id',
+                            foreign_keys='ItemTransacaoArquivado.transacao_id', order_by='ItemTransacaoArquivado.id',
+                            viewonly=True, lazy=True)
+    total_itens = Transacao.total_itens
+
+class ItemTransacaoArquivado(db.Model):
+    __table__ = _tabela_arquivo(ItemTransacao, db.Index('ix_arquivo_item_transacao_transacao_id', 'transacao_id'))
+
+# Pares (transação, item) consultados pelos relatórios e pelo histórico: tabelas em uso e arquivo
+TABELAS_TRANSACOES = ((Transacao, ItemTransacao), (TransacaoArquivada, ItemTransacaoArquivado))
+
+# ===== LIVRO DE ESTOQUE =====
+# Toda mudança em Produto.quantidade vira uma linha de MovimentoEstoque no mesmo flush
+# (só inserções: o livro nunca é alterado). As rotas que sabem o motivo usam
+# movimentar_estoque(); o que sobrar (produto novo, restauração de backup) é lançado
+# pelo before_flush registrar_movimentos_estoque.
+MOTIVOS_ESTOQUE = {
+    'saldo_inicial': 'Saldo inicial',
+    'venda': 'Venda',
+    'aluguel': 'Saída para aluguel',
+    'devolucao': 'Devolução de aluguel',
+    'edicao_transacao': 'Edição de transação',
+    'entrada': 'Entrada manual',
+    'saida': 'Saída manual',
+    'edicao': 'Edição do produto',
+    'ajuste': 'Ajuste sem motivo',
+    'correcao': 'Correção da conferência',
+}
+
+class MovimentoEstoque(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    produto_id = db.Column(db.Integer, db.ForeignKey('produto.id'), nullable=False)
+    data = db.Column(db.DateTime, nullable=False, default=datetime.now, index=True)
+    delta = db.Column(db.Integer, nullable=False)
+    motivo = db.Column(db.String(20), nullable=False)
+    # Sem chave estrangeira: a transação pode ser apagada ou arquivada e o movimento continua
+    transacao_id = db.Column(db.Integer)
+    produto = db.relationship(Produto, lazy=True)
+    transacao = db.relationship(Transacao, primaryjoin='MovimentoEstoque.transacao_id == Transacao.id',
+                                foreign_keys='MovimentoEstoque.transacao_id', lazy=True)
+    __table_args__ = (db.Index('ix_movimento_estoque_produto_id', 'produto_id', 'id'),)
+
+class FotoEstoque(db.Model):
+    # Quantidade de cada produto depois do movimento movimento_id. Todas as linhas de uma
+    # mesma foto têm o mesmo movimento_id e a mesma data.
+    id = db.Column(db.Integer, primary_key=True)
+    produto_id = db.Column(db.Integer, nullable=False)
+    data = db.Column(db.DateTime, nullable=False, index=True)
+    movimento_id = db.Column(db.Integer, nullable=False)
+    quantidade = db.Column(db.Integer, nullable=False)
+    __table_args__ = (db.Index('ix_foto_estoque_movimento_produto', 'movimento_id', 'produto_id'),)
+
+# Versão global do catálogo para a sincronização offline do PWA.
+# Cada flush que altera produtos, combos ou clientes incrementa o contador uma vez.
+class Sincronizacao(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    versao = db.Column(db.Integer, default=0, nullable=False)
+    # Muda quando o banco é recriado (restauração/limpeza): os tablets refazem a cópia completa
+    epoca = db.Column(db.String(32), nullable=False, default=lambda: secrets.token_hex(8))
+    # Incrementado a cada flush que altera transações ou itens; invalida o cache dos relatórios
+    versao_transacoes = db.Column(db.Integer, default=0)
+
+class RegistroExclusao(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    tabela = db.Column(db.String(20), nullable=False)
+    registro_id = db.Column(db.Integer, nullable=False)
+    versao = db.Column(db.Integer, nullable=False, index=True)
+
+MODELOS_SINCRONIZADOS = {Produto: 'produtos', Combo: 'combos', Cliente: 'clientes'}
+
+def garantir_contador():
+    # INSERT direto (sem flush do ORM) porque também roda dentro do before_flush
+    if db.session.execute(db.select(Sincronizacao.id).where(Sincronizacao.id == 1)).first() is None:
+        db.session.execute(db.insert(Sincronizacao).values(id=1, versao=0, versao_transacoes=0, epoca=secrets.token_hex(8)))
+
+def estado_sincronizacao():
+    garantir_contador()
+    return db.session.get(Sincronizacao, 1)
+
+def proxima_versao():
+    # UPDATE atômico no contador; usado também pelos UPDATEs em massa que não passam pelo ORM
+    garantir_contador()
+    db.session.execute(db.update(Sincronizacao).where(Sincronizacao.id == 1).values(versao=Sincronizacao.versao + 1))
+    return db.session.execute(db.select(Sincronizacao.versao).where(Sincronizacao.id == 1)).scalar()
+
+def versoes_atuais():
+    # (versão do catálogo, versão das transações) lidas direto do banco, sem o mapa de identidade
+    garantir_contador()
+    return tuple(db.session.execute(
+        db.select(Sincronizacao.versao, Sincronizacao.versao_transacoes).where(Sincronizacao.id == 1)).one())
+
+@event.listens_for(db.session, 'before_flush')
+def marcar_versoes(sessao, contexto, instancias):
+    alterados = []
+    excluidos = []
+    with sessao.no_autoflush:
+        if any(isinstance(obj, (Transacao, ItemTransacao)) for obj in chain(sessao.new, sessao.dirty, sessao.deleted)):
+            garantir_contador()
+            db.session.execute(db.update(Sincronizacao).where(Sincronizacao.id == 1).values(
+                versao_transacoes=db.func.coalesce(Sincronizacao.versao_transacoes, 0) + 1))
+        for obj in list(sessao.new) + list(sessao.dirty):
+            if isinstance(obj, ItemCombo):
+                combo = obj.combo or (obj.combo_id and sessao.get(Combo, obj.combo_id))
+                if combo:
+                    alterados.append(combo)
+            elif type(obj) in MODELOS_SINCRONIZADOS and (obj in sessao.new or sessao.is_modified(obj)):
+                alterados.append(obj)
+        for obj in sessao.deleted:
+            if isinstance(obj, ItemCombo):
+                combo = obj.combo or (obj.combo_id and sessao.get(Combo, obj.combo_id))
+                if combo and combo not in sessao.deleted:
+                    alterados.append(combo)
+            elif type(obj) in MODELOS_SINCRONIZADOS:
+                excluidos.append(obj)
+        if not alterados and not excluidos:
+            return
+        versao = proxima_versao()
+        for obj in alterados:
+            obj.versao = versao
+        for obj in excluidos:
+            sessao.add(RegistroExclusao(tabela=MODELOS_SINCRONIZADOS[type(obj)], registro_id=obj.id, versao=versao))
+
+# Aluguéis alterados em cada commit atualizam só a sua entrada na agenda de vencimentos
+def aluguel_vencimento_dict(transacao):
+    return {
+        'id': transacao.id,
+        'cliente': transacao.cliente.nome if transacao.cliente else '',
+        'data_inicio': transacao.data_inicio,
+        'data_fim': transacao.data_fim
+    }
+
+def alugueis_ativos():
+    linhas = db.session.execute(
+        db.select(Transacao.id, Cliente.nome, Transacao.data_inicio, Transacao.data_fim)
+        .join(Cliente, Cliente.id == Transacao.cliente_id)
+        .where(Transacao.tipo == 'Aluguel', Transacao.status == 'ativo')
+    )
+    return [{'id': id_, 'cliente': nome, 'data_inicio': inicio, 'data_fim': fim} for id_, nome, inicio, fim in linhas]
+
+@event.listens_for(db.session, 'after_flush')
+def anotar_alugueis_alterados(sessao, contexto):
+    if not lojas.agenda().carregada():
+        return
+    pendentes = sessao.info.setdefault('vencimentos', {})
+    with sessao.no_autoflush:
+        for obj in list(sessao.new) + list(sessao.dirty):
+            if isinstance(obj, Transacao):
+                ativo = obj.tipo == 'Aluguel' and obj.status == 'ativo'
+                pendentes[obj.id] = aluguel_vencimento_dict(obj) if ativo else None
+        for obj in sessao.deleted:
+            if isinstance(obj, Transacao):
+                pendentes[obj.id] = None
+
+@event.listens_for(db.session, 'after_commit')
+def aplicar_alugueis_alterados(sessao):
+    for transacao_id, aluguel in sessao.info.pop('vencimentos', {}).items():
+        if aluguel is None:
+            lojas.agenda().remover(transacao_id)
+        else:
+            lojas.agenda().atualizar(aluguel)
+
+@event.listens_for(db.session, 'after_rollback')
+def descartar_alugueis_alterados(sessao):
+    sessao.info.pop('vencimentos', None)
+
+def movimentar_estoque(produto, delta, motivo, transacao=None):
+    if not delta:
+        return
+    produto.quantidade = (produto.quantidade or 0) + delta
+    db.session.add(MovimentoEstoque(produto=produto, delta=delta, motivo=motivo, transacao=transacao))
+
+@event.listens_for(db.session, 'before_flush')
+def registrar_movimentos_estoque(sessao, contexto, instancias):
+    # Diferença entre a quantidade gravada e a nova que não foi explicada por movimentar_estoque()
+    explicado = {}
+    for obj in sessao.new:
+        if isinstance(obj, MovimentoEstoque) and obj.produto is not None:
+            explicado[id(obj.produto)] = explicado.get(id(obj.produto), 0) + obj.delta
+    with sessao.no_autoflush:
+        for obj in chain(sessao.new, sessao.dirty):
+            if not isinstance(obj, Produto):
+                continue
+            estado = db.inspect(obj)
+            if estado.pending:
+                antes = 0
+            else:
+                historico = estado.attrs.quantidade.history
+                if not historico.has_changes():
+                    continue
+                if historico.deleted:
+                    antes = historico.deleted[0]
+                else:
+                    # Valor atribuído sem ter sido lido antes: o anterior está só no banco
+                    antes = sessao.execute(db.select(Produto.quantidade).where(Produto.id == obj.id)).scalar()
+            diferenca = (obj.quantidade or 0) - (antes or 0) - explicado.get(id(obj), 0)
+            if diferenca:
+                sessao.add(MovimentoEstoque(produto=obj, delta=diferenca,
+                                            motivo='saldo_inicial' if estado.pending else 'ajuste'))
+
+def abrir_livro_estoque():
+    # Bancos anteriores ao livro: o estoque atual de cada produto sem movimentos vira o saldo inicial
+    sem_movimentos = ~db.exists().where(MovimentoEstoque.produto_id == Produto.id)
+    db.session.execute(db.insert(MovimentoEstoque).from_select(
+        ['produto_id', 'data', 'delta', 'motivo'],
+        db.select(Produto.id, db.literal(datetime.now(), db.DateTime), Produto.quantidade, db.literal('saldo_inicial'))
+        .where(db.func.coalesce(Produto.quantidade, 0) != 0, sem_movimentos)
+    ))
+    db.session.commit()
+
+def recalcular_combos(combos_afetados):
+    # Recalcula preco_total de todos os combos afetados em um único UPDATE.
+    # combos_afetados é uma subconsulta (ou lista) de ids de combo.
+    soma_itens = db.select(
+        db.func.coalesce(db.func.sum(Produto.preco_venda_aluguel * ItemCombo.quantidade), 0.0)
+    ).select_from(ItemCombo).join(Produto, Produto.id == ItemCombo.produto_id).where(
+        ItemCombo.combo_id == Combo.id
+    ).scalar_subquery()
+    resultado = db.session.execute(
+        db.update(Combo)
+        .where(Combo.id.in_(combos_afetados))
+        .values(preco_total=db.func.coalesce(Combo.valores_adicionais, 0.0) + soma_itens,
+                versao=proxima_versao())
+        .execution_options(synchronize_session=False)
+    )
+    return resultado.rowcount
+
+def combos_com_produtos(produtos_afetados):
+    return db.select(ItemCombo.combo_id).where(ItemCombo.produto_id.in_(produtos_afetados)).distinct()
+
+def atualizar_esquema():
+    # db.create_all() só cria tabelas novas; colunas e índices acrescentados
+    # aos modelos depois são criados aqui em bancos já existentes.
+    # Roda no banco da loja ativa; o central (loja principal) também recebe usuários e lojas
+    motor = lojas.motor_atual()
+    tabelas = lojas.tabelas_da_loja() if lojas.slug_ativa() else db.metadata.sorted_tables
+    db.metadata.create_all(motor, tables=tabelas)
+    metadados_arquivo.create_all(motor)
+    with motor.begin() as conexao:
+        migrar_autoincremento(conexao)
+    inspetor = db.inspect(motor)
+    with motor.begin() as conexao:
+        for tabela in tabelas + metadados_arquivo.sorted_tables:
+            existentes = {c['name'] for c in inspetor.get_columns(tabela.name, schema=tabela.schema)}
+            for coluna in tabela.columns:
+                if coluna.name not in existentes:
+                    tipo = coluna.type.compile(dialect=motor.dialect)
+                    prefixo = f'"{tabela.schema}".' if tabela.schema else ''
+                    conexao.execute(db.text(f'ALTER TABLE {prefixo}"{tabela.name}" ADD COLUMN "{coluna.name}" {tipo}'))
+            for indice in tabela.indexes:
+                # IF NOT EXISTS em vez de checkfirst: a reflexão não entende índices de expressão
+                conexao.execute(CreateIndex(indice, if_not_exists=True))
+    reservar_ids_arquivados()
+    preencher_coordenadas_numericas()
+    preencher_busca_clientes()
+    abrir_livro_estoque()
+
+def migrar_autoincremento(conexao):
+    # O SQLite não acrescenta AUTOINCREMENT a uma tabela existente: bancos antigos ganham
+    # uma cópia criada pelo modelo atual, que substitui a original (os índices são
+    # recriados logo depois por atualizar_esquema)
+    for tabela in (Transacao.__table__, ItemTransacao.__table__):
+        sql = conexao.execute(db.text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = :nome"),
+                              {'nome': tabela.name}).scalar()
+        if sql is None or 'AUTOINCREMENT' in sql.upper():
+            continue
+        nova = f'{tabela.name}_nova'
+        ddl = str(CreateTable(tabela).compile(dialect=conexao.dialect))
+        conexao.execute(db.text(ddl.replace(f'CREATE TABLE {tabela.name} ', f'CREATE TABLE {nova} ', 1)))
+        existentes = {c['name'] for c in db.inspect(conexao).get_columns(tabela.name)}
+        colunas = ', '.join(f'"{c.name}"' for c in tabela.columns if c.name in existentes)
+        conexao.execute(db.text(f'INSERT INTO {nova} ({colunas}) SELECT {colunas} FROM {tabela.name}'))
+        conexao.execute(db.text(f'DROP TABLE {tabela.name}'))
+        conexao.execute(db.text(f'ALTER TABLE {nova} RENAME TO {tabela.name}'))
+
+def reservar_ids_arquivados():
+    # O contador do AUTOINCREMENT (sqlite_sequence) só conhece a tabela em uso: depois de
+    # migrar ou restaurar um banco, começa acima do maior id já arquivado
+    for modelo, arquivado in ((Transacao, TransacaoArquivada), (ItemTransacao, ItemTransacaoArquivado)):
+        maior = max(db.session.execute(db.select(db.func.max(m.id))).scalar() or 0 for m in (modelo, arquivado))
+        parametros = {'nome': modelo.__tablename__, 'maior': maior}
+        if db.session.execute(db.text('SELECT 1 FROM sqlite_sequence WHERE name = :nome'), parametros).first():
+            db.session.execute(db.text('UPDATE sqlite_sequence SET seq = :maior WHERE name = :nome AND seq < :maior'),
+                               parametros)
+        elif maior:
+            db.session.execute(db.text('INSERT INTO sqlite_sequence (name, seq) VALUES (:nome, :maior)'), parametros)
+    db.session.commit()
+
+def preencher_coordenadas_numericas():
+    pendentes = Cliente.query.filter(Cliente.coordenadas.isnot(None), Cliente.latitude.is_(None)).all()
+    for cliente in pendentes:
+        cliente.definir_coordenadas(cliente.coordenadas)
+    db.session.commit()
+
+def preencher_busca_clientes():
+    # UPDATE em lote pela chave primária, fora do flush: não muda a versão dos clientes
+    # (os tablets não precisam baixá-los de novo)
+    pendentes = db.session.execute(
+        db.select(Cliente.id, Cliente.nome, Cliente.telefone).where(Cliente.nome_busca.is_(None))).all()
+    if pendentes:
+        db.session.execute(db.update(Cliente), [
+            {'id': id_cliente, 'nome_busca': normalizar_busca(nome), 'telefone_digitos': normalizar_telefone(telefone)}
+            for id_cliente, nome, telefone in pendentes
+        ])
+    db.session.commit()
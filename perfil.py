@@ -0,0 +1,201 @@
+import os
+import sys
+import time
+import random
+import threading
+from collections import Counter
+from html import escape
+from flask import g, request, session
+
+# ===== PERFILADOR POR AMOSTRAGEM =====
+# Uma thread lê a pilha das threads que estão atendendo requisições escolhidas a cada
+# PERFIL_INTERVALO_MS (sys._current_frames, sem instrumentar chamadas) e soma as pilhas por
+# endpoint. Escolhidas: uma fração das requisições de cada endpoint quando PERFIL_ATIVO,
+# ou as de administradores com o cabeçalho "X-Perfil: 1" (ou com o perfil ligado pela
+# página /perfil). Sem nenhuma das duas, o custo por requisição é um teste de dicionário.
+# Cada processo tem os próprios dados (com vários workers, cada um mostra o seu).
+MAXIMO_PILHAS = 20000
+PROFUNDIDADE_MAXIMA = 200
+OUTRAS_PILHAS = ('[outras pilhas]',)
+
+def ler_fracoes(texto):
+    # "transacoes.finalizar_transacao=1,relatorios.relatorios=0.25" -> {endpoint: fração}
+    fracoes = {}
+    for parte in (texto or '').split(','):
+        if '=' in parte:
+            endpoint, fracao = parte.split('=', 1)
+            fracoes[endpoint.strip()] = float(fracao)
+    return fracoes
+
+class PerfilEndpoint:
+    def __init__(self):
+        self.pilhas = Counter()
+        self.requisicoes = 0
+        self.segundos = 0.0
+
+class Perfilador:
+    def __init__(self):
+        self.app = None
+        self.perfis = {}
+        self._alvos = {}
+        self._trava = threading.Lock()
+        self._acordar = threading.Condition(self._trava)
+        self._thread = None
+
+    def init_app(self, app):
+        self.app = app
+        self.ativo = app.config.get('PERFIL_ATIVO', False)
+        self.fracao = app.config.get('PERFIL_FRACAO', 0.01)
+        self.fracoes = ler_fracoes(app.config.get('PERFIL_FRACOES'))
+        self.intervalo = app.config.get('PERFIL_INTERVALO_MS', 5) / 1000
+        self.admins = {nome.strip() for nome in app.config.get('PERFIL_ADMINS', 'admin').split(',') if nome.strip()}
+        app.extensions['perfil'] = self
+        app.before_request(self._iniciar)
+        app.teardown_request(self._encerrar)
+        app.jinja_env.globals['perfil_admin'] = self.e_admin
+
+    # ----- quem pode e quem é amostrado -----
+    def e_admin(self, usuario):
+        return bool(usuario and usuario.is_authenticated and usuario.username in self.admins)
+
+    def _pedido_pelo_admin(self):
+        if request.headers.get('X-Perfil') != '1' and not session.get('perfil'):
+            return False
+        from flask_login import current_user
+        return self.e_admin(current_user)
+
+    def _iniciar(self):
+        endpoint = request.endpoint
+        if endpoint is None or endpoint == 'static' or endpoint.startswith('perfil.'):
+            return
+        escolhida = self.ativo and random.random() < self.fracoes.get(endpoint, self.fracao)
+        if not escolhida and not self._pedido_pelo_admin():
+            return
+        g.perfil_inicio = time.perf_counter()
+        with self._acordar:
+            self._alvos[threading.get_ident()] = endpoint
+            self._garantir_thread()
+            self._acordar.notify()
+
+    def _encerrar(self, erro=None):
+        inicio = g.pop('perfil_inicio', None)
+        if inicio is None:
+            return
+        with self._trava:
+            endpoint = self._alvos.pop(threading.get_ident(), None)
+            if endpoint is not None:
+                perfil = self.perfis.setdefault(endpoint, PerfilEndpoint())
+                perfil.requisicoes += 1
+                perfil.segundos += time.perf_counter() - inicio
+
+    # ----- amostragem -----
+    def _garantir_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._amostrar, name='perfilador', daemon=True)
+            self._thread.start()
+
+    def _amostrar(self):
+        while True:
+            with self._acordar:
+                # Dorme enquanto nenhuma requisição estiver sendo perfilada
+                while not self._alvos:
+                    self._acordar.wait()
+                alvos = dict(self._alvos)
+            quadros = sys._current_frames()
+            amostras = [(endpoint, self._pilha(quadros[ident])) for ident, endpoint in alvos.items() if ident in quadros]
+            with self._trava:
+                for endpoint, pilha in amostras:
+                    pilhas = self.perfis.setdefault(endpoint, PerfilEndpoint()).pilhas
+                    if pilha not in pilhas and len(pilhas) >= MAXIMO_PILHAS:
+                        pilha = OUTRAS_PILHAS
+                    pilhas[pilha] += 1
+            time.sleep(self.intervalo)
+
+    @staticmethod
+    def _pilha(quadro):
+        # Tupla de code objects da raiz até a folha; os nomes só são montados na exportação
+        codigos = []
+        while quadro is not None and len(codigos) < PROFUNDIDADE_MAXIMA:
+            codigos.append(quadro.f_code)
+            quadro = quadro.f_back
+        return tuple(reversed(codigos))
+
+    # ----- consulta e exportação -----
+    def resumo(self):
+        with self._trava:
+            linhas = [{'endpoint': endpoint, 'requisicoes': perfil.requisicoes,
+                       'amostras': sum(perfil.pilhas.values()), 'segundos': perfil.segundos}
+                      for endpoint, perfil in self.perfis.items()]
+        return sorted(linhas, key=lambda linha: linha['segundos'], reverse=True)
+
+    def limpar(self):
+        with self._trava:
+            self.perfis = {}
+
+    def pilhas_recolhidas(self, endpoint):
+        # Formato "collapsed" (flamegraph.pl, speedscope): "quadro;quadro;quadro contagem"
+        with self._trava:
+            perfil = self.perfis.get(endpoint)
+            pilhas = list(perfil.pilhas.items()) if perfil else []
+        recolhidas = Counter()
+        for pilha, contagem in pilhas:
+            recolhidas[';'.join(_nome_quadro(codigo) for codigo in pilha)] += contagem
+        return recolhidas
+
+    def texto_recolhido(self, endpoint):
+        return ''.join(f'{pilha} {contagem}\n' for pilha, contagem in sorted(self.pilhas_recolhidas(endpoint).items()))
+
+def _nome_quadro(codigo):
+    if isinstance(codigo, str):
+        return codigo
+    nome = getattr(codigo, 'co_qualname', codigo.co_name)
+    arquivo = os.path.basename(codigo.co_filename)
+    return f'{nome} ({arquivo}:{codigo.co_firstlineno})'.replace(';', ',')
+
+# ===== FLAMEGRAPH EM SVG =====
+LARGURA_SVG = 1200
+ALTURA_QUADRO = 16
+
+def desenhar_flamegraph(recolhidas, titulo):
+    # Árvore de chamadas a partir das pilhas; cada quadro é um retângulo com largura
+    # proporcional às amostras. A raiz fica embaixo, como no flamegraph.pl.
+    raiz = {'nome': 'todas', 'total': 0, 'filhos': {}}
+    for pilha, contagem in recolhidas.items():
+        raiz['total'] += contagem
+        no = raiz
+        for nome in pilha.split(';'):
+            no = no['filhos'].setdefault(nome, {'nome': nome, 'total': 0, 'filhos': {}})
+            no['total'] += contagem
+
+    retangulos = []
+    profundidade_maxima = 0
+    pendentes = [(raiz, 0.0, 0)]
+    while pendentes:
+        no, x, nivel = pendentes.pop()
+        largura = LARGURA_SVG * no['total'] / raiz['total'] if raiz['total'] else LARGURA_SVG
+        if largura < 0.3:
+            continue
+        retangulos.append((no, x, nivel, largura))
+        profundidade_maxima = max(profundidade_maxima, nivel)
+        filho_x = x
+        for filho in sorted(no['filhos'].values(), key=lambda filho: filho['nome']):
+            pendentes.append((filho, filho_x, nivel + 1))
+            filho_x += LARGURA_SVG * filho['total'] / raiz['total']
+
+    altura = (profundidade_maxima + 1) * ALTURA_QUADRO + 30
+    partes = [f'<svg xmlns="http://www.w3.org/2000/svg" width="{LARGURA_SVG}" height="{altura}" '
+              f'font-family="monospace" font-size="11">',
+              f'<text x="4" y="16" font-size="13">{escape(titulo)} - {raiz["total"]} amostras</text>']
+    for no, x, nivel, largura in retangulos:
+        y = altura - (nivel + 1) * ALTURA_QUADRO
+        porcentagem = 100 * no['total'] / raiz['total'] if raiz['total'] else 100
+        # Cor estável por nome: tons quentes, como no flamegraph.pl
+        tom = sum(map(ord, no['nome'])) % 60
+        texto = escape(no['nome'][:int(largura / 7)]) if largura > 35 else ''
+        partes.append(
+            f'<g><title>{escape(no["nome"])} ({no["total"]} amostras, {porcentagem:.1f}%)</title>'
+            f'<rect x="{x:.1f}" y="{y}" width="{largura:.1f}" height="{ALTURA_QUADRO - 1}" '
+            f'fill="rgb(230,{100 + tom * 2},{40 + tom})"/>'
+            f'<text x="{x + 3:.1f}" y="{y + 11}">{texto}</text></g>')
+    partes.append('</svg>')
+    return '\n'.join(partes)
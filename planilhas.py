@@ -0,0 +1,160 @@
+import csv
+import io
+import zipfile
+from datetime import date, datetime
+from xml.sax.saxutils import escape
+
+# ===== CSV =====
+# Separador ";" e vírgula decimal, como o Excel em português espera; o BOM faz
+# o Excel reconhecer o UTF-8 dos acentos.
+def _valor_csv(valor):
+    if valor is None:
+        return ''
+    if isinstance(valor, float):
+        return f'{valor:.2f}'.replace('.', ',')
+    if isinstance(valor, (date, datetime)):
+        return valor.strftime('%Y-%m-%d %H:%M' if isinstance(valor, datetime) else '%Y-%m-%d')
+    return valor
+
+def gerar_csv(cabecalho, linhas, linhas_por_bloco=500):
+    # Gera o arquivo em pedaços de bytes de linhas_por_bloco linhas
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer, delimiter=';', lineterminator='\r\n')
+    buffer.write('\ufeff')
+    escritor.writerow(cabecalho)
+    for numero, linha in enumerate(linhas, 1):
+        escritor.writerow([_valor_csv(valor) for valor in linha])
+        if numero % linhas_por_bloco == 0:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode('utf-8')
+
+# ===== XLSX =====
+# Um .xlsx é um zip de XMLs. A planilha é escrita linha a linha direto no zip, e o
+# zip em um destino sem seek (os bytes já gerados saem e são descartados), então
+# a memória não cresce com o número de linhas e não há dependência externa.
+CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '<Override PartName="/xl/styles.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+    '</Types>'
+)
+RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>'
+    '<Relationship Id="rId2" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" Target="styles.xml"/>'
+    '</Relationships>'
+)
+# Estilos: 0 = padrão, 1 = data (yyyy-mm-dd), 2 = data e hora, 3 = moeda com 2 casas
+STYLES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    '<numFmts count="2"><numFmt numFmtId="164" formatCode="yyyy\\-mm\\-dd"/>'
+    '<numFmt numFmtId="165" formatCode="yyyy\\-mm\\-dd\\ hh:mm"/></numFmts>'
+    '<fonts count="1"><font><sz val="11"/><name val="Calibri"/></font></fonts>'
+    '<fills count="2"><fill><patternFill patternType="none"/></fill><fill><patternFill patternType="gray125"/></fill></fills>'
+    '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+    '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+    '<cellXfs count="4"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+    '<xf numFmtId="164" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+    '<xf numFmtId="165" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+    '<xf numFmtId="4" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/></cellXfs>'
+    '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+    '</styleSheet>'
+)
+EPOCA_EXCEL = datetime(1899, 12, 30)
+
+def _workbook(nome_aba):
+    return (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        f'<sheets><sheet name="{escape(nome_aba[:31])}" sheetId="1" r:id="rId1"/></sheets></workbook>'
+    )
+
+def _celula(valor):
+    if valor is None or valor == '':
+        return '<c/>'
+    if isinstance(valor, bool):
+        return f'<c t="b"><v>{int(valor)}</v></c>'
+    if isinstance(valor, datetime):
+        return f'<c s="2"><v>{(valor - EPOCA_EXCEL).total_seconds() / 86400:.6f}</v></c>'
+    if isinstance(valor, date):
+        return f'<c s="1"><v>{(valor - EPOCA_EXCEL.date()).days}</v></c>'
+    if isinstance(valor, float):
+        return f'<c s="3"><v>{valor!r}</v></c>'
+    if isinstance(valor, int):
+        return f'<c><v>{valor}</v></c>'
+    # Caracteres de controle não são válidos em XML
+    texto = ''.join(ch for ch in str(valor) if ch >= ' ' or ch in '\t\n')
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{escape(texto)}</t></is></c>'
+
+class _SaidaEmFluxo:
+    # Destino do zip sem seek: acumula os bytes escritos até serem recolhidos
+    def __init__(self):
+        self._partes = []
+        self._posicao = 0
+
+    def write(self, dados):
+        self._partes.append(bytes(dados))
+        self._posicao += len(dados)
+        return len(dados)
+
+    def tell(self):
+        return self._posicao
+
+    def flush(self):
+        pass
+
+    def recolher(self):
+        dados = b''.join(self._partes)
+        self._partes.clear()
+        return dados
+
+def gerar_xlsx(cabecalho, linhas, nome_aba='Planilha1', linhas_por_bloco=500):
+    saida = _SaidaEmFluxo()
+    with zipfile.ZipFile(saida, 'w', zipfile.ZIP_DEFLATED) as arquivo_zip:
+        arquivo_zip.writestr('[Content_Types].xml', CONTENT_TYPES)
+        arquivo_zip.writestr('_rels/.rels', RELS)
+        arquivo_zip.writestr('xl/workbook.xml', _workbook(nome_aba))
+        arquivo_zip.writestr('xl/_rels/workbook.xml.rels', WORKBOOK_RELS)
+        arquivo_zip.writestr('xl/styles.xml', STYLES)
+        yield saida.recolher()
+
+        with arquivo_zip.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as planilha:
+            planilha.write(
+                b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+                b'<sheetViews><sheetView workbookViewId="0"><pane ySplit="1" topLeftCell="A2" state="frozen"/></sheetView></sheetViews>'
+                b'<sheetData>'
+            )
+            planilha.write(('<row>' + ''.join(_celula(str(titulo)) for titulo in cabecalho) + '</row>').encode('utf-8'))
+            bloco = []
+            for linha in linhas:
+                bloco.append('<row>' + ''.join(_celula(valor) for valor in linha) + '</row>')
+                if len(bloco) >= linhas_por_bloco:
+                    planilha.write(''.join(bloco).encode('utf-8'))
+                    bloco.clear()
+                    dados = saida.recolher()
+                    if dados:
+                        yield dados
+            planilha.write(''.join(bloco).encode('utf-8'))
+            planilha.write(b'</sheetData></worksheet>')
+    yield saida.recolher()
+
+FORMATOS = {
+    'csv': ('text/csv; charset=utf-8', gerar_csv),
+    'xlsx': ('application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', gerar_xlsx),
+}
@@ -0,0 +1 @@
+# Um blueprint por área da loja; registrados em app.create_app()
@@ -0,0 +1,194 @@
+from datetime import datetime, date, timedelta
+from flask import Blueprint, render_template, request, jsonify, Response, stream_with_context, abort, current_app, flash
+from flask_login import login_required, current_user
+from sqlalchemy.sql import operators
+from sqlalchemy.sql.expression import UnaryExpression
+from calendario import janela, deslocar, cabecalho_ical, evento_ical, rodape_ical
+from extensoes import db, lojas
+from geo import parse_coordenadas, distancia_km, estimar_frete, roteiro_vizinho_mais_proximo
+from modelos import User, Transacao
+from utilidades import formatar_data
+
+bp = Blueprint('agenda', __name__)
+
+def alugueis_no_periodo(inicio, fim, status=None):
+    # Aluguéis cujo período [data_inicio, data_fim] se sobrepõe à janela [inicio, fim].
+    # A faixa vem do índice (tipo, fim efetivo, data_inicio): só os aluguéis que terminam
+    # a partir de "inicio", sem passar pelo histórico anterior à janela. O "+" na frente
+    # de data_inicio impede o SQLite de trocar pelo índice (tipo, data_inicio, data_fim),
+    # que só limitaria a faixa pelo fim da janela.
+    inicio_sem_indice = UnaryExpression(Transacao.data_inicio, operator=operators.custom_op('+'),
+                                        type_=Transacao.data_inicio.type)
+    consulta = Transacao.query.filter(
+        Transacao.tipo == 'Aluguel',
+        db.func.coalesce(Transacao.data_fim, Transacao.data_inicio) >= inicio,
+        inicio_sem_indice <= fim
+    )
+    if status:
+        consulta = consulta.filter(Transacao.status == status)
+    return consulta.order_by(Transacao.data_inicio)
+
+def evento_aluguel_dict(aluguel):
+    return {
+        'id': aluguel.id,
+        'cliente': aluguel.cliente.nome,
+        'inicio': formatar_data(aluguel.data_inicio),
+        'fim': formatar_data(aluguel.data_fim or aluguel.data_inicio),
+        'status': aluguel.status,
+        'total': aluguel.total,
+        'itens': [{'nome': item.nome, 'quantidade': item.quantidade} for item in aluguel.itens]
+    }
+
+def ler_janela_agenda():
+    visao = request.args.get('visao', 'mes')
+    if visao not in ('semana', 'mes'):
+        visao = 'mes'
+    referencia = ler_data_parametro('data') or date.today()
+    return visao, referencia
+
+def ler_data_parametro(nome):
+    # AAAA-MM-DD da query string; data inválida é erro do cliente (400), não do servidor
+    texto = request.args.get(nome)
+    if not texto:
+        return None
+    try:
+        return datetime.strptime(texto, '%Y-%m-%d').date()
+    except ValueError:
+        abort(400, description=f'Data inválida em "{nome}": use AAAA-MM-DD.')
+
+def planejar_roteiro(dia):
+    # Entregas (aluguéis que começam no dia) e retiradas (que terminam no dia),
+    # ordenadas pela heurística do vizinho mais próximo a partir da loja.
+    alugueis = Transacao.query.filter(
+        Transacao.tipo == 'Aluguel',
+        Transacao.status == 'ativo',
+        db.or_(Transacao.data_inicio == dia, Transacao.data_fim == dia)
+    ).all()
+
+    origem = parse_coordenadas(current_app.config['LOJA_COORDENADAS'])
+    paradas = {}
+    sem_coordenadas = []
+    for aluguel in alugueis:
+        cliente = aluguel.cliente
+        if cliente.latitude is None or cliente.longitude is None:
+            sem_coordenadas.append(aluguel)
+            continue
+        if aluguel.data_inicio == dia:
+            paradas[(aluguel.id, 'entrega')] = (cliente.latitude, cliente.longitude)
+        if aluguel.data_fim == dia:
+            paradas[(aluguel.id, 'retirada')] = (cliente.latitude, cliente.longitude)
+
+    por_id = {aluguel.id: aluguel for aluguel in alugueis}
+    roteiro = []
+    distancia_total = 0.0
+    for (transacao_id, operacao), trecho_km in roteiro_vizinho_mais_proximo(origem, paradas):
+        aluguel = por_id[transacao_id]
+        distancia_loja = distancia_km(origem[0], origem[1], aluguel.cliente.latitude, aluguel.cliente.longitude)
+        distancia_total += trecho_km
+        roteiro.append({
+            'transacao': aluguel,
+            'operacao': operacao,
+            'trecho_km': round(trecho_km, 2),
+            'distancia_loja_km': round(distancia_loja, 2),
+            'frete_estimado': estimar_frete(distancia_loja, current_app.config['FRETE_BASE'], current_app.config['FRETE_POR_KM'])
+        })
+    return roteiro, sem_coordenadas, round(distancia_total, 2)
+
+# Agenda
+@bp.route('/agenda')
+@login_required
+def agenda():
+    visao, referencia = ler_janela_agenda()
+    inicio, fim = janela(visao, referencia)
+    agenda_vencimentos = lojas.agenda()
+    agenda_vencimentos.garantir_carregado()
+    # Aluguéis ativos que começam até o fim da janela continuam aparecendo,
+    # inclusive os vencidos; os finalizados ficam restritos à janela.
+    alugueis_ativos = Transacao.query.filter(
+        Transacao.tipo == 'Aluguel',
+        Transacao.status == 'ativo',
+        db.or_(Transacao.data_inicio.is_(None), Transacao.data_inicio <= fim)
+    ).order_by(Transacao.data_inicio).all()
+    alugueis_finalizados = alugueis_no_periodo(inicio, fim, status='finalizado').all()
+    return render_template('agenda.html', alugueis_ativos=alugueis_ativos, alugueis_finalizados=alugueis_finalizados,
+                           visao=visao, inicio=inicio, fim=fim,
+                           anterior=deslocar(visao, referencia, -1), seguinte=deslocar(visao, referencia, 1),
+                           hoje=date.today(), token_calendario=current_user.obter_token_calendario(),
+                           atrasados=agenda_vencimentos.atrasados)
+
+@bp.route('/agenda/eventos')
+@login_required
+def agenda_eventos():
+    visao, referencia = ler_janela_agenda()
+    if request.args.get('inicio') and request.args.get('fim'):
+        inicio, fim = ler_data_parametro('inicio'), ler_data_parametro('fim')
+    else:
+        inicio, fim = janela(visao, referencia)
+    alugueis = alugueis_no_periodo(inicio, fim, status=request.args.get('status')).options(
+        db.joinedload(Transacao.cliente), db.selectinload(Transacao.itens)).all()
+    return jsonify({
+        'inicio': formatar_data(inicio),
+        'fim': formatar_data(fim),
+        'eventos': [evento_aluguel_dict(aluguel) for aluguel in alugueis]
+    })
+
+@bp.route('/alertas')
+@login_required
+def alertas():
+    # Consultado periodicamente pelo static/notifications.js; "desde" é o id do último alerta recebido.
+    # processar() aqui cobre ambientes sem a thread em segundo plano (ex.: serverless).
+    agenda_vencimentos = lojas.agenda()
+    agenda_vencimentos.garantir_carregado()
+    agenda_vencimentos.processar()
+    novos, ultimo = agenda_vencimentos.alertas_desde(request.args.get('desde', 0, type=int))
+    return jsonify({'alertas': novos, 'ultimo': ultimo, **agenda_vencimentos.resumo()})
+
+@bp.route('/agenda/<token>.ics')
+def agenda_ical(token):
+    # Feed de assinatura para celulares: autenticado pelo token do usuário, não pela sessão
+    usuario = User.query.filter_by(token_calendario=token).first()
+    if not usuario:
+        abort(404)
+    lojas.ativar_usuario(usuario)
+    hoje = date.today()
+    inicio = hoje - timedelta(days=current_app.config['CALENDARIO_DIAS_PASSADOS'])
+    fim = hoje + timedelta(days=current_app.config['CALENDARIO_DIAS_FUTUROS'])
+
+    def gerar():
+        yield cabecalho_ical('Agenda de Aluguéis')
+        consulta = alugueis_no_periodo(inicio, fim).filter(Transacao.status.in_(['ativo', 'finalizado'])).options(
+            db.joinedload(Transacao.cliente), db.selectinload(Transacao.itens))
+        for aluguel in consulta.yield_per(200):
+            itens = ', '.join(f'{item.nome} (Qtd: {item.quantidade})' for item in aluguel.itens)
+            resumo = f'Aluguel #{aluguel.id} - {aluguel.cliente.nome}'
+            if aluguel.status == 'finalizado':
+                resumo += ' (devolvido)'
+            yield evento_ical(
+                uid=f'aluguel-{aluguel.id}@loja',
+                inicio=aluguel.data_inicio,
+                fim=aluguel.data_fim,
+                resumo=resumo,
+                descricao=f'Itens: {itens}\nTotal: R$ {aluguel.total or 0:.2f}',
+                local=aluguel.cliente.endereco,
+                atualizado=aluguel.data
+            )
+        yield rodape_ical()
+
+    return Response(stream_with_context(gerar()), mimetype='text/calendar',
+                    headers={'Content-Disposition': 'inline; filename="agenda.ics"'})
+
+@bp.route('/planejar_entregas')
+@login_required
+def planejar_entregas():
+    data_str = request.args.get('data')
+    dia = date.today()
+    if data_str:
+        try:
+            dia = datetime.strptime(data_str, '%Y-%m-%d').date()
+        except ValueError:
+            flash("Data inválida; mostrando o roteiro de hoje.", "warning")
+    roteiro, sem_coordenadas, distancia_total = planejar_roteiro(dia)
+    frete_total = sum(parada['frete_estimado'] for parada in roteiro)
+    return render_template('planejar_entregas.html', dia=dia, roteiro=roteiro,
+                           sem_coordenadas=sem_coordenadas, distancia_total=distancia_total,
+                           frete_total=frete_total)
@@ -0,0 +1,85 @@
+from flask import Blueprint, render_template, request, redirect, url_for, flash
+from flask_login import login_user, logout_user, login_required, current_user
+from autenticacao import SenhasOcupadas
+from extensoes import db, login_manager, autenticador
+from modelos import User
+
+bp = Blueprint('auth', __name__)
+
+@login_manager.user_loader
+def load_user(user_id):
+    # Cópia em cache (ver autenticacao.py); o banco só é lido quando ela expira
+    return autenticador.carregar_usuario(int(user_id))
+
+def servidor_ocupado(template):
+    flash('Muitos acessos ao mesmo tempo. Tente novamente em instantes.', 'warning')
+    return render_template(template), 503
+
+# Rotas de Autenticação
+@bp.route('/login', methods=['GET', 'POST'])
+def login():
+    if current_user.is_authenticated:
+        return redirect(url_for('relatorios.inicio'))
+    
+    if request.method == 'POST':
+        username = request.form['username']
+        password = request.form['password']
+        
+        espera = autenticador.espera_login(username)
+        if espera:
+            flash(f'Muitas tentativas para este usuário. Tente novamente em {espera} segundos.', 'danger')
+            return render_template('login.html'), 429
+
+        user = User.query.filter_by(username=username).first()
+        try:
+            senha_correta = autenticador.conferir_senha(user.password if user else None, password)
+        except SenhasOcupadas:
+            return servidor_ocupado('login.html')
+        if user and senha_correta:
+            autenticador.limpar_falhas(username)
+            if autenticador.precisa_refazer(user.password):
+                # Custo do hash mudou (SENHA_METODO): aproveita a senha digitada para refazer
+                try:
+                    user.password = autenticador.gerar_hash(password)
+                    db.session.commit()
+                except SenhasOcupadas:
+                    pass
+            login_user(user)
+            flash('Login realizado com sucesso!', 'success')
+            return redirect(url_for('relatorios.inicio'))
+        else:
+            autenticador.registrar_falha(username)
+            flash('Usuário ou senha incorretos.', 'danger')
+            return render_template('login.html')
+            
+    return render_template('login.html')
+
+@bp.route('/logout')
+@login_required
+def logout():
+    logout_user()
+    flash('Você saiu da sua conta.', 'info')
+    return redirect(url_for('auth.login'))
+
+@bp.route('/register', methods=['GET', 'POST'])
+def register():
+    if request.method == 'POST':
+        username = request.form['username']
+        password = request.form['password']
+        
+        existing_user = User.query.filter_by(username=username).first()
+        if existing_user:
+            flash('Este nome de usuário já está em uso.', 'danger')
+            return render_template('register.html')
+        else:
+            try:
+                hashed_password = autenticador.gerar_hash(password)
+            except SenhasOcupadas:
+                return servidor_ocupado('register.html')
+            new_user = User(username=username, password=hashed_password)
+            db.session.add(new_user)
+            db.session.commit()
+            flash('Nova conta criada com sucesso! Faça login para continuar.', 'success')
+            return redirect(url_for('auth.login'))
+            
+    return render_template('register.html')
@@ -0,0 +1,84 @@
+import os
+from datetime import datetime
+from flask import Blueprint, render_template, redirect, url_for, flash
+from flask_login import login_required
+from arquivo import descartar_ja_arquivadas, recriar_arquivo
+from extensoes import db, lojas
+from modelos import Produto, Cliente, Combo, Transacao, preencher_coordenadas_numericas, reservar_ids_arquivados
+from utilidades import carregar_json, salvar_json, garantir_pasta
+
+bp = Blueprint('backup', __name__)
+
+# Backup e Restauração
+@bp.route('/backup')
+@login_required
+def backup():
+    agora = datetime.now().strftime('%Y-%m-%d_%H-%M-%S')
+    nome_do_arquivo = f'backup_{agora}.json'
+    caminho_backup = os.path.join(garantir_pasta(lojas.backup_folder()), nome_do_arquivo)
+    
+    def to_dict(obj):
+        return {c.name: getattr(obj, c.name) for c in obj.__table__.columns}
+
+    dados_a_salvar = {
+        'produtos': [to_dict(p) for p in Produto.query.all()],
+        'clientes': [to_dict(c) for c in Cliente.query.all()],
+        'combos': [to_dict(c) for c in Combo.query.all()],
+        'transacoes': [to_dict(t) for t in Transacao.query.all()]
+    }
+    
+    salvar_json(dados_a_salvar, caminho_backup)
+    
+    flash(f"Backup criado com sucesso em: {caminho_backup}", 'success')
+    return redirect(url_for('relatorios.inicio'))
+
+@bp.route('/restaurar')
+@login_required
+def restaurar():
+    arquivos_de_backup = [f for f in os.listdir(garantir_pasta(lojas.backup_folder())) if f.endswith('.json')]
+    return render_template('restaurar.html', backups=arquivos_de_backup)
+
+@bp.route('/restaurar_dados/<nome_do_arquivo>')
+@login_required
+def restaurar_dados(nome_do_arquivo):
+    caminho_backup = os.path.join(garantir_pasta(lojas.backup_folder()), nome_do_arquivo)
+    if not os.path.exists(caminho_backup):
+        flash("Erro: Arquivo de backup não encontrado.", 'danger')
+        return redirect(url_for('backup.restaurar'))
+        
+    dados_restaurar = carregar_json(caminho_backup)
+    
+    lojas.recriar_tabelas()
+
+    for p_data in dados_restaurar.get('produtos', []):
+        produto = Produto(**p_data)
+        db.session.add(produto)
+    
+    for c_data in dados_restaurar.get('clientes', []):
+        cliente = Cliente(**c_data)
+        db.session.add(cliente)
+        
+    for c_data in dados_restaurar.get('combos', []):
+        combo = Combo(**c_data)
+        db.session.add(combo)
+        
+    for t_data in dados_restaurar.get('transacoes', []):
+        transacao = Transacao(**t_data)
+        db.session.add(transacao)
+
+    db.session.commit()
+    descartar_ja_arquivadas()
+    reservar_ids_arquivados()
+    preencher_coordenadas_numericas()
+    lojas.agenda().invalidar()
+    flash(f"Dados restaurados com sucesso a partir de {nome_do_arquivo}.", 'success')
+    return redirect(url_for('relatorios.inicio'))
+
+@bp.route('/limpar_dados')
+@login_required
+def limpar_dados():
+    lojas.recriar_tabelas()
+    recriar_arquivo()
+    lojas.agenda().invalidar()
+    flash("Todos os dados foram apagados e o banco de dados foi reiniciado.", 'warning')
+    return redirect(url_for('relatorios.inicio'))
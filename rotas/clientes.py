@@ -0,0 +1,208 @@
+import os
+from datetime import datetime
+from flask import Blueprint, render_template, request, redirect, url_for, jsonify, flash, current_app
+from flask_login import login_required
+from extensoes import db
+from geo import distancia_km, caixa_delimitadora
+from modelos import Cliente, TABELAS_TRANSACOES
+from utilidades import garantir_pasta, normalizar_busca, normalizar_telefone
+
+bp = Blueprint('clientes', __name__)
+
+LIMITE_BUSCA = 50
+
+def _ate_prefixo(prefixo):
+    # Limite superior do intervalo [prefixo, ...): a comparação de textos do SQLite
+    # segue a ordem dos códigos Unicode, então basta avançar o último caractere
+    return prefixo[:-1] + chr(ord(prefixo[-1]) + 1)
+
+def _contendo(texto):
+    return '%' + texto.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+
+def buscar_clientes(termo, limite=10):
+    # Ordem do resultado: nome igual, nome começando pelo termo, alguma palavra do nome
+    # começando pelo termo. Termos sem letras buscam pelo telefone: igual, começando pelos
+    # dígitos e depois contendo (ex.: número digitado sem o DDD).
+    # As duas primeiras faixas usam os índices; as buscas "contendo" percorrem a tabela e
+    # só rodam se as anteriores não completaram o limite.
+    nome = normalizar_busca(termo)
+    telefone = normalizar_telefone(termo)
+    if not nome:
+        return []
+    if not any(c.isalpha() for c in nome):
+        if not telefone:
+            return []
+        coluna = Cliente.telefone_digitos
+        faixas = [coluna == telefone,
+                  db.and_(coluna >= telefone, coluna < _ate_prefixo(telefone))]
+        if len(telefone) >= 4:
+            faixas.append(coluna.like(_contendo(telefone), escape='\\'))
+    else:
+        coluna = Cliente.nome_busca
+        faixas = [coluna == nome,
+                  db.and_(coluna >= nome, coluna < _ate_prefixo(nome)),
+                  coluna.like(_contendo(' ' + nome), escape='\\')]
+
+    encontrados = []
+    for filtro in faixas:
+        if len(encontrados) >= limite:
+            break
+        consulta = Cliente.query.filter(filtro)
+        if encontrados:
+            consulta = consulta.filter(Cliente.id.notin_([c.id for c in encontrados]))
+        encontrados.extend(consulta.order_by(coluna, Cliente.id).limit(limite - len(encontrados)))
+    return encontrados
+
+def cliente_por_telefone(telefone, exceto=None):
+    # Consulta exata no índice de telefone_digitos; para avisar de cadastro duplicado
+    digitos = normalizar_telefone(telefone)
+    if not digitos:
+        return None
+    consulta = Cliente.query.filter(Cliente.telefone_digitos == digitos)
+    if exceto:
+        consulta = consulta.filter(Cliente.id != exceto)
+    return consulta.order_by(Cliente.id).first()
+
+def cliente_busca_dict(cliente):
+    return {'id': cliente.id, 'nome': cliente.nome, 'telefone': cliente.telefone, 'endereco': cliente.endereco}
+
+def clientes_no_raio(lat, lng, raio_km):
+    # Filtra pela caixa delimitadora usando o índice (latitude, longitude)
+    # e só então calcula a distância exata dos candidatos.
+    lat_min, lat_max, lng_min, lng_max = caixa_delimitadora(lat, lng, raio_km)
+    candidatos = Cliente.query.filter(
+        Cliente.latitude.between(lat_min, lat_max),
+        Cliente.longitude.between(lng_min, lng_max)
+    ).all()
+    resultado = []
+    for cliente in candidatos:
+        d = distancia_km(lat, lng, cliente.latitude, cliente.longitude)
+        if d <= raio_km:
+            resultado.append((cliente, d))
+    resultado.sort(key=lambda r: r[1])
+    return resultado
+
+# Clientes
+@bp.route('/clientes')
+@login_required
+def clientes():
+    clientes = Cliente.query.order_by(Cliente.id.desc()).all()
+    return render_template('clientes.html', clientes=clientes)
+
+@bp.route('/adicionar_cliente', methods=['POST'])
+@login_required
+def adicionar_cliente():
+    nome = request.form['nome']
+    telefone = request.form.get('telefone')
+    endereco = request.form.get('endereco')
+    coordenadas = request.form.get('coordenadas')
+    observacao = request.form.get('observacao')
+
+    duplicado = cliente_por_telefone(telefone)
+    if duplicado and not request.form.get('confirmar_duplicado'):
+        flash(f"Já existe um cliente com o telefone {telefone}: {duplicado.nome} (#{duplicado.id}). "
+              "Confirme o cadastro duplicado para continuar.", "warning")
+        return redirect(url_for('clientes.clientes'))
+    
+    foto = None
+    if 'foto_cliente' in request.files and request.files['foto_cliente'].filename != '':
+        foto_file = request.files['foto_cliente']
+        filename = f"{datetime.now().timestamp()}_{foto_file.filename}"
+        foto_file.save(os.path.join(garantir_pasta(current_app.config['CLIENTES_FOLDER']), filename))
+        foto = filename
+    
+    novo_cliente = Cliente(nome=nome, telefone=telefone, endereco=endereco, observacao=observacao, foto=foto)
+    novo_cliente.definir_coordenadas(coordenadas)
+    db.session.add(novo_cliente)
+    db.session.commit()
+    flash("Cliente adicionado com sucesso!", "success")
+    return redirect(url_for('clientes.clientes'))
+
+@bp.route('/detalhes_cliente/<int:id_cliente>')
+@login_required
+def detalhes_cliente(id_cliente):
+    cliente = Cliente.query.get_or_404(id_cliente)
+    return render_template('detalhes_cliente.html', cliente=cliente, id_cliente=id_cliente)
+
+@bp.route('/editar_cliente/<int:id_cliente>', methods=['GET', 'POST'])
+@login_required
+def pagina_editar_cliente(id_cliente):
+    cliente = Cliente.query.get_or_404(id_cliente)
+    if request.method == 'POST':
+        cliente.nome = request.form['nome']
+        cliente.telefone = request.form.get('telefone')
+        cliente.endereco = request.form.get('endereco')
+        cliente.definir_coordenadas(request.form.get('coordenadas'))
+        cliente.observacao = request.form.get('observacao')
+
+        if 'foto_cliente' in request.files and request.files['foto_cliente'].filename != '':
+            foto_file = request.files['foto_cliente']
+            filename = f"{datetime.now().timestamp()}_{foto_file.filename}"
+            foto_file.save(os.path.join(garantir_pasta(current_app.config['CLIENTES_FOLDER']), filename))
+            cliente.foto = filename
+        
+        db.session.commit()
+        flash("Cliente editado com sucesso!", "success")
+        return redirect(url_for('clientes.clientes'))
+    return render_template('editar_cliente.html', cliente=cliente, id_cliente=id_cliente)
+
+@bp.route('/deletar_cliente/<int:id_cliente>')
+@login_required
+def deletar_cliente(id_cliente):
+    cliente = Cliente.query.get_or_404(id_cliente)
+    db.session.delete(cliente)
+    db.session.commit()
+    flash("Cliente deletado com sucesso.", "warning")
+    return redirect(url_for('clientes.clientes'))
+
+@bp.route('/buscar_cliente_ajax')
+@login_required
+def buscar_cliente_ajax():
+    termo = request.args.get('termo', '')
+    limite = min(max(request.args.get('limite', 10, type=int), 1), LIMITE_BUSCA)
+    return jsonify([cliente_busca_dict(c) for c in buscar_clientes(termo, limite)])
+
+@bp.route('/cliente_por_telefone')
+@login_required
+def cliente_por_telefone_ajax():
+    cliente = cliente_por_telefone(request.args.get('telefone'), exceto=request.args.get('exceto', type=int))
+    return jsonify(cliente_busca_dict(cliente) if cliente else None)
+
+@bp.route('/clientes_proximos')
+@login_required
+def clientes_proximos():
+    raio_km = request.args.get('raio_km', 5, type=float)
+    id_cliente = request.args.get('id_cliente', type=int)
+    if id_cliente:
+        referencia = Cliente.query.get_or_404(id_cliente)
+        if referencia.latitude is None:
+            return jsonify({'erro': 'Cliente sem coordenadas cadastradas.'}), 400
+        lat, lng = referencia.latitude, referencia.longitude
+    else:
+        lat = request.args.get('lat', type=float)
+        lng = request.args.get('lng', type=float)
+        if lat is None or lng is None:
+            return jsonify({'erro': 'Informe id_cliente ou lat e lng.'}), 400
+
+    resultados = []
+    for cliente, d in clientes_no_raio(lat, lng, raio_km):
+        if cliente.id == id_cliente:
+            continue
+        resultados.append({
+            'id': cliente.id,
+            'nome': cliente.nome,
+            'endereco': cliente.endereco,
+            'coordenadas': cliente.coordenadas,
+            'distancia_km': round(d, 2)
+        })
+    return jsonify(resultados)
+
+@bp.route('/historico_cliente/<int:id_cliente>')
+@login_required
+def historico_cliente(id_cliente):
+    cliente = Cliente.query.get_or_404(id_cliente)
+    # Transações em uso e arquivadas, das mais recentes para as mais antigas
+    historico = sorted((transacao for modelo, _ in TABELAS_TRANSACOES
+                        for transacao in modelo.query.filter_by(cliente_id=id_cliente)),
+                       key=lambda transacao: transacao.data or datetime.min, reverse=True)
+    return render_template('historico_cliente.html', cliente=cliente, historico=historico)
@@ -0,0 +1,122 @@
+from flask import Blueprint, render_template, request, redirect, url_for, jsonify, flash
+from flask_login import login_required
+from extensoes import db
+from modelos import Produto, Combo, ItemCombo
+
+bp = Blueprint('combos', __name__)
+
+# Combos
+@bp.route('/combos')
+@login_required
+def combos():
+    combos = Combo.query.order_by(Combo.id.desc()).all()
+    produtos = Produto.query.all()
+    return render_template('combos.html', combos=combos, produtos=produtos)
+
+@bp.route('/adicionar_combo', methods=['POST'])
+@login_required
+def adicionar_combo():
+    nome = request.form['nome']
+    observacoes = request.form.get('observacoes')
+    valores_adicionais = float(request.form.get('valores_adicionais', 0))
+
+    itens_do_combo = []
+    preco_base = 0.0
+
+    produtos_ids = request.form.getlist('itens_combo[]')
+
+    for produto_id in produtos_ids:
+        quantidade_str = request.form.get(f'quantidade_{produto_id}')
+        if quantidade_str:
+            quantidade = int(quantidade_str)
+            if quantidade > 0:
+                produto = Produto.query.get(produto_id)
+                if produto:
+                    item_combo = ItemCombo(produto_id=produto.id, quantidade=quantidade)
+                    itens_do_combo.append(item_combo)
+                    preco_base += produto.preco_venda_aluguel * quantidade
+
+    novo_combo = Combo(
+        nome=nome,
+        observacoes=observacoes,
+        valores_adicionais=valores_adicionais,
+        preco_total=preco_base + valores_adicionais,
+        itens=itens_do_combo
+    )
+    db.session.add(novo_combo)
+    db.session.commit()
+    flash("Combo adicionado com sucesso!", 'success')
+    return redirect(url_for('combos.combos'))
+
+@bp.route('/detalhes_combo/<int:id_combo>')
+@login_required
+def detalhes_combo(id_combo):
+    combo = Combo.query.get_or_404(id_combo)
+    itens_detalhados = []
+    for item in combo.itens:
+        produto = Produto.query.get(item.produto_id)
+        if produto:
+            itens_detalhados.append({'nome': produto.nome, 'quantidade': item.quantidade, 'id_produto': produto.id})
+    return render_template('detalhes_combo.html', combo=combo, id_combo=id_combo, itens_detalhados=itens_detalhados)
+
+@bp.route('/editar_combo/<int:id_combo>', methods=['GET', 'POST'])
+@login_required
+def pagina_editar_combo(id_combo):
+    combo = Combo.query.get_or_404(id_combo)
+    produtos = Produto.query.all()
+    itens_selecionados = {item.produto_id for item in combo.itens}
+
+    if request.method == 'POST':
+        combo.nome = request.form['nome']
+        combo.observacoes = request.form.get('observacoes')
+        combo.valores_adicionais = float(request.form.get('valores_adicionais', 0))
+        
+        for item in combo.itens:
+            db.session.delete(item)
+        db.session.commit()
+
+        preco_base = 0.0
+        
+        produtos_ids = request.form.getlist('itens_combo[]')
+
+        for produto_id in produtos_ids:
+            quantidade_str = request.form.get(f'quantidade_{produto_id}')
+            if quantidade_str:
+                quantidade = int(quantidade_str)
+                if quantidade > 0:
+                    produto = Produto.query.get(produto_id)
+                    if produto:
+                        item_combo = ItemCombo(combo_id=combo.id, produto_id=produto.id, quantidade=quantidade)
+                        db.session.add(item_combo)
+                        preco_base += produto.preco_venda_aluguel * quantidade
+        
+        combo.preco_total = preco_base + combo.valores_adicionais
+        db.session.commit()
+        flash("Combo editado com sucesso!", 'success')
+        return redirect(url_for('combos.combos'))
+        
+    return render_template('editar_combo.html', combo=combo, id_combo=id_combo, produtos=produtos, itens_selecionados=itens_selecionados)
+
+@bp.route('/deletar_combo/<int:id_combo>')
+@login_required
+def deletar_combo(id_combo):
+    combo = Combo.query.get_or_404(id_combo)
+    db.session.delete(combo)
+    db.session.commit()
+    flash("Combo deletado com sucesso.", 'warning')
+    return redirect(url_for('combos.combos'))
+
+@bp.route('/buscar_combo_ajax')
+@login_required
+def buscar_combo_ajax():
+    termo = request.args.get('termo', '')
+    combos = Combo.query.filter(Combo.nome.ilike(f'%{termo}%')).all()
+    
+    resultados = []
+    for combo in combos:
+        resultados.append({
+            'id': combo.id,
+            'nome': combo.nome,
+            'preco_total': combo.preco_total
+        })
+    return jsonify(resultados)
@@ -0,0 +1,18 @@
+from flask import Blueprint, Response
+from flask_login import login_required
+from extensoes import canal, lojas
+
+bp = Blueprint('eventos', __name__)
+
+# Mudanças de estoque e de aluguéis da loja do usuário, em Server-Sent Events (ver canal.py)
+@bp.route('/eventos')
+@login_required
+def eventos():
+    # Sem stream_with_context: a requisição (e a sessão do banco) termina antes do fluxo,
+    # então uma conexão parada só ocupa a thread (ou greenlet) que escreve nela
+    assinatura = canal.assinar(lojas.slug_ativa())
+    if assinatura is None:
+        return Response('Muitas conexões abertas.', status=503, mimetype='text/plain',
+                        headers={'Retry-After': str(int(canal.ping))})
+    return Response(canal.fluxo(assinatura), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
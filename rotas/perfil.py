@@ -0,0 +1,50 @@
+from flask import Blueprint, render_template, redirect, url_for, flash, abort, session, current_app, Response
+from flask_login import current_user
+from extensoes import perfilador
+from perfil import desenhar_flamegraph
+
+bp = Blueprint('perfil', __name__)
+
+# Perfilador (só administradores: PERFIL_ADMINS)
+@bp.before_request
+def exigir_admin():
+    # Vale para todas as rotas do perfilador
+    if not current_user.is_authenticated:
+        return current_app.login_manager.unauthorized()
+    if not perfilador.e_admin(current_user):
+        abort(403)
+
+@bp.route('/perfil')
+def perfil():
+    return render_template('perfil.html', endpoints=perfilador.resumo(), perfilador=perfilador,
+                           ligado_na_sessao=bool(session.get('perfil')))
+
+@bp.route('/perfil/sessao', methods=['POST'])
+def alternar_perfil_sessao():
+    # Liga/desliga a amostragem de todas as requisições deste administrador
+    session['perfil'] = not session.get('perfil')
+    flash("Perfil das suas requisições ligado." if session['perfil'] else "Perfil das suas requisições desligado.", 'info')
+    return redirect(url_for('perfil.perfil'))
+
+@bp.route('/perfil/limpar', methods=['POST'])
+def limpar_perfil():
+    perfilador.limpar()
+    flash("Amostras descartadas.", 'warning')
+    return redirect(url_for('perfil.perfil'))
+
+# "nome" é o endpoint amostrado (url_for já usa o argumento "endpoint")
+@bp.route('/perfil/<nome>.folded')
+def baixar_pilhas(nome):
+    texto = perfilador.texto_recolhido(nome)
+    if not texto:
+        abort(404)
+    return Response(texto, mimetype='text/plain',
+                    headers={'Content-Disposition': f'attachment; filename={nome}.folded'})
+
+@bp.route('/perfil/<nome>.svg')
+def flamegraph(nome):
+    recolhidas = perfilador.pilhas_recolhidas(nome)
+    if not recolhidas:
+        abort(404)
+    return Response(desenhar_flamegraph(recolhidas, nome), mimetype='image/svg+xml',
+                    headers={'Content-Disposition': f'inline; filename={nome}.svg'})
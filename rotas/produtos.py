@@ -0,0 +1,185 @@
+import os
+import math
+from datetime import datetime, time
+from flask import Blueprint, render_template, request, redirect, url_for, jsonify, session, flash, current_app
+from flask_login import login_required
+from estoque import movimentos_do_produto, estoque_em
+from extensoes import db
+from modelos import Produto, MOTIVOS_ESTOQUE, recalcular_combos, combos_com_produtos, proxima_versao, movimentar_estoque
+from utilidades import calcular_preco_final, garantir_pasta
+
+bp = Blueprint('produtos', __name__)
+
+def reajustar_precos(percentual, tipo=None):
+    # Reajusta o preço final mantendo preco_compra: a margem de lucro é ajustada para que
+    # preco_venda_aluguel seja multiplicado pelo fator. Produtos e combos em dois UPDATEs.
+    fator = 1 + percentual / 100
+    filtro = [Produto.tipo == tipo] if tipo else []
+    db.session.execute(
+        db.update(Produto).where(*filtro).values(
+            porcentagem_lucro=((1 + db.func.coalesce(Produto.porcentagem_lucro, 0.0) / 100) * fator - 1) * 100,
+            preco_venda_aluguel=db.func.round(db.func.coalesce(Produto.preco_venda_aluguel, 0.0) * fator, 2),
+            versao=proxima_versao()
+        ).execution_options(synchronize_session=False)
+    )
+    produtos_afetados = db.select(Produto.id).where(*filtro)
+    combos_atualizados = recalcular_combos(combos_com_produtos(produtos_afetados))
+    db.session.commit()
+    return combos_atualizados
+
+# Produtos
+@bp.route('/produtos')
+@login_required
+def produtos():
+    produtos = Produto.query.order_by(Produto.id.desc()).all()
+    return render_template('gerenciar_produtos.html', produtos=produtos)
+
+@bp.route('/lista_produtos')
+@login_required
+def lista_produtos():
+    produtos = Produto.query.all()
+    return render_template('produtos.html', produtos=produtos)
+
+@bp.route('/adicionar_produto', methods=['POST'])
+@login_required
+def adicionar_produto():
+    nome = request.form['nome']
+    quantidade = int(request.form['quantidade'])
+    tipo = request.form['tipo']
+    preco_compra = float(request.form['preco_compra'])
+    porcentagem_lucro = float(request.form['porcentagem_lucro'])
+    
+    preco_venda_aluguel = calcular_preco_final(preco_compra, porcentagem_lucro)
+    
+    foto = None
+    if 'foto' in request.files and request.files['foto'].filename != '':
+        foto_file = request.files['foto']
+        filename = f"{datetime.now().timestamp()}_{foto_file.filename}"
+        foto_file.save(os.path.join(garantir_pasta(current_app.config['UPLOAD_FOLDER']), filename))
+        foto = filename
+
+    novo_produto = Produto(nome=nome, quantidade=quantidade, tipo=tipo, preco_compra=preco_compra,
+                           porcentagem_lucro=porcentagem_lucro, preco_venda_aluguel=preco_venda_aluguel, foto=foto)
+    db.session.add(novo_produto)
+    db.session.commit()
+    flash("Produto adicionado com sucesso!", "success")
+    return redirect(url_for('produtos.produtos'))
+
+@bp.route('/detalhes_produto/<int:id_produto>')
+@login_required
+def detalhes_produto(id_produto):
+    produto = Produto.query.get_or_404(id_produto)
+    # ?data=AAAA-MM-DD mostra o estoque no fim daquele dia, calculado pelo livro
+    data_consulta = request.args.get('data')
+    estoque_na_data = None
+    if data_consulta:
+        try:
+            dia = datetime.strptime(data_consulta, '%Y-%m-%d').date()
+        except ValueError:
+            flash("Data inválida.", "danger")
+            data_consulta = None
+        else:
+            estoque_na_data = estoque_em(datetime.combine(dia, time.max)).get(produto.id, 0)
+    return render_template('detalhes_produto.html', produto=produto, id_produto=id_produto,
+                           movimentos=movimentos_do_produto(produto.id), motivos=MOTIVOS_ESTOQUE,
+                           data_consulta=data_consulta, estoque_na_data=estoque_na_data)
+
+@bp.route('/editar_produto/<int:id_produto>', methods=['GET', 'POST'])
+@login_required
+def pagina_editar_produto(id_produto):
+    produto = Produto.query.get_or_404(id_produto)
+    if request.method == 'POST':
+        preco_anterior = produto.preco_venda_aluguel
+        produto.nome = request.form['nome']
+        movimentar_estoque(produto, int(request.form['quantidade']) - (produto.quantidade or 0), 'edicao')
+        produto.tipo = request.form['tipo']
+        produto.preco_compra = float(request.form['preco_compra'])
+        produto.porcentagem_lucro = float(request.form['porcentagem_lucro'])
+        produto.preco_venda_aluguel = calcular_preco_final(produto.preco_compra, produto.porcentagem_lucro)
+
+        if 'foto' in request.files and request.files['foto'].filename != '':
+            foto_file = request.files['foto']
+            filename = f"{datetime.now().timestamp()}_{foto_file.filename}"
+            foto_file.save(os.path.join(garantir_pasta(current_app.config['UPLOAD_FOLDER']), filename))
+            produto.foto = filename
+
+        if produto.preco_venda_aluguel != preco_anterior:
+            db.session.flush()
+            recalcular_combos(combos_com_produtos([produto.id]))
+        db.session.commit()
+        flash("Produto editado com sucesso!", "success")
+        return redirect(url_for('produtos.produtos'))
+    return render_template('editar_produto.html', produto=produto, id_produto=id_produto)
+
+@bp.route('/ajustar_estoque', methods=['POST'])
+@login_required
+def ajustar_estoque():
+    id_produto = request.form.get('id_produto')
+    quantidade = int(request.form.get('quantidade_ajuste'))
+    acao = request.form.get('acao')
+    
+    produto = Produto.query.get_or_404(id_produto)
+    
+    if acao == 'adicionar':
+        movimentar_estoque(produto, quantidade, 'entrada')
+        flash(f"Estoque de '{produto.nome}' ajustado. Adicionadas {quantidade} unidades.", "success")
+    elif acao == 'remover':
+        if produto.quantidade < quantidade:
+            flash(f"Erro: Não é possível remover mais itens do que o estoque atual de '{produto.nome}'.", "danger")
+            return redirect(url_for('produtos.produtos'))
+        movimentar_estoque(produto, -quantidade, 'saida')
+        flash(f"Estoque de '{produto.nome}' ajustado. Removidas {quantidade} unidades.", "success")
+    
+    db.session.commit()
+    return redirect(url_for('produtos.produtos'))
+
+@bp.route('/reajustar_precos', methods=['POST'])
+@login_required
+def reajustar_precos_produtos():
+    # -100% ou menos zeraria (ou tornaria negativo) o preço de todos os produtos e combos
+    try:
+        percentual = float(request.form.get('percentual', ''))
+    except ValueError:
+        percentual = None
+    if percentual is None or not math.isfinite(percentual) or percentual <= -100:
+        flash("Reajuste inválido: informe um percentual maior que -100%.", "danger")
+        return redirect(url_for('produtos.produtos'))
+    tipo = request.form.get('tipo') or None
+    combos_atualizados = reajustar_precos(percentual, tipo)
+    alvo = f"do tipo '{tipo}'" if tipo else "de todos os tipos"
+    flash(f"Preços dos produtos {alvo} reajustados em {percentual:+.2f}%. {combos_atualizados} combo(s) recalculado(s).", "success")
+    return redirect(url_for('produtos.produtos'))
+
+@bp.route('/deletar_produto/<int:id_produto>')
+@login_required
+def deletar_produto(id_produto):
+    produto = Produto.query.get_or_404(id_produto)
+    combos_afetados = [combo_id for (combo_id,) in db.session.execute(combos_com_produtos([produto.id]))]
+    db.session.delete(produto)
+    db.session.flush()
+    if combos_afetados:
+        recalcular_combos(combos_afetados)
+    db.session.commit()
+    flash("Produto deletado com sucesso.", "warning")
+    return redirect(url_for('produtos.produtos'))
+
+@bp.route('/buscar_produto_ajax')
+@login_required
+def buscar_produto_ajax():
+    termo = request.args.get('termo', '')
+    produtos = Produto.query.filter(Produto.nome.ilike(f'%{termo}%')).all()
+    
+    carrinho = session.get('carrinho', [])
+    
+    resultados = []
+    for produto in produtos:
+        estoque_reservado = sum(item['quantidade'] for item in carrinho if item['id'] == produto.id and item['tipo'] == 'produto')
+        estoque_disponivel = produto.quantidade - estoque_reservado
+        
+        resultados.append({
+            'id': produto.id,
+            'nome': produto.nome,
+            'quantidade': estoque_disponivel,
+            'preco_venda_aluguel': produto.preco_venda_aluguel
+        })
+    return jsonify(resultados)
@@ -0,0 +1,331 @@
+import os
+import heapq
+import tempfile
+from datetime import datetime, date, timedelta
+import click
+from concurrent.futures import ThreadPoolExecutor
+from flask import Blueprint, render_template, request, send_file, after_this_request, Response, stream_with_context, abort, jsonify, current_app
+from flask_login import login_required, current_user
+from comprovantes import dados_comprovante
+from extensoes import db, fila_comprovantes, lojas
+from modelos import Produto, Cliente, Transacao, ItemTransacao, ItemCombo, Loja, TABELAS_TRANSACOES, versoes_atuais
+from planilhas import FORMATOS
+
+# cli_group=None mantém o comando como "flask exportar-comprovantes"
+bp = Blueprint('relatorios', __name__, cli_group=None)
+
+# Os relatórios somam as transações em uso e as arquivadas (TABELAS_TRANSACOES)
+def total_do_mes(tipo, mes):
+    return sum(db.session.query(db.func.sum(modelo.total)).filter(
+        modelo.tipo == tipo, db.func.strftime('%Y-%m', modelo.data) == mes).scalar() or 0
+        for modelo, _ in TABELAS_TRANSACOES)
+
+# Rotas de Navegação e Lógica de Negócio
+@bp.route('/')
+@login_required
+def inicio():
+    total_vendas_mes = total_do_mes('Venda', datetime.now().strftime('%Y-%m'))
+    total_alugueis_mes = total_do_mes('Aluguel', datetime.now().strftime('%Y-%m'))
+    total_geral_mes = total_vendas_mes + total_alugueis_mes
+    
+    produtos = Produto.query.all()
+    clientes = Cliente.query.all()
+    num_transacoes = sum(modelo.query.count() for modelo, _ in TABELAS_TRANSACOES)
+
+    return render_template('inicio.html', 
+                           total_vendas_mes=total_vendas_mes,
+                           total_alugueis_mes=total_alugueis_mes,
+                           total_geral_mes=total_geral_mes,
+                           num_produtos=len(produtos),
+                           num_clientes=len(clientes),
+                           num_transacoes=num_transacoes)
+
+# Relatórios
+@bp.route('/relatorios')
+@login_required
+def relatorios():
+    mes_atual = datetime.now().strftime('%Y-%m')
+    
+    total_vendas_mes = total_do_mes('Venda', mes_atual)
+    total_alugueis_mes = total_do_mes('Aluguel', mes_atual)
+    total_geral_mes = total_vendas_mes + total_alugueis_mes
+
+    vendidos = db.union_all(*[
+        db.select(item.nome, db.func.sum(item.quantidade).label('quantidade'))
+        .join(modelo, modelo.id == item.transacao_id)
+        .where(db.func.strftime('%Y-%m', modelo.data) == mes_atual).group_by(item.nome)
+        for modelo, item in TABELAS_TRANSACOES
+    ]).subquery()
+    produtos_populares = db.session.execute(
+        db.select(vendidos.c.nome, db.func.sum(vendidos.c.quantidade).label('quantidade'))
+        .group_by(vendidos.c.nome).order_by(db.desc('quantidade')).limit(5)
+    ).all()
+
+    return render_template('relatorios.html', 
+                           total_vendas_mes=total_vendas_mes,
+                           total_alugueis_mes=total_alugueis_mes,
+                           total_geral_mes=total_geral_mes,
+                           produtos_populares=produtos_populares,
+                           mes_atual=mes_atual,
+                           formas_pagamento=formas_pagamento_usadas())
+
+def comprovantes_do_mes(mes):
+    # mes no formato 'YYYY-MM'
+    transacoes = [t for modelo, _ in TABELAS_TRANSACOES for t in modelo.query.filter(
+        db.func.strftime('%Y-%m', modelo.data) == mes
+    ).options(db.joinedload(modelo.cliente), db.selectinload(modelo.itens))]
+    transacoes.sort(key=lambda t: t.data or datetime.min)
+    return [dados_comprovante(t) for t in transacoes]
+
+@bp.route('/comprovantes/exportar')
+@login_required
+def exportar_comprovantes():
+    mes = request.args.get('mes') or datetime.now().strftime('%Y-%m')
+    descritor, caminho_zip = tempfile.mkstemp(suffix='.zip')
+    os.close(descritor)
+    fila_comprovantes.exportar_zip(comprovantes_do_mes(mes), caminho_zip)
+
+    @after_this_request
+    def remover_zip(resposta):
+        resposta.call_on_close(lambda: os.remove(caminho_zip))
+        return resposta
+
+    return send_file(caminho_zip, mimetype='application/zip', as_attachment=True,
+                     download_name=f'comprovantes_{mes}.zip')
+
+@bp.cli.command('exportar-comprovantes')
+@click.argument('mes')
+@click.argument('destino', required=False)
+def exportar_comprovantes_cli(mes, destino):
+    # Ex.: flask --app app exportar-comprovantes 2025-08
+    destino = destino or f'comprovantes_{mes}.zip'
+    lista = comprovantes_do_mes(mes)
+    fila_comprovantes.exportar_zip(lista, destino)
+    click.echo(f'{len(lista)} comprovantes exportados para {destino}')
+
+# Exportação de transações para a contabilidade
+COLUNAS_EXPORTACAO = ['Transação', 'Data', 'Tipo', 'Status', 'Cliente', 'Forma de Pagamento',
+                      'Item', 'Quantidade', 'Preço Unitário', 'Total do Item',
+                      'Frete', 'Serviços', 'Montagem', 'Desconto', 'Total da Transação']
+
+def formas_pagamento_usadas():
+    formas = db.union_all(*[
+        db.select(modelo.forma_pagamento).where(modelo.forma_pagamento.isnot(None), modelo.forma_pagamento != '')
+        for modelo, _ in TABELAS_TRANSACOES
+    ]).subquery()
+    return db.session.execute(
+        db.select(formas.c.forma_pagamento).distinct().order_by(formas.c.forma_pagamento)).scalars().all()
+
+def consultas_exportacao(inicio, fim, tipo=None, forma_pagamento=None):
+    # Uma consulta por par de tabelas (em uso e arquivo), cada uma já na ordem final:
+    # uma linha por item (ou uma linha vazia para transações sem itens).
+    # Seleciona só colunas, sem montar objetos do ORM.
+    consultas = []
+    for modelo, item in TABELAS_TRANSACOES:
+        consulta = db.select(
+            modelo.id, modelo.data, modelo.tipo, modelo.status, Cliente.nome, modelo.forma_pagamento,
+            item.nome, item.quantidade, item.preco_unitario, item.total_item,
+            modelo.frete, modelo.servicos, modelo.montagem, modelo.desconto, modelo.total
+        ).select_from(modelo).outerjoin(Cliente, Cliente.id == modelo.cliente_id).outerjoin(
+            item, item.transacao_id == modelo.id
+        ).where(
+            modelo.data >= datetime.combine(inicio, datetime.min.time()),
+            modelo.data < datetime.combine(fim + timedelta(days=1), datetime.min.time())
+        ).order_by(modelo.data, modelo.id, item.id)
+        if tipo:
+            consulta = consulta.where(modelo.tipo == tipo)
+        if forma_pagamento:
+            consulta = consulta.where(modelo.forma_pagamento == forma_pagamento)
+        consultas.append(consulta)
+    return consultas
+
+def linhas_exportacao(consultas, linhas_por_lote=1000):
+    # yield_per usa cursor no servidor e busca em lotes: o período inteiro nunca fica em memória.
+    # heapq.merge intercala as consultas por (data, id) sem juntá-las em uma lista.
+    # Frete, serviços, montagem, desconto e total saem só na primeira linha de cada
+    # transação, para que a soma das colunas na planilha não conte o mesmo valor duas vezes.
+    resultados = [db.session.execute(consulta.execution_options(yield_per=linhas_por_lote)) for consulta in consultas]
+    anterior = None
+    for linha in heapq.merge(*resultados, key=lambda linha: (linha[1] or datetime.min, linha[0])):
+        linha = list(linha)
+        if linha[0] == anterior:
+            linha[10:] = [None] * 5
+        anterior = linha[0]
+        yield linha
+
+def ler_data(texto, padrao):
+    return datetime.strptime(texto, '%Y-%m-%d').date() if texto else padrao
+
+@bp.route('/relatorios/exportar')
+@login_required
+def exportar_transacoes():
+    formato = request.args.get('formato', 'csv')
+    if formato not in FORMATOS:
+        abort(400)
+    hoje = date.today()
+    try:
+        inicio = ler_data(request.args.get('inicio'), hoje.replace(day=1))
+        fim = ler_data(request.args.get('fim'), hoje)
+    except ValueError:
+        abort(400)
+    consultas = consultas_exportacao(inicio, fim, request.args.get('tipo'), request.args.get('forma_pagamento'))
+    mimetype, gerar = FORMATOS[formato]
+    nome = f'transacoes_{inicio:%Y-%m-%d}_a_{fim:%Y-%m-%d}.{formato}'
+    return Response(stream_with_context(gerar(COLUNAS_EXPORTACAO, linhas_exportacao(consultas))), mimetype=mimetype,
+                    headers={'Content-Disposition': f'attachment; filename="{nome}"'})
+
+@bp.cli.command('exportar-transacoes')
+@click.argument('inicio', type=click.DateTime(formats=['%Y-%m-%d']))
+@click.argument('fim', type=click.DateTime(formats=['%Y-%m-%d']))
+@click.argument('destino', required=False)
+@click.option('--formato', type=click.Choice(sorted(FORMATOS)), default='csv')
+@click.option('--tipo', default=None, help='Venda, Aluguel ou Orcamento')
+@click.option('--forma-pagamento', default=None)
+def exportar_transacoes_cli(inicio, fim, destino, formato, tipo, forma_pagamento):
+    # Ex.: flask --app app exportar-transacoes 2025-01-01 2025-12-31 --formato xlsx
+    inicio, fim = inicio.date(), fim.date()
+    destino = destino or f'transacoes_{inicio:%Y-%m-%d}_a_{fim:%Y-%m-%d}.{formato}'
+    _, gerar = FORMATOS[formato]
+    with open(destino, 'wb') as arquivo:
+        for pedaco in gerar(COLUNAS_EXPORTACAO, linhas_exportacao(consultas_exportacao(inicio, fim, tipo, forma_pagamento))):
+            arquivo.write(pedaco)
+    click.echo(f'Transações exportadas para {destino}')
+
+# Utilização dos produtos nos aluguéis
+MAX_DIAS_ANALISE = 366 * 10
+
+def filtro_alugueis_periodo(inicio, fim, modelo=Transacao):
+    return (
+        modelo.tipo == 'Aluguel',
+        modelo.status.in_(['ativo', 'finalizado']),
+        modelo.data_inicio <= fim,
+        db.func.coalesce(modelo.data_fim, modelo.data_inicio) >= inicio
+    )
+
+def reservas_do_periodo(inicio, fim):
+    # Datas já como julianday() para o numpy converter sem criar objetos date linha a linha
+    diretas, de_combos = [], []
+    for modelo, item in TABELAS_TRANSACOES:
+        dia_inicio = db.func.julianday(modelo.data_inicio)
+        dia_fim = db.func.julianday(db.func.coalesce(modelo.data_fim, modelo.data_inicio))
+        quantidade = db.func.coalesce(item.quantidade, 1)
+        receita = db.func.coalesce(item.total_item, 0.0)
+        diretas += db.session.execute(
+            db.select(item.produto_id, dia_inicio, dia_fim, quantidade, receita)
+            .join(modelo, modelo.id == item.transacao_id)
+            .where(item.produto_id.isnot(None), *filtro_alugueis_periodo(inicio, fim, modelo))
+        ).all()
+        # Combos são expandidos pela composição atual (ItemCombo)
+        de_combos += db.session.execute(
+            db.select(item.id, ItemCombo.produto_id, dia_inicio, dia_fim,
+                      quantidade * db.func.coalesce(ItemCombo.quantidade, 1),
+                      db.func.coalesce(ItemCombo.quantidade, 1) * db.func.coalesce(Produto.preco_venda_aluguel, 0.0),
+                      receita)
+            .join(modelo, modelo.id == item.transacao_id)
+            .join(ItemCombo, ItemCombo.combo_id == item.combo_id)
+            .join(Produto, Produto.id == ItemCombo.produto_id)
+            .where(item.produto_id.is_(None), item.combo_id.isnot(None), *filtro_alugueis_periodo(inicio, fim, modelo))
+        ).all()
+    return diretas, de_combos
+
+def capacidade_produtos():
+    # Produto.quantidade é o que está na prateleira; somam-se as unidades em aluguéis ativos
+    ativos = (Transacao.tipo == 'Aluguel', Transacao.status == 'ativo')
+    fora = dict(db.session.execute(
+        db.select(ItemTransacao.produto_id, db.func.sum(ItemTransacao.quantidade))
+        .join(Transacao, Transacao.id == ItemTransacao.transacao_id)
+        .where(ItemTransacao.produto_id.isnot(None), *ativos).group_by(ItemTransacao.produto_id)
+    ).all())
+    for produto_id, quantidade in db.session.execute(
+        db.select(ItemCombo.produto_id, db.func.sum(ItemTransacao.quantidade * ItemCombo.quantidade))
+        .join(Transacao, Transacao.id == ItemTransacao.transacao_id)
+        .join(ItemCombo, ItemCombo.combo_id == ItemTransacao.combo_id)
+        .where(ItemTransacao.produto_id.is_(None), *ativos).group_by(ItemCombo.produto_id)
+    ):
+        fora[produto_id] = fora.get(produto_id, 0) + quantidade
+    return [(produto_id, nome, (quantidade or 0) + (fora.get(produto_id) or 0))
+            for produto_id, nome, quantidade in db.session.execute(
+                db.select(Produto.id, Produto.nome, Produto.quantidade).order_by(Produto.id))]
+
+def analise_utilizacao(inicio, fim):
+    # numpy só é importado quando a análise é pedida
+    from analise import montar_reservas, calcular, cache_analises
+
+    def calcular_resultado():
+        diretas, de_combos = reservas_do_periodo(inicio, fim)
+        return calcular(montar_reservas(diretas, de_combos), capacidade_produtos(), inicio, fim)
+
+    # As versões mudam com qualquer transação, item, estoque ou composição de combo gravados;
+    # cada loja tem seus próprios contadores, então a loja também entra na chave
+    return cache_analises.obter((lojas.slug_ativa(), inicio, fim) + versoes_atuais(), calcular_resultado)
+
+def ler_periodo_analise():
+    hoje = date.today()
+    fim = ler_data(request.args.get('fim'), hoje)
+    inicio = ler_data(request.args.get('inicio'), fim - timedelta(days=364))
+    if inicio > fim or (fim - inicio).days >= MAX_DIAS_ANALISE:
+        raise ValueError('Período inválido')
+    return inicio, fim
+
+@bp.route('/relatorios/utilizacao')
+@login_required
+def utilizacao_produtos():
+    try:
+        inicio, fim = ler_periodo_analise()
+    except ValueError:
+        abort(400)
+    return render_template('utilizacao_produtos.html', analise=analise_utilizacao(inicio, fim))
+
+@bp.route('/relatorios/utilizacao/dados')
+@login_required
+def utilizacao_produtos_dados():
+    try:
+        inicio, fim = ler_periodo_analise()
+    except ValueError:
+        abort(400)
+    return jsonify(analise_utilizacao(inicio, fim))
+
+# Relatório consolidado de todas as lojas
+def resumo_da_loja(mes):
+    # Roda dentro de lojas.contexto(slug): todas as consultas vão para o banco daquela loja
+    vendas = total_do_mes('Venda', mes)
+    alugueis = total_do_mes('Aluguel', mes)
+    return {
+        'vendas': vendas,
+        'alugueis': alugueis,
+        'total': vendas + alugueis,
+        'transacoes': sum(modelo.query.filter(db.func.strftime('%Y-%m', modelo.data) == mes).count()
+                          for modelo, _ in TABELAS_TRANSACOES),
+        'alugueis_ativos': Transacao.query.filter_by(tipo='Aluguel', status='ativo').count(),
+        'clientes': Cliente.query.count(),
+        'unidades_estoque': db.session.query(db.func.coalesce(db.func.sum(Produto.quantidade), 0)).scalar(),
+    }
+
+def resumo_das_lojas(mes):
+    # Uma thread por loja, cada uma com seu app_context, sua sessão e o pool do seu banco
+    lista = [(None, current_app.config['LOJA_PRINCIPAL_NOME'])] + [
+        (loja.slug, loja.nome) for loja in Loja.query.order_by(Loja.nome)]
+
+    def resumir(loja):
+        slug, nome = loja
+        with lojas.contexto(slug):
+            return dict(resumo_da_loja(mes), slug=slug, nome=nome)
+
+    with ThreadPoolExecutor(max_workers=min(len(lista), current_app.config['LOJAS_WORKERS'])) as executor:
+        return list(executor.map(resumir, lista))
+
+@bp.route('/relatorios/lojas')
+@login_required
+def relatorio_lojas():
+    # Só administradores da loja principal (a matriz) veem os números das outras lojas
+    if not lojas.ve_consolidado(current_user):
+        abort(403)
+    mes = request.args.get('mes') or datetime.now().strftime('%Y-%m')
+    try:
+        datetime.strptime(mes, '%Y-%m')
+    except ValueError:
+        abort(400)
+    resumos = resumo_das_lojas(mes)
+    totais = {chave: sum(resumo[chave] for resumo in resumos)
+              for chave in ('vendas', 'alugueis', 'total', 'transacoes', 'alugueis_ativos', 'clientes', 'unidades_estoque')}
+    return render_template('relatorio_lojas.html', resumos=resumos, totais=totais, mes=mes)
@@ -0,0 +1,233 @@
+import os
+from datetime import datetime
+from flask import Blueprint, request, jsonify, send_file, current_app
+from flask_login import login_required
+from sqlalchemy.exc import IntegrityError
+from comprovantes import dados_comprovante
+from extensoes import db, fila_comprovantes
+from modelos import (Produto, Cliente, Combo, Transacao, ItemTransacao, TransacaoArquivada, RegistroExclusao,
+                     estado_sincronizacao, movimentar_estoque)
+from utilidades import ler_data_hora_local
+
+bp = Blueprint('sincronizacao', __name__)
+
+def produto_sync_dict(p):
+    return {'id': p.id, 'nome': p.nome, 'quantidade': p.quantidade, 'tipo': p.tipo,
+            'preco': p.preco_venda_aluguel, 'foto': p.foto, 'versao': p.versao}
+
+def combo_sync_dict(c):
+    return {'id': c.id, 'nome': c.nome, 'preco': c.preco_total, 'versao': c.versao,
+            'itens': [[item.produto_id, item.quantidade] for item in c.itens]}
+
+def cliente_sync_dict(c):
+    return {'id': c.id, 'nome': c.nome, 'telefone': c.telefone, 'endereco': c.endereco,
+            'coordenadas': c.coordenadas, 'versao': c.versao}
+
+def id_da_carga(valor):
+    # Só para a pré-carga: o que não vira um id do SQLite fica de fora, e
+    # montar_transacao_offline devolve o erro apenas para aquela transação
+    try:
+        numero = int(valor) if isinstance(valor, (int, float, str)) else None
+    except (ValueError, OverflowError):
+        return None
+    return numero if numero is not None and -2 ** 63 <= numero < 2 ** 63 else None
+
+def ingerir_lote_transacoes(lote, nova_tentativa=True):
+    # Grava de uma vez as transações registradas offline.
+    # Produtos, combos, clientes e chaves já gravadas são carregados em poucas consultas;
+    # o estoque é conferido em memória, transação a transação, na ordem do lote.
+    validos = [dados for dados in lote if isinstance(dados, dict)]
+    chaves = [dados.get('chave') for dados in validos if isinstance(dados.get('chave'), str) and dados.get('chave')]
+    existentes = {}
+    for modelo in (Transacao, TransacaoArquivada):
+        existentes.update(db.session.execute(
+            db.select(modelo.chave_idempotencia, modelo.id).where(modelo.chave_idempotencia.in_(chaves))
+        ).all())
+
+    ids_produtos, ids_combos, ids_clientes = set(), set(), set()
+    for dados in validos:
+        ids_clientes.add(id_da_carga(dados.get('cliente_id')))
+        itens = dados.get('itens')
+        for item in itens if isinstance(itens, list) else []:
+            if isinstance(item, dict):
+                (ids_combos if item.get('tipo') == 'combo' else ids_produtos).add(id_da_carga(item.get('id')))
+    combos = {c.id: c for c in Combo.query.filter(Combo.id.in_(ids_combos)).options(db.selectinload(Combo.itens))}
+    for combo in combos.values():
+        ids_produtos.update(item.produto_id for item in combo.itens)
+    produtos = {p.id: p for p in Produto.query.filter(Produto.id.in_(ids_produtos))}
+    clientes = set(db.session.execute(db.select(Cliente.id).where(Cliente.id.in_(ids_clientes))).scalars())
+
+    resultados = []
+    criadas = []
+    for dados in lote:
+        if not isinstance(dados, dict):
+            resultados.append({'chave': None, 'status': 'erro', 'erro': 'Transação deve ser um objeto.'})
+            continue
+        chave = dados.get('chave')
+        if not chave or not isinstance(chave, str):
+            resultados.append({'chave': None, 'status': 'erro', 'erro': 'Chave de idempotência ausente.'})
+            continue
+        if chave in existentes:
+            resultados.append({'chave': chave, 'status': 'duplicada', 'transacao_id': existentes[chave]})
+            continue
+        try:
+            transacao, conflitos = montar_transacao_offline(dados, produtos, combos, clientes)
+        except (KeyError, ValueError, TypeError) as erro:
+            resultados.append({'chave': chave, 'status': 'erro', 'erro': str(erro)})
+            continue
+        if conflitos:
+            resultados.append({'chave': chave, 'status': 'conflito', 'conflitos': conflitos})
+            continue
+        db.session.add(transacao)
+        # Evita gravar duas vezes a mesma chave repetida dentro do próprio lote
+        existentes[chave] = None
+        resultado = {'chave': chave, 'status': 'criada'}
+        resultados.append(resultado)
+        criadas.append((transacao, resultado))
+
+    try:
+        db.session.flush()
+        for transacao, resultado in criadas:
+            resultado['transacao_id'] = transacao.id
+        for resultado in resultados:
+            if resultado['status'] == 'duplicada' and resultado['transacao_id'] is None:
+                resultado['transacao_id'] = next(t.id for t, _ in criadas if t.chave_idempotencia == resultado['chave'])
+        db.session.commit()
+    except IntegrityError:
+        # Outro aparelho (ou o reenvio de um lote que expirou) gravou uma das chaves ao
+        # mesmo tempo: o lote é refeito uma vez, e essa chave volta como duplicada
+        db.session.rollback()
+        if not nova_tentativa:
+            raise
+        return ingerir_lote_transacoes(lote, nova_tentativa=False)
+    return resultados, [transacao for transacao, _ in criadas]
+
+def montar_transacao_offline(dados, produtos, combos, clientes):
+    cliente_id = int(dados['cliente_id'])
+    if cliente_id not in clientes:
+        raise ValueError(f'Cliente {cliente_id} não encontrado.')
+    tipo = dados['tipo']
+    if tipo not in ('Venda', 'Aluguel', 'Orcamento'):
+        raise ValueError(f'Tipo de transação inválido: {tipo}.')
+    if not dados.get('itens'):
+        raise ValueError('Transação sem itens.')
+
+    # Quantidade necessária de cada produto, já expandindo os combos
+    necessario = {}
+    itens = []
+    for item in dados['itens']:
+        item_id = int(item['id'])
+        quantidade = int(item['quantidade'])
+        if quantidade <= 0:
+            raise ValueError('Quantidade deve ser maior que zero.')
+        if item.get('tipo') == 'combo':
+            combo = combos.get(item_id)
+            if combo is None:
+                raise ValueError(f'Combo {item_id} não encontrado.')
+            for combo_item in combo.itens:
+                necessario[combo_item.produto_id] = necessario.get(combo_item.produto_id, 0) + combo_item.quantidade * quantidade
+            itens.append(ItemTransacao(combo_id=combo.id, nome=combo.nome, quantidade=quantidade,
+                                       preco_unitario=combo.preco_total, total_item=combo.preco_total * quantidade))
+        else:
+            produto = produtos.get(item_id)
+            if produto is None:
+                raise ValueError(f'Produto {item_id} não encontrado.')
+            necessario[produto.id] = necessario.get(produto.id, 0) + quantidade
+            itens.append(ItemTransacao(produto_id=produto.id, nome=produto.nome, quantidade=quantidade,
+                                       preco_unitario=produto.preco_venda_aluguel, total_item=produto.preco_venda_aluguel * quantidade))
+
+    movimenta_estoque = tipo != 'Orcamento'
+    if movimenta_estoque:
+        conflitos = []
+        for produto_id, quantidade in necessario.items():
+            produto = produtos.get(produto_id)
+            disponivel = produto.quantidade if produto else 0
+            if disponivel < quantidade:
+                conflitos.append({'produto_id': produto_id, 'nome': produto.nome if produto else None,
+                                  'solicitado': quantidade, 'disponivel': disponivel})
+        if conflitos:
+            return None, conflitos
+
+    frete = float(dados.get('frete') or 0)
+    desconto = float(dados.get('desconto') or 0)
+    servicos = float(dados.get('servicos') or 0)
+    montagem = float(dados.get('montagem') or 0)
+    status = {'Aluguel': 'ativo', 'Venda': 'finalizado', 'Orcamento': 'orcamento'}[tipo]
+    transacao = Transacao(
+        chave_idempotencia=dados['chave'],
+        cliente_id=cliente_id,
+        tipo=tipo,
+        data=ler_data_hora_local(dados['data']) if dados.get('data') else datetime.now(),
+        data_inicio=datetime.strptime(dados['data_inicio'], '%Y-%m-%d').date() if dados.get('data_inicio') else None,
+        data_fim=datetime.strptime(dados['data_fim'], '%Y-%m-%d').date() if dados.get('data_fim') else None,
+        frete=frete,
+        desconto=desconto,
+        servicos=servicos,
+        montagem=montagem,
+        forma_pagamento=dados.get('forma_pagamento') or 'N/A',
+        status=status,
+        itens=itens
+    )
+    transacao.total = sum(item.total_item for item in itens) + frete + servicos + montagem - desconto
+    # Baixa o estoque só depois que todos os campos foram lidos sem erro
+    if movimenta_estoque:
+        for produto_id, quantidade in necessario.items():
+            movimentar_estoque(produtos[produto_id], -quantidade, 'aluguel' if tipo == 'Aluguel' else 'venda', transacao)
+    return transacao, []
+
+# Sincronização offline (PWA)
+@bp.route('/service-worker.js')
+def service_worker():
+    # Servido na raiz para que o escopo do service worker cubra todas as páginas
+    resposta = send_file(os.path.join(current_app.static_folder, 'service-worker.js'), mimetype='application/javascript')
+    resposta.headers['Cache-Control'] = 'no-cache'
+    return resposta
+
+@bp.route('/sync/catalogo')
+@login_required
+def sync_catalogo():
+    estado = estado_sincronizacao()
+    db.session.commit()
+    return jsonify({
+        'epoca': estado.epoca,
+        'versao': estado.versao,
+        'completo': True,
+        'produtos': [produto_sync_dict(p) for p in Produto.query.all()],
+        'combos': [combo_sync_dict(c) for c in Combo.query.options(db.selectinload(Combo.itens)).all()],
+        'clientes': [cliente_sync_dict(c) for c in Cliente.query.all()],
+        'removidos': {}
+    })
+
+@bp.route('/sync/delta')
+@login_required
+def sync_delta():
+    desde = request.args.get('desde', 0, type=int)
+    estado = estado_sincronizacao()
+    db.session.commit()
+    if request.args.get('epoca') != estado.epoca or desde > estado.versao:
+        return sync_catalogo()
+
+    removidos = {}
+    for registro in RegistroExclusao.query.filter(RegistroExclusao.versao > desde):
+        removidos.setdefault(registro.tabela, []).append(registro.registro_id)
+    return jsonify({
+        'epoca': estado.epoca,
+        'versao': estado.versao,
+        'completo': False,
+        'produtos': [produto_sync_dict(p) for p in Produto.query.filter(Produto.versao > desde)],
+        'combos': [combo_sync_dict(c) for c in Combo.query.filter(Combo.versao > desde).options(db.selectinload(Combo.itens))],
+        'clientes': [cliente_sync_dict(c) for c in Cliente.query.filter(Cliente.versao > desde)],
+        'removidos': removidos
+    })
+
+@bp.route('/sync/transacoes', methods=['POST'])
+@login_required
+def sync_transacoes():
+    dados = request.get_json(silent=True) or {}
+    lote = dados.get('transacoes')
+    if not isinstance(lote, list):
+        return jsonify({'erro': 'Envie {"transacoes": [...]}.'}), 400
+    resultados, criadas = ingerir_lote_transacoes(lote)
+    for transacao in criadas:
+        fila_comprovantes.agendar(dados_comprovante(transacao))
+    return jsonify({'resultados': resultados})
@@ -0,0 +1,395 @@
+import os
+import secrets
+from datetime import datetime
+from flask import Blueprint, render_template, request, redirect, url_for, session, flash, send_file
+from flask_login import login_required
+from sqlalchemy.exc import IntegrityError
+from comprovantes import dados_comprovante
+from edicao_transacoes import ler_itens_formulario, itens_atuais, editar_itens_transacao
+from arquivo import obter_transacao_ou_404, chave_ja_gravada
+from extensoes import db, fila_comprovantes
+from modelos import Produto, Combo, Transacao, ItemTransacao, movimentar_estoque
+
+bp = Blueprint('transacoes', __name__)
+
+# Transações
+@bp.route('/nova_transacao')
+@login_required
+def nova_transacao():
+    # O cliente é escolhido pela busca (clientes.buscar_cliente_ajax): a página não
+    # carrega mais a lista inteira de clientes
+    if 'carrinho' not in session:
+        session['carrinho'] = []
+    
+    carrinho_detalhes = []
+    for item in session['carrinho']:
+        if item['tipo'] == 'produto':
+            produto = Produto.query.get(item['id'])
+            if produto:
+                carrinho_detalhes.append({
+                    'id': produto.id,
+                    'nome': produto.nome,
+                    'tipo': 'produto',
+                    'quantidade': item['quantidade'],
+                    'preco_unitario': produto.preco_venda_aluguel,
+                    'total_item': produto.preco_venda_aluguel * item['quantidade'],
+                    'estoque_disponivel': produto.quantidade - item['quantidade']
+                })
+        elif item['tipo'] == 'combo':
+            combo = Combo.query.get(item['id'])
+            if combo:
+                carrinho_detalhes.append({
+                    'id': combo.id,
+                    'nome': combo.nome,
+                    'tipo': 'combo',
+                    'quantidade': item['quantidade'],
+                    'preco_unitario': combo.preco_total,
+                    'total_item': combo.preco_total * item['quantidade']
+                })
+                
+    total_carrinho = sum(item['total_item'] for item in carrinho_detalhes)
+    
+    return render_template('nova_transacao.html', 
+                           carrinho=carrinho_detalhes,
+                           total_carrinho=total_carrinho,
+                           chave_idempotencia=secrets.token_hex(16))
+
+@bp.route('/transacoes')
+@login_required
+def historico_transacoes():
+    transacoes = Transacao.query.order_by(Transacao.data.desc()).all()
+    return render_template('historico_transacoes.html', transacoes=transacoes)
+
+@bp.route('/adicionar_ao_carrinho', methods=['POST'])
+@login_required
+def adicionar_ao_carrinho():
+    tipo = request.form['tipo']
+    item_id = int(request.form['id'])
+    quantidade = int(request.form['quantidade'])
+    
+    if 'carrinho' not in session:
+        session['carrinho'] = []
+
+    carrinho = session['carrinho']
+    item_existente = next((item for item in carrinho if item['id'] == item_id and item['tipo'] == tipo), None)
+    
+    quantidade_atual_no_carrinho = 0
+    if item_existente:
+        quantidade_atual_no_carrinho = item_existente['quantidade']
+    
+    quantidade_a_adicionar = quantidade_atual_no_carrinho + quantidade
+
+    if tipo == 'produto':
+        produto = Produto.query.get(item_id)
+        if not produto or produto.quantidade < quantidade_a_adicionar:
+            flash(f"Erro: Estoque insuficiente para o produto '{produto.nome}'. Estoque disponível: {produto.quantidade}.", 'danger')
+            return redirect(url_for('transacoes.nova_transacao'))
+    elif tipo == 'combo':
+        combo = Combo.query.get(item_id)
+        if not combo:
+             flash("Erro: Combo não encontrado.", 'danger')
+             return redirect(url_for('transacoes.nova_transacao'))
+        for combo_item in combo.itens:
+            produto = Produto.query.get(combo_item.produto_id)
+            if not produto or produto.quantidade < (combo_item.quantidade * quantidade_a_adicionar):
+                 flash(f"Erro: Estoque insuficiente para o produto '{produto.nome}' no combo '{combo.nome}'. Estoque disponível: {produto.quantidade}.", 'danger')
+                 return redirect(url_for('transacoes.nova_transacao'))
+
+    if item_existente:
+        item_existente['quantidade'] = quantidade_a_adicionar
+    else:
+        carrinho.append({'id': item_id, 'tipo': tipo, 'quantidade': quantidade})
+    
+    session['carrinho'] = carrinho
+    flash("Item adicionado ao carrinho com sucesso!", 'success')
+    return redirect(url_for('transacoes.nova_transacao'))
+
+@bp.route('/remover_do_carrinho/<string:tipo>/<int:item_id>')
+@login_required
+def remover_do_carrinho(tipo, item_id):
+    if 'carrinho' in session:
+        session['carrinho'] = [item for item in session['carrinho'] if not (item['id'] == item_id and item['tipo'] == tipo)]
+    flash("Item removido do carrinho.", 'warning')
+    return redirect(url_for('transacoes.nova_transacao'))
+
+def redirecionar_para_gravada(chave_idempotencia, erro):
+    # A mesma venda enviada duas vezes ao mesmo tempo: a segunda esbarra na chave única
+    # e mostra a que foi gravada pela primeira. Outras violações seguem como erro.
+    db.session.rollback()
+    existente_id = chave_ja_gravada(chave_idempotencia) if chave_idempotencia else None
+    if existente_id is None:
+        raise erro
+    session.pop('carrinho', None)
+    return redirect(url_for('transacoes.comprovante', transacao_id=existente_id))
+
+@bp.route('/finalizar_transacao', methods=['POST'])
+@login_required
+def finalizar_transacao():
+    if not session.get('carrinho'):
+        flash("Erro: O carrinho está vazio.", 'danger')
+        return redirect(url_for('transacoes.nova_transacao'))
+        
+    cliente_id = request.form['cliente_id']
+    tipo = request.form['tipo']
+    data_inicio = request.form.get('data_inicio')
+    data_fim = request.form.get('data_fim')
+    frete = float(request.form.get('frete', 0))
+    desconto = float(request.form.get('desconto', 0))
+    servicos = float(request.form.get('servicos', 0))
+    montagem = float(request.form.get('montagem', 0))
+    forma_pagamento = request.form['forma_pagamento']
+    chave_idempotencia = request.form.get('chave_idempotencia') or None
+
+    if chave_idempotencia:
+        existente_id = chave_ja_gravada(chave_idempotencia)
+        if existente_id:
+            session.pop('carrinho', None)
+            return redirect(url_for('transacoes.comprovante', transacao_id=existente_id))
+    
+    transacao = Transacao(
+        chave_idempotencia=chave_idempotencia,
+        cliente_id=cliente_id,
+        tipo=tipo,
+        data=datetime.now(),
+        data_inicio=datetime.strptime(data_inicio, '%Y-%m-%d').date() if data_inicio else None,
+        data_fim=datetime.strptime(data_fim, '%Y-%m-%d').date() if data_fim else None,
+        frete=frete,
+        desconto=desconto,
+        servicos=servicos,
+        montagem=montagem,
+        forma_pagamento=forma_pagamento,
+        status='ativo' if tipo == 'Aluguel' else 'finalizado'
+    )
+    db.session.add(transacao)
+    try:
+        db.session.flush()
+    except IntegrityError as erro:
+        return redirecionar_para_gravada(chave_idempotencia, erro)
+    motivo_saida = 'aluguel' if tipo == 'Aluguel' else 'venda'
+
+    total_itens_calculado = 0
+    for item_carrinho in session['carrinho']:
+        item_id = item_carrinho['id']
+        quantidade = item_carrinho['quantidade']
+        tipo_item = item_carrinho['tipo']
+        
+        if tipo_item == 'produto':
+            produto = Produto.query.get(item_id)
+            if produto and produto.quantidade >= quantidade:
+                item_transacao = ItemTransacao(
+                    transacao_id=transacao.id,
+                    produto_id=item_id,
+                    nome=produto.nome,
+                    quantidade=quantidade,
+                    preco_unitario=produto.preco_venda_aluguel,
+                    total_item=produto.preco_venda_aluguel * quantidade
+                )
+                db.session.add(item_transacao)
+                movimentar_estoque(produto, -quantidade, motivo_saida, transacao)
+                total_itens_calculado += item_transacao.total_item
+            else:
+                db.session.rollback()
+                flash(f"Erro: Estoque insuficiente para o produto {produto.nome}.", 'danger')
+                return redirect(url_for('transacoes.nova_transacao'))
+
+        elif tipo_item == 'combo':
+            combo = Combo.query.get(item_id)
+            if combo:
+                for combo_item in combo.itens:
+                    produto = Produto.query.get(combo_item.produto_id)
+                    if produto and produto.quantidade < (combo_item.quantidade * quantidade):
+                        db.session.rollback()
+                        flash(f"Erro: Estoque insuficiente para o produto '{produto.nome}' no combo '{combo.nome}'.", 'danger')
+                        return redirect(url_for('transacoes.nova_transacao'))
+                
+                item_transacao = ItemTransacao(
+                    transacao_id=transacao.id,
+                    combo_id=item_id,
+                    nome=combo.nome,
+                    quantidade=quantidade,
+                    preco_unitario=combo.preco_total,
+                    total_item=combo.preco_total * quantidade
+                )
+                db.session.add(item_transacao)
+                
+                for combo_item in combo.itens:
+                    produto = Produto.query.get(combo_item.produto_id)
+                    movimentar_estoque(produto, -combo_item.quantidade * quantidade, motivo_saida, transacao)
+                total_itens_calculado += item_transacao.total_item
+    
+    transacao.total = total_itens_calculado + frete + servicos + montagem - desconto
+    try:
+        db.session.commit()
+    except IntegrityError as erro:
+        return redirecionar_para_gravada(chave_idempotencia, erro)
+    fila_comprovantes.agendar(dados_comprovante(transacao))
+    session.pop('carrinho', None)
+    flash("Transação finalizada com sucesso!", 'success')
+    return redirect(url_for('transacoes.comprovante', transacao_id=transacao.id))
+
+# Rota de Orçamento
+@bp.route('/salvar_orcamento', methods=['POST'])
+@login_required
+def salvar_orcamento():
+    if not session.get('carrinho'):
+        flash("Erro: O carrinho está vazio.", 'danger')
+        return redirect(url_for('transacoes.nova_transacao'))
+
+    cliente_id = request.form['cliente_id']
+    frete = float(request.form.get('frete', 0))
+    desconto = float(request.form.get('desconto', 0))
+    servicos = float(request.form.get('servicos', 0))
+    montagem = float(request.form.get('montagem', 0))
+
+    orcamento = Transacao(
+        cliente_id=cliente_id,
+        tipo='Orcamento',
+        data=datetime.now(),
+        frete=frete,
+        desconto=desconto,
+        servicos=servicos,
+        montagem=montagem,
+        forma_pagamento='N/A',
+        total=0.0,
+        status='orcamento'
+    )
+    db.session.add(orcamento)
+    db.session.flush()
+
+    total_itens_calculado = 0
+    for item_carrinho in session['carrinho']:
+        item_id = item_carrinho['id']
+        quantidade = item_carrinho['quantidade']
+        tipo_item = item_carrinho['tipo']
+
+        if tipo_item == 'produto':
+            produto = Produto.query.get(item_id)
+            if produto:
+                item_transacao = ItemTransacao(
+                    transacao_id=orcamento.id,
+                    produto_id=item_id,
+                    nome=produto.nome,
+                    quantidade=quantidade,
+                    preco_unitario=produto.preco_venda_aluguel,
+                    total_item=produto.preco_venda_aluguel * quantidade
+                )
+                db.session.add(item_transacao)
+                total_itens_calculado += item_transacao.total_item
+
+        elif tipo_item == 'combo':
+            combo = Combo.query.get(item_id)
+            if combo:
+                item_transacao = ItemTransacao(
+                    transacao_id=orcamento.id,
+                    combo_id=item_id,
+                    nome=combo.nome,
+                    quantidade=quantidade,
+                    preco_unitario=combo.preco_total,
+                    total_item=combo.preco_total * quantidade
+                )
+                db.session.add(item_transacao)
+                total_itens_calculado += item_transacao.total_item
+    
+    orcamento.total = total_itens_calculado + frete + servicos + montagem - desconto
+    db.session.commit()
+    fila_comprovantes.agendar(dados_comprovante(orcamento))
+    session.pop('carrinho', None)
+    flash("Orçamento salvo com sucesso!", 'success')
+    return redirect(url_for('transacoes.comprovante', transacao_id=orcamento.id))
+
+@bp.route('/comprovante/<int:transacao_id>')
+@login_required
+def comprovante(transacao_id):
+    transacao = obter_transacao_ou_404(transacao_id)
+    return render_template('comprovante.html', transacao=transacao, cliente=transacao.cliente)
+
+@bp.route('/comprovante/<int:transacao_id>/pdf')
+@login_required
+def comprovante_pdf(transacao_id):
+    transacao = obter_transacao_ou_404(transacao_id)
+    caminho = fila_comprovantes.obter(dados_comprovante(transacao))
+    return send_file(os.path.abspath(caminho), mimetype='application/pdf', as_attachment=True,
+                     download_name=f'comprovante_{transacao.id}.pdf')
+
+@bp.route('/editar_transacao/<int:transacao_id>')
+@login_required
+def editar_transacao(transacao_id):
+    transacao = Transacao.query.get_or_404(transacao_id)
+    return render_template('editar_transacao.html', transacao=transacao)
+
+@bp.route('/salvar_edicao_transacao/<int:transacao_id>', methods=['POST'])
+@login_required
+def salvar_edicao_transacao(transacao_id):
+    transacao = Transacao.query.get_or_404(transacao_id)
+    comprovante_anterior = dados_comprovante(transacao)
+
+    # Itens e estoque primeiro: tipo e status decidem se a transação segura estoque
+    # (orçamento convertido em venda, aluguel encerrado pela edição etc.)
+    try:
+        desejados = ler_itens_formulario(request.form) if request.form.get('itens_enviados') else itens_atuais(transacao)
+        conflitos = editar_itens_transacao(transacao, desejados, request.form['tipo'], request.form['status'])
+    except ValueError as erro:
+        db.session.rollback()
+        flash(f"Erro: {erro}", 'danger')
+        return redirect(url_for('transacoes.editar_transacao', transacao_id=transacao_id))
+    if conflitos:
+        db.session.rollback()
+        detalhes = ', '.join(f"{c['nome'] or c['produto_id']} (faltam {c['solicitado'] - c['disponivel']})" for c in conflitos)
+        flash(f"Erro: Estoque insuficiente para {detalhes}.", 'danger')
+        return redirect(url_for('transacoes.editar_transacao', transacao_id=transacao_id))
+    
+    transacao.cliente_id = request.form['cliente_id']
+    transacao.forma_pagamento = request.form['forma_pagamento']
+    transacao.data_inicio = datetime.strptime(request.form['data_inicio'], '%Y-%m-%d').date() if request.form.get('data_inicio') else None
+    transacao.data_fim = datetime.strptime(request.form['data_fim'], '%Y-%m-%d').date() if request.form.get('data_fim') else None
+    
+    transacao.frete = float(request.form.get('frete', 0))
+    transacao.desconto = float(request.form.get('desconto', 0))
+    transacao.servicos = float(request.form.get('servicos', 0))
+    transacao.montagem = float(request.form.get('montagem', 0))
+
+    total_itens = sum(item.total_item for item in transacao.itens)
+    transacao.total = total_itens + transacao.frete + transacao.servicos + transacao.montagem - transacao.desconto
+
+    db.session.commit()
+    comprovante_atual = dados_comprovante(transacao)
+    if comprovante_atual != comprovante_anterior:
+        fila_comprovantes.invalidar(comprovante_anterior)
+        fila_comprovantes.agendar(comprovante_atual)
+    flash("Transação editada com sucesso!", 'success')
+    return redirect(url_for('transacoes.historico_transacoes'))
+
+@bp.route('/finalizar_aluguel/<int:transacao_id>')
+@login_required
+def finalizar_aluguel(transacao_id):
+    transacao = Transacao.query.get_or_404(transacao_id)
+    if transacao.tipo != 'Aluguel' or transacao.status != 'ativo':
+        # Já encerrado (pela agenda ou pela edição): o estoque já voltou
+        flash("Este aluguel não está ativo.", 'warning')
+        return redirect(url_for('agenda.agenda'))
+    transacao.status = 'finalizado'
+
+    for item in transacao.itens:
+        if item.produto_id:
+            produto = Produto.query.get(item.produto_id)
+            if produto:
+                movimentar_estoque(produto, item.quantidade, 'devolucao', transacao)
+        elif item.combo_id:
+            combo = Combo.query.get(item.combo_id)
+            for combo_item in combo.itens:
+                produto = Produto.query.get(combo_item.produto_id)
+                if produto:
+                    movimentar_estoque(produto, combo_item.quantidade * item.quantidade, 'devolucao', transacao)
+
+    db.session.commit()
+    flash("Aluguel finalizado e estoque reposto.", 'success')
+    return redirect(url_for('agenda.agenda'))
+
+@bp.route('/deletar_transacao/<int:transacao_id>')
+@login_required
+def deletar_transacao(transacao_id):
+    transacao = Transacao.query.get_or_404(transacao_id)
+    db.session.delete(transacao)
+    db.session.commit()
+    flash("Transação deletada com sucesso.", 'warning')
+    return redirect(url_for('transacoes.historico_transacoes'))
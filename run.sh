@@ -13,7 +13,27 @@ if ! command -v flask > /dev/null; then
     pip install flask
 fi
 
-# Inicia o servidor Flask
+# Atualiza o esquema do banco antes de subir os workers
+flask --app app iniciar-banco
+
+# Inicia o servidor: gunicorn com vários workers quando disponível, senão o servidor do Flask
 echo -e "${GREEN}Iniciando o servidor...${NC}"
 echo "Acesse o seu aplicativo no navegador: http://127.0.0.1:5000"
-python app.py
+# Cada navegador na página de vendas/agenda mantém uma conexão aberta em /eventos: com
+# gthread cada conexão custa uma thread (THREADS por worker), nunca um worker inteiro.
+# WORKER_GEVENT=1 troca por gevent (um greenlet por conexão) e só deve ser usado sabendo
+# que o gunicorn aplica o monkey-patching e as threads do sistema viram greenlets:
+# - o pool de hash de senhas (SENHA_WORKERS) e o de PDFs dos comprovantes perdem o
+#   paralelismo real, e um hash ou PDF em andamento trava o worker inteiro;
+# - a thread de vencimentos e a do canal de eventos só rodam quando o worker cede a vez;
+# - o perfilador (/perfil) lê sys._current_frames e não enxerga os greenlets.
+if command -v gunicorn > /dev/null; then
+    if [ "${WORKER_GEVENT:-0}" = "1" ]; then
+        CLASSE_WORKER=(--worker-class gevent --worker-connections "${CONEXOES:-1000}")
+    else
+        CLASSE_WORKER=(--worker-class gthread --threads "${THREADS:-50}")
+    fi
+    gunicorn --workers "${WORKERS:-3}" "${CLASSE_WORKER[@]}" --bind 127.0.0.1:5000 app:app
+else
+    LOJA_CONFIG=desenvolvimento python app.py
+fi
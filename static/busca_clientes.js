@@ -0,0 +1,93 @@
+// static/busca_clientes.js
+// Escolha do cliente por busca (nome ou telefone) em vez de uma lista com todos os clientes.
+// O campo de texto mostra o nome; o id escolhido vai no campo oculto enviado pelo formulário.
+// Sem conexão, procura na cópia local do catálogo (catalogo_offline.js), quando a página a carrega.
+const BUSCA_CLIENTES_ESPERA_MS = 200;
+const BUSCA_CLIENTES_LIMITE = 10;
+
+function normalizarBusca(texto) {
+    return (texto || '').normalize('NFKD').replace(/[\u0300-\u036f]/g, '').toLowerCase().trim().replace(/\s+/g, ' ');
+}
+
+async function buscarClientesOffline(termo) {
+    if (typeof listarCatalogo !== 'function') { return []; }
+    const alvo = normalizarBusca(termo);
+    const digitos = termo.replace(/\D/g, '');
+    const porNome = /\p{L}/u.test(alvo);
+    const clientes = await listarCatalogo('clientes');
+    return clientes
+        .filter(cliente => {
+            if (porNome) {
+                const nome = normalizarBusca(cliente.nome);
+                return nome.startsWith(alvo) || nome.includes(' ' + alvo);
+            }
+            return digitos && (cliente.telefone || '').replace(/\D/g, '').includes(digitos);
+        })
+        .sort((a, b) => normalizarBusca(a.nome).localeCompare(normalizarBusca(b.nome)))
+        .slice(0, BUSCA_CLIENTES_LIMITE);
+}
+
+function configurarBuscaCliente(campoTexto, campoId, url) {
+    const MENSAGEM = 'Escolha um cliente da lista.';
+    let espera = null;
+    let lista = null;
+
+    function fechar() {
+        if (lista) { lista.remove(); lista = null; }
+    }
+
+    function escolher(cliente) {
+        campoTexto.value = cliente.nome;
+        campoId.value = cliente.id;
+        campoTexto.setCustomValidity('');
+        fechar();
+    }
+
+    function mostrar(clientes) {
+        fechar();
+        lista = document.createElement('div');
+        lista.className = 'autocomplete-items';
+        if (!clientes.length) {
+            const vazio = document.createElement('div');
+            vazio.textContent = 'Nenhum cliente encontrado';
+            lista.appendChild(vazio);
+        }
+        clientes.forEach(cliente => {
+            const opcao = document.createElement('div');
+            const nome = document.createElement('strong');
+            nome.textContent = cliente.nome;
+            opcao.appendChild(nome);
+            if (cliente.telefone) { opcao.appendChild(document.createTextNode(` - ${cliente.telefone}`)); }
+            opcao.addEventListener('click', () => escolher(cliente));
+            lista.appendChild(opcao);
+        });
+        campoTexto.parentNode.appendChild(lista);
+    }
+
+    campoTexto.addEventListener('input', function() {
+        // Texto alterado: o cliente precisa ser escolhido de novo
+        campoId.value = '';
+        campoTexto.setCustomValidity(MENSAGEM);
+        clearTimeout(espera);
+        fechar();
+        const termo = this.value.trim();
+        if (!termo) { return; }
+        // Só consulta quando a digitação para por um instante
+        espera = setTimeout(async () => {
+            let clientes;
+            try {
+                const resposta = await fetch(`${url}?termo=${encodeURIComponent(termo)}&limite=${BUSCA_CLIENTES_LIMITE}`,
+                                             { credentials: 'same-origin' });
+                const json = (resposta.headers.get('content-type') || '').includes('application/json');
+                clientes = resposta.ok && json ? await resposta.json() : await buscarClientesOffline(termo);
+            } catch (erro) {
+                clientes = await buscarClientesOffline(termo);
+            }
+            // Resposta de uma busca que já foi substituída por outra
+            if (campoTexto.value.trim() !== termo) { return; }
+            mostrar(clientes);
+        }, BUSCA_CLIENTES_ESPERA_MS);
+    });
+
+    document.addEventListener('click', e => { if (e.target !== campoTexto) { fechar(); } });
+}
@@ -0,0 +1,89 @@
+// static/catalogo_offline.js
+// Cópia local (IndexedDB) do catálogo de produtos, combos e clientes.
+// Usado pelo service worker e também pode ser usado pelas páginas para consultas offline.
+const CATALOGO_DB = 'catalogo-loja';
+const CATALOGO_DB_VERSAO = 1;
+const CATALOGO_STORES = ['produtos', 'combos', 'clientes'];
+
+function abrirCatalogo() {
+    return new Promise((resolve, reject) => {
+        const pedido = indexedDB.open(CATALOGO_DB, CATALOGO_DB_VERSAO);
+        pedido.onupgradeneeded = () => {
+            const banco = pedido.result;
+            CATALOGO_STORES.forEach(nome => {
+                if (!banco.objectStoreNames.contains(nome)) {
+                    banco.createObjectStore(nome, { keyPath: 'id' });
+                }
+            });
+            if (!banco.objectStoreNames.contains('meta')) {
+                banco.createObjectStore('meta');
+            }
+        };
+        pedido.onsuccess = () => resolve(pedido.result);
+        pedido.onerror = () => reject(pedido.error);
+    });
+}
+
+function concluirTransacao(transacao) {
+    return new Promise((resolve, reject) => {
+        transacao.oncomplete = () => resolve();
+        transacao.onerror = () => reject(transacao.error);
+        transacao.onabort = () => reject(transacao.error);
+    });
+}
+
+function lerMeta(banco) {
+    return new Promise((resolve, reject) => {
+        const pedido = banco.transaction('meta').objectStore('meta').get('estado');
+        pedido.onsuccess = () => resolve(pedido.result || { versao: 0, epoca: null });
+        pedido.onerror = () => reject(pedido.error);
+    });
+}
+
+// Aplica um snapshot completo ou um delta em uma única transação do IndexedDB
+function aplicarAlteracoes(banco, dados) {
+    const transacao = banco.transaction(CATALOGO_STORES.concat(['meta']), 'readwrite');
+    CATALOGO_STORES.forEach(nome => {
+        const store = transacao.objectStore(nome);
+        if (dados.completo) {
+            store.clear();
+        }
+        (dados[nome] || []).forEach(registro => store.put(registro));
+        ((dados.removidos || {})[nome] || []).forEach(id => store.delete(id));
+    });
+    transacao.objectStore('meta').put({ versao: dados.versao, epoca: dados.epoca, sincronizado_em: Date.now() }, 'estado');
+    return concluirTransacao(transacao);
+}
+
+// Busca só o que mudou desde a última versão salva (ou o catálogo completo na primeira vez)
+async function sincronizarCatalogo() {
+    const banco = await abrirCatalogo();
+    try {
+        const meta = await lerMeta(banco);
+        const url = meta.epoca
+            ? `/sync/delta?desde=${meta.versao}&epoca=${encodeURIComponent(meta.epoca)}`
+            : '/sync/catalogo';
+        const resposta = await fetch(url, { credentials: 'same-origin', cache: 'no-store' });
+        if (!resposta.ok || !(resposta.headers.get('content-type') || '').includes('application/json')) {
+            // Sessão expirada (redireciona para o login) ou servidor indisponível
+            return false;
+        }
+        await aplicarAlteracoes(banco, await resposta.json());
+        return true;
+    } finally {
+        banco.close();
+    }
+}
+
+async function listarCatalogo(nome) {
+    const banco = await abrirCatalogo();
+    try {
+        return await new Promise((resolve, reject) => {
+            const pedido = banco.transaction(nome).objectStore(nome).getAll();
+            pedido.onsuccess = () => resolve(pedido.result);
+            pedido.onerror = () => reject(pedido.error);
+        });
+    } finally {
+        banco.close();
+    }
+}
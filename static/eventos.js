@@ -0,0 +1,51 @@
+// static/eventos.js
+// Mudanças de estoque e de aluguéis enviadas pelo servidor (Server-Sent Events em /eventos).
+// Ativado pela tag <script ... data-eventos="/eventos">. Elementos com
+// data-estoque-produto="ID" passam a mostrar a quantidade atual do produto; as páginas
+// reagem ao resto pelos eventos "estoque-atualizado" e "alugueis-atualizados" do document.
+(function () {
+    const script = document.currentScript;
+    const urlEventos = script && script.dataset.eventos;
+    if (!urlEventos || !window.EventSource || window.canalEventosAtivo) {
+        return;
+    }
+    window.canalEventosAtivo = true;
+
+    const fonte = new EventSource(urlEventos);
+
+    function ler(evento) {
+        try {
+            return JSON.parse(evento.data);
+        } catch (erro) {
+            return null;
+        }
+    }
+
+    fonte.addEventListener('estoque', evento => {
+        const dados = ler(evento);
+        if (!dados) { return; }
+        Object.entries(dados.produtos).forEach(([id, quantidade]) => {
+            document.querySelectorAll(`[data-estoque-produto="${id}"]`).forEach(elemento => {
+                if (elemento.textContent.trim() !== String(quantidade)) {
+                    elemento.textContent = quantidade;
+                    elemento.classList.add('table-info');
+                    setTimeout(() => elemento.classList.remove('table-info'), 3000);
+                }
+            });
+        });
+        document.dispatchEvent(new CustomEvent('estoque-atualizado', { detail: dados.produtos }));
+    });
+
+    fonte.addEventListener('aluguel', evento => {
+        const dados = ler(evento);
+        if (dados) {
+            document.dispatchEvent(new CustomEvent('alugueis-atualizados', { detail: dados }));
+        }
+    });
+
+    fonte.addEventListener('recarregar', () => {
+        if (typeof showNotification === 'function') {
+            showNotification('Os dados da loja foram restaurados. <a href="" class="alert-link">Recarregar a página</a>', 'warning', 0);
+        }
+    });
+})();
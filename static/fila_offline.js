@@ -0,0 +1,159 @@
+// static/fila_offline.js
+// Fila local (IndexedDB) de transações registradas sem conexão.
+// Cada transação recebe uma chave gerada no aparelho; o servidor ignora chaves já gravadas,
+// então reenviar a fila depois de uma falha de rede nunca duplica vendas.
+const FILA_DB = 'fila-loja';
+const FILA_DB_VERSAO = 1;
+const FILA_STORE = 'transacoes';
+const FILA_TAMANHO_LOTE = 200;
+
+function abrirFila() {
+    return new Promise((resolve, reject) => {
+        const pedido = indexedDB.open(FILA_DB, FILA_DB_VERSAO);
+        pedido.onupgradeneeded = () => {
+            if (!pedido.result.objectStoreNames.contains(FILA_STORE)) {
+                pedido.result.createObjectStore(FILA_STORE, { keyPath: 'chave' });
+            }
+        };
+        pedido.onsuccess = () => resolve(pedido.result);
+        pedido.onerror = () => reject(pedido.error);
+    });
+}
+
+function gerarChave() {
+    if (self.crypto && self.crypto.randomUUID) {
+        return self.crypto.randomUUID();
+    }
+    return Date.now().toString(16) + '-' + Math.random().toString(16).slice(2);
+}
+
+// Hora local do tablet com o fuso (ex.: 2026-10-19T14:05:00-03:00); toISOString() daria UTC
+function dataLocalComFuso(data = new Date()) {
+    const dois = n => String(Math.floor(Math.abs(n))).padStart(2, '0');
+    const minutos = -data.getTimezoneOffset();
+    return `${data.getFullYear()}-${dois(data.getMonth() + 1)}-${dois(data.getDate())}` +
+        `T${dois(data.getHours())}:${dois(data.getMinutes())}:${dois(data.getSeconds())}` +
+        `${minutos >= 0 ? '+' : '-'}${dois(minutos / 60)}:${dois(minutos % 60)}`;
+}
+
+async function enfileirarTransacao(dados) {
+    const registro = Object.assign({}, dados, {
+        chave: gerarChave(),
+        data: dados.data || dataLocalComFuso(),
+        situacao: 'pendente'
+    });
+    const banco = await abrirFila();
+    try {
+        const transacao = banco.transaction(FILA_STORE, 'readwrite');
+        transacao.objectStore(FILA_STORE).put(registro);
+        await new Promise((resolve, reject) => {
+            transacao.oncomplete = resolve;
+            transacao.onerror = () => reject(transacao.error);
+        });
+    } finally {
+        banco.close();
+    }
+    // Pede ao navegador para enviar quando a conexão voltar (Background Sync)
+    if (self.navigator && navigator.serviceWorker && navigator.serviceWorker.ready) {
+        navigator.serviceWorker.ready
+            .then(registro => registro.sync && registro.sync.register('transacoes'))
+            .catch(() => null);
+    }
+    return registro;
+}
+
+async function listarFila() {
+    const banco = await abrirFila();
+    try {
+        return await new Promise((resolve, reject) => {
+            const pedido = banco.transaction(FILA_STORE).objectStore(FILA_STORE).getAll();
+            pedido.onsuccess = () => resolve(pedido.result);
+            pedido.onerror = () => reject(pedido.error);
+        });
+    } finally {
+        banco.close();
+    }
+}
+
+// Envia as pendentes em lotes. Criadas e duplicadas saem da fila;
+// conflitos de estoque e erros ficam guardados para revisão da equipe.
+async function enviarFila() {
+    const pendentes = (await listarFila()).filter(registro => registro.situacao === 'pendente');
+    const resumo = { criadas: 0, duplicadas: 0, conflitos: 0, erros: 0 };
+    for (let inicio = 0; inicio < pendentes.length; inicio += FILA_TAMANHO_LOTE) {
+        const lote = pendentes.slice(inicio, inicio + FILA_TAMANHO_LOTE);
+        const resposta = await fetch('/sync/transacoes', {
+            method: 'POST',
+            credentials: 'same-origin',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ transacoes: lote })
+        });
+        if (!resposta.ok || !(resposta.headers.get('content-type') || '').includes('application/json')) {
+            throw new Error('Não foi possível enviar a fila (sessão expirada ou servidor indisponível).');
+        }
+        const { resultados } = await resposta.json();
+        const banco = await abrirFila();
+        try {
+            const transacao = banco.transaction(FILA_STORE, 'readwrite');
+            const store = transacao.objectStore(FILA_STORE);
+            const porChave = new Map(lote.map(registro => [registro.chave, registro]));
+            resultados.forEach(resultado => {
+                const registro = porChave.get(resultado.chave);
+                if (!registro) {
+                    return;
+                }
+                if (resultado.status === 'criada' || resultado.status === 'duplicada') {
+                    store.delete(resultado.chave);
+                    resumo[resultado.status === 'criada' ? 'criadas' : 'duplicadas'] += 1;
+                } else {
+                    registro.situacao = resultado.status;
+                    registro.detalhes = resultado.conflitos || resultado.erro;
+                    store.put(registro);
+                    resumo[resultado.status === 'conflito' ? 'conflitos' : 'erros'] += 1;
+                }
+            });
+            await new Promise((resolve, reject) => {
+                transacao.oncomplete = resolve;
+                transacao.onerror = () => reject(transacao.error);
+            });
+        } finally {
+            banco.close();
+        }
+    }
+    return resumo;
+}
+
+async function descartarDaFila(chave) {
+    const banco = await abrirFila();
+    try {
+        const transacao = banco.transaction(FILA_STORE, 'readwrite');
+        transacao.objectStore(FILA_STORE).delete(chave);
+        await new Promise((resolve, reject) => {
+            transacao.oncomplete = resolve;
+            transacao.onerror = () => reject(transacao.error);
+        });
+    } finally {
+        banco.close();
+    }
+}
+
+// Devolve uma transação com conflito para a fila depois de ajustada
+async function reenfileirar(chave) {
+    const registro = (await listarFila()).find(item => item.chave === chave);
+    if (!registro) {
+        return;
+    }
+    registro.situacao = 'pendente';
+    delete registro.detalhes;
+    const banco = await abrirFila();
+    try {
+        const transacao = banco.transaction(FILA_STORE, 'readwrite');
+        transacao.objectStore(FILA_STORE).put(registro);
+        await new Promise((resolve, reject) => {
+            transacao.oncomplete = resolve;
+            transacao.onerror = () => reject(transacao.error);
+        });
+    } finally {
+        banco.close();
+    }
+}
@@ -1,9 +1,13 @@
 // static/notifications.js
-function showNotification(message, type = 'success') {
-    const notificationContainer = document.getElementById('notification-container');
+function showNotification(message, type = 'success', duracao = 5000) {
+    let notificationContainer = document.getElementById('notification-container');
     if (!notificationContainer) {
-        console.error('Elemento #notification-container não encontrado.');
-        return;
+        // Páginas que não herdam de base.html não têm o contêiner
+        notificationContainer = document.createElement('div');
+        notificationContainer.id = 'notification-container';
+        notificationContainer.className = 'position-fixed top-0 end-0 p-3';
+        notificationContainer.style.zIndex = 1050;
+        document.body.appendChild(notificationContainer);
     }
 
     const notification = document.createElement('div');
@@ -13,11 +17,105 @@ function showNotification(message, type = 'success') {
         ${message}
         <button type="button" class="btn-close" data-bs-dismiss="alert" aria-label="Close"></button>
     `;
-    
+
     notificationContainer.appendChild(notification);
 
-    setTimeout(() => {
-        const bsAlert = new bootstrap.Alert(notification);
-        bsAlert.close();
-    }, 5000); // 5 segundos
+    // duracao = 0 mantém o aviso até ser fechado
+    if (duracao) {
+        setTimeout(() => {
+            const bsAlert = new bootstrap.Alert(notification);
+            bsAlert.close();
+        }, duracao);
+    }
 }
+
+// ===== ALERTAS DE VENCIMENTO DOS ALUGUÉIS =====
+// Ativado pela tag <script ... data-alertas="/alertas" data-agenda="/agenda">.
+// Consulta o servidor a cada minuto e mostra cada lembrete uma única vez por navegador.
+(function () {
+    const script = document.currentScript;
+    const urlAlertas = script && script.dataset.alertas;
+    if (!urlAlertas || window.alertasVencimentoAtivos) {
+        return;
+    }
+    window.alertasVencimentoAtivos = true;
+
+    const INTERVALO = 60000;
+    const CHAVE_VISTOS = 'alertasVencimentoVistos';
+    const CHAVE_ULTIMO = 'alertasVencimentoUltimo';
+    const CHAVE_ATRASADOS = 'alertasVencimentoAtrasados';
+    const urlAgenda = script.dataset.agenda;
+
+    function escapar(texto) {
+        const div = document.createElement('div');
+        div.textContent = texto;
+        return div.innerHTML;
+    }
+
+    function lerVistos() {
+        try {
+            return JSON.parse(localStorage.getItem(CHAVE_VISTOS)) || [];
+        } catch (erro) {
+            return [];
+        }
+    }
+
+    function comLinkAgenda(mensagem) {
+        return urlAgenda ? `${mensagem} <a href="${urlAgenda}" class="alert-link">Ver agenda</a>` : mensagem;
+    }
+
+    async function consultar() {
+        if (document.hidden) {
+            return;
+        }
+        const ultimo = Number(sessionStorage.getItem(CHAVE_ULTIMO) || 0);
+        let dados;
+        try {
+            const resposta = await fetch(`${urlAlertas}?desde=${ultimo}`, { credentials: 'same-origin' });
+            // Sessão expirada redireciona para o login (HTML): ignora em silêncio
+            if (!resposta.ok || !(resposta.headers.get('content-type') || '').includes('json')) {
+                return;
+            }
+            dados = await resposta.json();
+        } catch (erro) {
+            return;
+        }
+
+        const vistos = lerVistos();
+        const conjunto = new Set(vistos);
+        dados.alertas.forEach(alerta => {
+            if (conjunto.has(alerta.chave)) {
+                return;
+            }
+            conjunto.add(alerta.chave);
+            vistos.push(alerta.chave);
+            showNotification(comLinkAgenda(escapar(alerta.mensagem)), alerta.tipo, alerta.tipo === 'danger' ? 0 : 15000);
+        });
+        localStorage.setItem(CHAVE_VISTOS, JSON.stringify(vistos.slice(-500)));
+        sessionStorage.setItem(CHAVE_ULTIMO, dados.ultimo);
+
+        // Resumo dos atrasados uma vez por sessão (e de novo se a lista mudar)
+        const atrasados = dados.atrasados.join(',');
+        if (dados.atrasados.length && sessionStorage.getItem(CHAVE_ATRASADOS) !== atrasados) {
+            const quantidade = dados.atrasados.length;
+            showNotification(comLinkAgenda(quantidade === 1 ? '1 aluguel está atrasado.' : `${quantidade} aluguéis estão atrasados.`), 'danger', 0);
+        }
+        sessionStorage.setItem(CHAVE_ATRASADOS, atrasados);
+    }
+
+    function iniciar() {
+        consultar();
+        setInterval(consultar, INTERVALO);
+        document.addEventListener('visibilitychange', () => {
+            if (!document.hidden) {
+                consultar();
+            }
+        });
+    }
+
+    if (document.readyState === 'loading') {
+        document.addEventListener('DOMContentLoaded', iniciar);
+    } else {
+        iniciar();
+    }
+})();
@@ -1,17 +1,40 @@
-const CACHE_NAME = 'sistema-loja-v1';
+importScripts('/static/catalogo_offline.js', '/static/fila_offline.js');
+
+const CACHE_NAME = 'sistema-loja-v6';
+// Intervalo mínimo entre sincronizações disparadas pela navegação
+const INTERVALO_SINCRONIZACAO_MS = 60 * 1000;
+// Tempo máximo esperando a rede antes de mostrar a página salva
+const TEMPO_LIMITE_PAGINA_MS = 4000;
 
 // Lista de arquivos para salvar no cache (Offline)
-// Adicione aqui as rotas principais e arquivos CSS/JS
 const urlsToCache = [
   '/',
   '/static/style.css',
   '/static/notifications.js',
+  '/static/catalogo_offline.js',
+  '/static/fila_offline.js',
+  '/static/busca_clientes.js',
+  '/static/eventos.js',
   '/static/images/icon-192x192.png',
   '/static/images/icon-512x512.png',
   'https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/css/bootstrap.min.css',
   'https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.0.0/css/all.min.css'
 ];
 
+let ultimaSincronizacao = 0;
+
+function sincronizarSeNecessario(forcar = false) {
+  const agora = Date.now();
+  if (!forcar && agora - ultimaSincronizacao < INTERVALO_SINCRONIZACAO_MS) {
+    return Promise.resolve(false);
+  }
+  ultimaSincronizacao = agora;
+  return sincronizarCatalogo().catch(erro => {
+    console.log('Falha ao sincronizar o catálogo:', erro);
+    return false;
+  });
+}
+
 // Instalação: Cria o cache e salva os arquivos estáticos
 self.addEventListener('install', event => {
   event.waitUntil(
@@ -20,6 +43,7 @@ self.addEventListener('install', event => {
         console.log('Cache aberto: Salvando arquivos estáticos');
         return cache.addAll(urlsToCache);
       })
+      .then(() => self.skipWaiting())
   );
 });
 
@@ -35,29 +59,100 @@ self.addEventListener('activate', event => {
           }
         })
       );
-    })
+    }).then(() => self.clients.claim())
+      .then(() => sincronizarSeNecessario(true))
   );
 });
 
-// Interceptação de buscas (Fetch): 
-// Tenta buscar na rede primeiro, se falhar (offline), busca no cache.
-self.addEventListener('fetch', event => {
-  event.respondWith(
+// As páginas podem pedir uma sincronização imediata: navigator.serviceWorker.controller.postMessage({tipo: 'sincronizar'})
+self.addEventListener('message', event => {
+  if (event.data && event.data.tipo === 'sincronizar') {
+    event.waitUntil(sincronizarSeNecessario(true));
+  }
+});
+
+// Background Sync: o navegador dispara quando a conexão volta
+self.addEventListener('sync', event => {
+  if (event.tag === 'catalogo') {
+    event.waitUntil(sincronizarSeNecessario(true));
+  }
+  if (event.tag === 'transacoes') {
+    // O estoque muda depois das vendas enviadas, então o catálogo é atualizado em seguida
+    event.waitUntil(enviarFila().then(() => sincronizarSeNecessario(true)));
+  }
+});
+
+// Stale-while-revalidate (arquivos estáticos): responde com o cache e atualiza em segundo plano
+function staleWhileRevalidate(event) {
+  return caches.open(CACHE_NAME).then(cache =>
+    cache.match(event.request).then(emCache => {
+      const daRede = fetch(event.request)
+        .then(response => guardarSeValida(cache, event.request, response))
+        .catch(() => emCache);
+      if (emCache) {
+        event.waitUntil(daRede);
+        return emCache;
+      }
+      return daRede;
+    })
+  );
+}
+
+function guardarSeValida(cache, request, response) {
+  if (response && response.status === 200 && !response.redirected &&
+      (response.type === 'basic' || response.type === 'cors')) {
+    cache.put(request, response.clone());
+  }
+  return response;
+}
+
+// APIs: sempre a rede; a cópia salva só responde quando não há conexão
+function redeComCacheReserva(event) {
+  return caches.open(CACHE_NAME).then(cache =>
     fetch(event.request)
-      .then(response => {
-        // Se a resposta for válida, clonamos e salvamos no cache para uso futuro
-        if (!response || response.status !== 200 || response.type !== 'basic') {
-          return response;
+      .then(response => guardarSeValida(cache, event.request, response))
+      .catch(() => cache.match(event.request).then(emCache => emCache || Response.error()))
+  );
+}
+
+// Páginas HTML: rede primeiro (carrinho e mensagens mudam a cada ação), mas com
+// tempo limite; em conexão fraca ou sem sinal mostra a última versão salva.
+function redePrimeiroComTempoLimite(event) {
+  return caches.open(CACHE_NAME).then(cache => {
+    const daRede = fetch(event.request).then(response => guardarSeValida(cache, event.request, response));
+    const limite = new Promise(resolve => setTimeout(resolve, TEMPO_LIMITE_PAGINA_MS));
+    return Promise.race([daRede, limite.then(() => cache.match(event.request))])
+      .then(resposta => {
+        if (resposta) {
+          event.waitUntil(daRede.catch(() => null));
+          return resposta;
         }
-        const responseToCache = response.clone();
-        caches.open(CACHE_NAME).then(cache => {
-          cache.put(event.request, responseToCache);
-        });
-        return response;
+        return daRede;
       })
-      .catch(() => {
-        // Se a rede falhar, tenta encontrar no cache
-        return caches.match(event.request);
-      })
-  );
-});
\ No newline at end of file
+      .catch(() => cache.match(event.request).then(emCache => emCache || caches.match('/')));
+  });
+}
+
+self.addEventListener('fetch', event => {
+  if (event.request.method !== 'GET') {
+    return;
+  }
+  const url = new URL(event.request.url);
+  // Dados de sincronização, downloads, feeds e o canal de eventos sempre vão direto à rede
+  if (url.origin === self.location.origin &&
+      (url.pathname === '/eventos' || url.pathname.startsWith('/sync/') || url.pathname.startsWith('/comprovantes/') || url.pathname.endsWith('.ics') || url.pathname.endsWith('/pdf'))) {
+    return;
+  }
+  if (event.request.mode === 'navigate') {
+    event.waitUntil(sincronizarSeNecessario());
+    event.respondWith(redePrimeiroComTempoLimite(event));
+    return;
+  }
+  // Só arquivos estáticos e bibliotecas da CDN podem vir do cache antes da rede; as APIs
+  // (busca de produtos e clientes, alertas, agenda, relatórios) mudam a cada venda
+  if (url.origin !== self.location.origin || url.pathname.startsWith('/static/')) {
+    event.respondWith(staleWhileRevalidate(event));
+    return;
+  }
+  event.respondWith(redeComCacheReserva(event));
+});
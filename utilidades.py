@@ -0,0 +1,56 @@
+import os
+import re
+import json
+import unicodedata
+from datetime import datetime, date
+
+# Funções auxiliares
+def formatar_data(d):
+    if isinstance(d, date):
+        return d.strftime('%Y-%m-%d')
+    return d
+
+def formatar_datetime(dt):
+    if isinstance(dt, datetime):
+        return dt.strftime('%Y-%m-%d %H:%M:%S')
+    return dt
+
+def carregar_json(arquivo):
+    try:
+        with open(arquivo, 'r') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+def salvar_json(dados, arquivo):
+    with open(arquivo, 'w') as f:
+        json.dump(dados, f, indent=4)
+
+def calcular_preco_final(preco_compra, porcentagem_lucro):
+    return preco_compra * (1 + porcentagem_lucro / 100)
+
+def garantir_pasta(pasta):
+    # As pastas são criadas no primeiro uso, não na inicialização da aplicação
+    os.makedirs(pasta, exist_ok=True)
+    return pasta
+
+def normalizar_busca(texto):
+    # Minúsculas, sem acentos e com espaços simples: "  JOSÉ  da Conceição" -> "jose da conceicao"
+    decomposto = unicodedata.normalize('NFKD', texto or '')
+    return ' '.join(''.join(c for c in decomposto if not unicodedata.combining(c)).casefold().split())
+
+def normalizar_telefone(texto):
+    # Só os dígitos, sem zeros à esquerda nem o código do país (55) na frente do DDD:
+    # "+55 (11) 98765-4321", "011 98765 4321" e "11987654321" ficam iguais
+    digitos = re.sub(r'\D', '', texto or '').lstrip('0')
+    if len(digitos) > 11 and digitos.startswith('55'):
+        digitos = digitos[2:]
+    return digitos or None
+
+def ler_data_hora_local(texto):
+    # ISO 8601 vindo do navegador; com fuso, convertido para a hora local do servidor
+    # (sem fuso), como as datas gravadas com datetime.now()
+    data = datetime.fromisoformat(texto)
+    if data.tzinfo is not None:
+        data = data.astimezone().replace(tzinfo=None)
+    return data
@@ -0,0 +1,282 @@
+import os
+import threading
+from collections import deque
+from datetime import datetime, time, timedelta
+
+# ===== HEAP INDEXADO =====
+class HeapIndexado:
+    # Min-heap de (momento, chave) com a posição de cada chave guardada em um dict:
+    # atualizar ou remover uma chave custa O(log n), sem reconstruir o heap.
+    def __init__(self):
+        self._itens = []
+        self._posicao = {}
+
+    def __len__(self):
+        return len(self._itens)
+
+    def __contains__(self, chave):
+        return chave in self._posicao
+
+    def topo(self):
+        return self._itens[0] if self._itens else None
+
+    def definir(self, chave, momento):
+        i = self._posicao.get(chave)
+        if i is None:
+            self._itens.append((momento, chave))
+            self._posicao[chave] = len(self._itens) - 1
+            self._subir(len(self._itens) - 1)
+            return
+        antigo = self._itens[i][0]
+        self._itens[i] = (momento, chave)
+        if momento < antigo:
+            self._subir(i)
+        else:
+            self._descer(i)
+
+    def remover(self, chave):
+        i = self._posicao.pop(chave, None)
+        if i is None:
+            return
+        ultimo = self._itens.pop()
+        if i < len(self._itens):
+            self._itens[i] = ultimo
+            self._posicao[ultimo[1]] = i
+            self._subir(i)
+            self._descer(self._posicao[ultimo[1]])
+
+    def retirar(self):
+        momento, chave = self._itens[0]
+        self.remover(chave)
+        return momento, chave
+
+    def _trocar(self, i, j):
+        self._itens[i], self._itens[j] = self._itens[j], self._itens[i]
+        self._posicao[self._itens[i][1]] = i
+        self._posicao[self._itens[j][1]] = j
+
+    def _subir(self, i):
+        while i > 0:
+            pai = (i - 1) // 2
+            if self._itens[i][0] >= self._itens[pai][0]:
+                break
+            self._trocar(i, pai)
+            i = pai
+
+    def _descer(self, i):
+        n = len(self._itens)
+        while True:
+            menor = i
+            for filho in (2 * i + 1, 2 * i + 2):
+                if filho < n and self._itens[filho][0] < self._itens[menor][0]:
+                    menor = filho
+            if menor == i:
+                return
+            self._trocar(i, menor)
+            i = menor
+
+# ===== ETAPAS DE UM ALUGUEL ATIVO =====
+# Cada aluguel ativo ocupa uma única entrada no heap: a da sua próxima etapa.
+# lembrete de retirada -> lembrete de devolução -> atraso (fica sinalizado até ser finalizado)
+ETAPAS = ('retirada', 'devolucao', 'atraso')
+
+def _inicio_do_dia(dia):
+    return datetime.combine(dia, time.min)
+
+def momentos_do_aluguel(data_inicio, data_fim, antecedencia):
+    fim = data_fim or data_inicio
+    return {
+        'retirada': _inicio_do_dia(data_inicio) - antecedencia,
+        'devolucao': _inicio_do_dia(fim) - antecedencia,
+        'atraso': _inicio_do_dia(fim + timedelta(days=1)),
+    }
+
+def mensagem_alerta(etapa, aluguel):
+    if etapa == 'retirada':
+        return f"Aluguel #{aluguel['id']} de {aluguel['cliente']} começa em {aluguel['data_inicio']:%d/%m/%Y}: separar e entregar os itens."
+    if etapa == 'devolucao':
+        return f"Devolução do aluguel #{aluguel['id']} de {aluguel['cliente']} prevista para {aluguel['data_fim']:%d/%m/%Y}."
+    return f"Aluguel #{aluguel['id']} de {aluguel['cliente']} está atrasado: devolução era {aluguel['data_fim']:%d/%m/%Y}."
+
+# ===== AGENDADOR =====
+class AgendaVencimentos:
+    # Mantém os aluguéis ativos em um HeapIndexado ordenado pela próxima etapa.
+    # O banco só é lido na carga inicial (e na recarga periódica); depois, cada commit
+    # que mexe em um aluguel atualiza apenas a entrada dele.
+    def __init__(self, antecedencia_horas=24, recarga_minutos=10, max_alertas=500):
+        self.antecedencia = timedelta(hours=antecedencia_horas)
+        self.recarga = timedelta(minutes=recarga_minutos)
+        self.app = None
+        self.carregador = None
+        self.iniciar_thread = True
+        self._heap = HeapIndexado()
+        self._alugueis = {}
+        self.atrasados = {}
+        self._alertas = deque(maxlen=max_alertas)
+        self._ultimo_alerta = 0
+        self._carregado_em = None
+        self._pid = None
+        self._thread = None
+        self._condicao = threading.Condition()
+
+    def init_app(self, app, carregador):
+        self.configurar(app, carregador)
+        app.extensions['agenda_vencimentos'] = self
+
+    def configurar(self, app, carregador):
+        # carregador(): lista de dicts {id, cliente, data_inicio, data_fim} dos aluguéis ativos
+        self.app = app
+        self.carregador = carregador
+        self.antecedencia = timedelta(hours=app.config.get('VENCIMENTOS_ANTECEDENCIA_HORAS', 24))
+        self.recarga = timedelta(minutes=app.config.get('VENCIMENTOS_RECARGA_MINUTOS', 10))
+        self.iniciar_thread = app.config.get('VENCIMENTOS_THREAD', True)
+
+    # ----- carga -----
+    def garantir_carregado(self, agora=None):
+        # Carrega no primeiro uso em cada processo (workers do gunicorn fazem fork depois da importação)
+        agora = agora or datetime.now()
+        with self._condicao:
+            precisa = self._pid != os.getpid() or self._carregado_em is None or agora - self._carregado_em >= self.recarga
+        if precisa:
+            with self.app.app_context():
+                alugueis = self.carregador()
+            self.recarregar(alugueis, agora)
+        self._iniciar_thread()
+
+    def recarregar(self, alugueis, agora=None):
+        agora = agora or datetime.now()
+        with self._condicao:
+            primeira_carga = self._pid != os.getpid() or self._carregado_em is None
+            self._heap = HeapIndexado()
+            self._alugueis = {}
+            atrasados_antes = self.atrasados
+            self.atrasados = {}
+            for aluguel in alugueis:
+                self._agendar(aluguel, agora, anunciar_atraso=not primeira_carga and aluguel['id'] not in atrasados_antes)
+            self._carregado_em = agora
+            self._pid = os.getpid()
+            self._condicao.notify()
+
+    # ----- atualizações incrementais -----
+    def carregada(self):
+        # Antes da primeira carga não há o que atualizar: a carga vai ler o estado atual do banco
+        return self._carregado_em is not None and self._pid == os.getpid()
+
+    def atualizar(self, aluguel, agora=None):
+        agora = agora or datetime.now()
+        with self._condicao:
+            if not self.carregada():
+                return
+            ja_atrasado = aluguel['id'] in self.atrasados
+            self._remover(aluguel['id'])
+            self._agendar(aluguel, agora, anunciar_atraso=not ja_atrasado)
+            self._condicao.notify()
+
+    def remover(self, transacao_id):
+        with self._condicao:
+            self._remover(transacao_id)
+
+    def invalidar(self):
+        # Para quando o banco inteiro muda (restauração/limpeza): a próxima consulta recarrega
+        with self._condicao:
+            self._carregado_em = None
+
+    def _remover(self, transacao_id):
+        self._heap.remover(transacao_id)
+        self._alugueis.pop(transacao_id, None)
+        self.atrasados.pop(transacao_id, None)
+
+    def _agendar(self, aluguel, agora, anunciar_atraso):
+        # Etapas cujo momento já passou são puladas; só o atraso fica registrado
+        if not aluguel.get('data_inicio'):
+            return
+        momentos = momentos_do_aluguel(aluguel['data_inicio'], aluguel['data_fim'], self.antecedencia)
+        aluguel = dict(aluguel, data_fim=aluguel['data_fim'] or aluguel['data_inicio'], etapa=None)
+        self._alugueis[aluguel['id']] = aluguel
+        for etapa in ETAPAS:
+            if etapa == 'atraso' and momentos['atraso'] <= agora:
+                self._marcar_atraso(aluguel, anunciar_atraso)
+                return
+            if momentos[etapa] > agora:
+                aluguel['etapa'] = etapa
+                self._heap.definir(aluguel['id'], momentos[etapa])
+                return
+
+    def _marcar_atraso(self, aluguel, anunciar):
+        self.atrasados[aluguel['id']] = aluguel
+        if anunciar:
+            self._alertar('atraso', aluguel)
+
+    def _alertar(self, etapa, aluguel):
+        self._ultimo_alerta += 1
+        data = aluguel['data_inicio'] if etapa == 'retirada' else aluguel['data_fim']
+        self._alertas.append({
+            'id': self._ultimo_alerta,
+            'chave': f"{etapa}:{aluguel['id']}:{data.isoformat()}",
+            'etapa': etapa,
+            'transacao_id': aluguel['id'],
+            'mensagem': mensagem_alerta(etapa, aluguel),
+            'tipo': 'danger' if etapa == 'atraso' else 'warning'
+        })
+
+    # ----- disparo -----
+    def processar(self, agora=None):
+        # Dispara tudo o que venceu até agora; O(k log n) para k etapas vencidas
+        agora = agora or datetime.now()
+        with self._condicao:
+            while len(self._heap) and self._heap.topo()[0] <= agora:
+                _, transacao_id = self._heap.retirar()
+                aluguel = self._alugueis[transacao_id]
+                etapa = aluguel['etapa']
+                if etapa == 'atraso':
+                    self._marcar_atraso(aluguel, True)
+                    continue
+                self._alertar(etapa, aluguel)
+                seguinte = ETAPAS[ETAPAS.index(etapa) + 1]
+                momentos = momentos_do_aluguel(aluguel['data_inicio'], aluguel['data_fim'], self.antecedencia)
+                aluguel['etapa'] = seguinte
+                self._heap.definir(transacao_id, momentos[seguinte])
+            topo = self._heap.topo()
+            return topo[0] if topo else None
+
+    def alertas_desde(self, ultimo_id):
+        # Um id maior que o deste processo (outro worker ou reinício) devolve tudo;
+        # o navegador descarta pela chave o que já mostrou
+        with self._condicao:
+            if ultimo_id > self._ultimo_alerta:
+                ultimo_id = 0
+            return [alerta for alerta in self._alertas if alerta['id'] > ultimo_id], self._ultimo_alerta
+
+    def resumo(self):
+        with self._condicao:
+            return {
+                'pendentes': len(self._heap),
+                'atrasados': sorted(self.atrasados),
+                'proximo': self._heap.topo()[0].isoformat() if len(self._heap) else None
+            }
+
+    # ----- thread em segundo plano -----
+    def _iniciar_thread(self):
+        if not self.iniciar_thread:
+            return
+        with self._condicao:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._executar, name='vencimentos', daemon=True)
+            self._thread.start()
+
+    def _executar(self):
+        # Dorme até a próxima etapa (ou até a próxima recarga) e acorda antes se um commit mudar o topo
+        while True:
+            proximo = self.processar()
+            with self._condicao:
+                espera = self.recarga.total_seconds()
+                if proximo is not None:
+                    espera = min(espera, max(0.0, (proximo - datetime.now()).total_seconds()))
+                self._condicao.wait(timeout=espera)
+            carregado_em = self._carregado_em
+            if carregado_em is None or datetime.now() - carregado_em >= self.recarga:
+                try:
+                    self.garantir_carregado()
+                except Exception:
+                    self.app.logger.exception('Falha ao recarregar os vencimentos de aluguel')